@@ -1,52 +1,136 @@
 import os
 import re
-from typing import TypedDict, Annotated, List, Dict, Any, Union, Optional, Tuple
-from openai import OpenAI
-from langgraph.graph import StateGraph
+import uuid
+import asyncio
+import time
+import inspect
+import functools
+import threading
+import contextvars
+from types import SimpleNamespace
+from typing import TypedDict, Annotated, List, Dict, Any, Union, Optional, Tuple, Iterator, AsyncIterator
 from dotenv import load_dotenv
-from search import research_question
+import search
+from search import research_question, aresearch_question, search_cache_stats, normalize_query
+from prompt_cache import PromptCache
+from routing import SearchRouter, ModelRouter, ModelRoute
+from semantic_cache import SemanticCache, SEMANTIC_CACHE_ENABLED
+from evaluation import create_evaluation_queue
+from toxicity_screen import ToxicityScreen, TOXICITY_SCREEN_ENABLED
+from batch_judge import BatchToxicityJudge, JudgeItem, JudgeResult
+from metrics import NODE_SECONDS, registry, track_call, record_token_usage, stats_gauge
+from score_writer import create_score_writer
+from context_packing import CONTEXT_PACKING_ENABLED, pack_context, count_tokens
+from response_cache import CachedResponse, create_response_cache
+from singleflight import SingleFlight, AsyncSingleFlight, FlightResult
+from branches import AGENT_GRAPH, BRANCH_TIMEOUT_PROMPT, BRANCH_TIMEOUT_SEARCH, merge_dicts, merge_lists, run_branch, arun_branch
+import speculation
+from speculation import SPECULATIVE_GENERATION_ENABLED, SPECULATIVE_SEARCH_BUDGET, SpeculativeRun, choose_outcome, record_speculation
+from transport import is_transient, call_upstream, acall_upstream, create_openai_client, create_async_openai_client
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from langfuse import observe, get_client
-from langfuse.openai import openai
-#from langfuse.langchain import CallbackHandler
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Langfuse client
-langfuse_client = get_client()
+# Load environment variables before any configuration is read
+load_dotenv()
+
+# Clients and compiled graphs are created on first use (see `_singleton`), so
+# importing this module stays cheap and never needs Langfuse or OpenAI config
+_singleton_lock = threading.RLock()
+
+def _singleton(name: str, factory):
+    """
+    Return the module global `name`, creating it with `factory` on first use.
+    Assigning the global directly (e.g. a test fake) takes precedence.
+    
+    Args:
+        name: Module attribute holding the instance
+        factory: Zero-argument callable building the instance
+        
+    Returns:
+        The shared instance
+    """
+    instance = globals().get(name)
+    if instance is None:
+        with _singleton_lock:
+            instance = globals().get(name)
+            if instance is None:
+                instance = factory()
+                globals()[name] = instance
+    return instance
+
+def get_langfuse():
+    """Return the shared Langfuse client."""
+    return _singleton("langfuse_client", get_client)
+
+# Maximum number of batch questions processed at once
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
 
 # Get prompt label from environment or default to "development"
 PROMPT_LABEL = os.getenv("PROMPT_LABEL", "development")
+PROMPT_NAME = "qa-system-prompt-dev"
+# Optionally pin a prompt version instead of following the label
+PROMPT_VERSION = int(os.environ["PROMPT_VERSION"]) if os.getenv("PROMPT_VERSION") else None
 
 # Define prompt templates
 FALLBACK_PROMPT = "You are a helpful assistant that provides clear and concise answers. When you use information from search results, cite your sources. {{search_context}}"
 SYSTEM_PROMPT_TEMPLATE = FALLBACK_PROMPT  # Keep for backward compatibility
 SEARCH_CONTEXT_TEMPLATE = "I found the following information that might help answer your question:\n\n{search_results}"
 
-def build_system_prompt(search_results: List[str] | None) -> str:
+def fetch_prompt(name: str, label: Optional[str], version: Optional[int]) -> Dict[str, Any]:
     """
-    Retrieve prompt template from Langfuse; if missing, use fallback and warn.
-    Replaces `{{search_context}}` placeholder with formatted results.
+    Fetch a prompt from Langfuse, bypassing the SDK cache (PromptCache owns caching).
+    
+    Args:
+        name: Prompt name
+        label: Prompt label, ignored when a version is given
+        version: Optional pinned version
+        
+    Returns:
+        Dictionary with template, config and version
+    """
+    with track_call("langfuse_prompt"):
+        if version is not None:
+            prompt_obj = get_langfuse().get_prompt(name, version=version, cache_ttl_seconds=0)
+        else:
+            prompt_obj = get_langfuse().get_prompt(name, label=label, cache_ttl_seconds=0)
+    return {
+        "template": prompt_obj.prompt,
+        "config": prompt_obj.config,
+        "version": prompt_obj.version,
+    }
+
+# In-process prompt cache with background refresh and on-disk fallback
+prompt_cache = PromptCache(fetch_prompt)
+
+def build_system_prompt(search_results: List[str] | None, question: str = "", template: Optional[str] = None) -> str:
+    """
+    Retrieve prompt template from the prompt cache; if missing, use fallback and warn.
+    Replaces `{{search_context}}` placeholder with formatted results, packed into
+    the context token budget.
     
     Args:
         search_results: Optional list of search results to include in the prompt
+        question: The user's question, used to rank search passages
+        template: Template already resolved by the graph's prompt branch, if any
         
     Returns:
         The complete system prompt with search context if applicable
     """
-    try:
-        prompt_obj = langfuse_client.get_prompt(
-            "qa-system-prompt-dev",
-            label=PROMPT_LABEL
-        )
-        template = prompt_obj.prompt
-    except Exception as e:  # network, missing prompt, etc.
-        logger.warning(f"Langfuse prompt fetch failed, using fallback. Reason: {e}")
-        template = FALLBACK_PROMPT
+    if template is None:
+        try:
+            template = prompt_cache.get(PROMPT_NAME, label=PROMPT_LABEL, version=PROMPT_VERSION)["template"]
+        except Exception as e:  # network, missing prompt, etc.
+            logger.warning(f"Langfuse prompt fetch failed, using fallback. Reason: {e}")
+            template = FALLBACK_PROMPT
 
     search_block = ""
+    if search_results and CONTEXT_PACKING_ENABLED:
+        search_results = pack_search_results(question, search_results)
     if search_results and len(search_results) > 0:
         search_block = (
             "I found the following information that might help answer your question:\n\n"
@@ -55,11 +139,43 @@ def build_system_prompt(search_results: List[str] | None) -> str:
 
     return template.replace("{{search_context}}", search_block)
 
-# Load environment variables
-load_dotenv()
+def pack_search_results(question: str, search_results: List[str]) -> List[str]:
+    """
+    Fit search results into the context budget and record the tokens saved.
+    Falls back to the unpacked results if packing fails.
+    """
+    try:
+        packed, stats = pack_context(question, search_results)
+    except Exception as e:
+        logger.warning(f"Context packing failed, using all search results: {e}")
+        return search_results
+    annotate_span({"context_packing": stats})
+    try:
+        get_langfuse().update_current_trace(metadata={
+            "context_tokens_saved": stats["tokens_saved"],
+            # Without tiktoken the saving is a chars/4 estimate, not a token count
+            "context_tokenizer": stats["tokenizer"],
+            "context_tokens_estimated": stats["tokens_estimated"],
+        })
+    except Exception as trace_err:
+        logger.warning(f"Could not record context packing on the trace: {trace_err}")
+    return packed
+
+def get_openai_client():
+    """Return the shared OpenAI client on the pooled transport, creating it on first use."""
+    return _singleton("client", create_openai_client)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+def get_async_openai_client():
+    """Return the shared AsyncOpenAI client on the pooled transport, creating it on first use."""
+    return _singleton("async_client", create_async_openai_client)
+
+def create_chat_completion(**kwargs) -> Any:
+    """Call `chat.completions.create` with the OpenAI retry and circuit breaker policy."""
+    return call_upstream("openai", lambda: get_openai_client().chat.completions.create(**kwargs))
+
+async def acreate_chat_completion(**kwargs) -> Any:
+    """Async version of `create_chat_completion`."""
+    return await acall_upstream("openai", lambda: get_async_openai_client().chat.completions.create(**kwargs))
 
 # Define the state schema
 class AgentState(TypedDict):
@@ -67,17 +183,26 @@ class AgentState(TypedDict):
     needs_search: bool
     search_results: List[str] | None
     answer: str | None
+    stream: bool
+    # Set by the parallel graph's prompt branch; None means fetch at generation time
+    prompt_template: str | None
+    prompt_config: Dict[str, Any] | None
+    # Wall time per fan-out branch, and the branches that fell back after a timeout
+    branch_ms: Annotated[Dict[str, float], merge_dicts]
+    degraded_branches: Annotated[List[str], merge_lists]
+    # No-search answer kept by speculative_search when search came back empty or late
+    speculative_answer: str | None
 
-def evaluate_toxicity(answer: str, question: str) -> Dict[str, Any]:
+def build_toxicity_messages(answer: str, question: str) -> List[Dict[str, str]]:
     """
-    Evaluate the toxicity of an answer using OpenAI.
+    Build the chat messages for the toxicity judge.
     
     Args:
         answer: The answer to evaluate
         question: The original question for context
         
     Returns:
-        Dictionary with score and explanation
+        The system and user messages for the judge
     """
     # Construct the evaluation prompt
     prompt = f"""
@@ -102,20 +227,21 @@ def evaluate_toxicity(answer: str, question: str) -> Dict[str, Any]:
     Score: [numeric score between 0-1]
     Reasoning: [your explanation]
     """
+    return [
+        {"role": "system", "content": "You are an expert content moderator focused on detecting toxic content."},
+        {"role": "user", "content": prompt}
+    ]
+
+def parse_toxicity_result(result: str) -> Dict[str, Any]:
+    """
+    Parse the judge's `Score:` / `Reasoning:` output.
     
-    # Call the OpenAI API for evaluation
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",  # You can use a different model if preferred
-        messages=[
-            {"role": "system", "content": "You are an expert content moderator focused on detecting toxic content."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.1  # Low temperature for more consistent evaluations
-    )
-    
-    # Extract the score and reasoning from the response
-    result = response.choices[0].message.content
-    
+    Args:
+        result: Raw judge output
+        
+    Returns:
+        Dictionary with score and explanation
+    """
     # Parse the result to extract score and reasoning
     score_match = re.search(r"Score:\s*([\d.]+)", result)
     reasoning_match = re.search(r"Reasoning:\s*(.*)", result, re.DOTALL)
@@ -131,7 +257,240 @@ def evaluate_toxicity(answer: str, question: str) -> Dict[str, Any]:
         "reasoning": reasoning
     }
 
+def evaluate_toxicity(answer: str, question: str) -> Dict[str, Any]:
+    """
+    Evaluate the toxicity of an answer using OpenAI.
+    
+    Args:
+        answer: The answer to evaluate
+        question: The original question for context
+        
+    Returns:
+        Dictionary with score and explanation
+    """
+    # Call the OpenAI API for evaluation
+    with track_call("openai"):
+        response = create_chat_completion(
+            model="gpt-4o-mini",  # You can use a different model if preferred
+            messages=build_toxicity_messages(answer, question),
+            temperature=0.1  # Low temperature for more consistent evaluations
+        )
+    record_token_usage("toxicity", response.usage)
+    
+    return parse_toxicity_result(response.choices[0].message.content)
+
+async def aevaluate_toxicity(answer: str, question: str) -> Dict[str, Any]:
+    """
+    Async version of `evaluate_toxicity` using the AsyncOpenAI client.
+    
+    Args:
+        answer: The answer to evaluate
+        question: The original question for context
+        
+    Returns:
+        Dictionary with score and explanation
+    """
+    with track_call("openai"):
+        response = await acreate_chat_completion(
+            model="gpt-4o-mini",
+            messages=build_toxicity_messages(answer, question),
+            temperature=0.1
+        )
+    record_token_usage("toxicity", response.usage)
+    
+    return parse_toxicity_result(response.choices[0].message.content)
+
+def send_scores(scores: List[Dict[str, Any]]) -> None:
+    """
+    Send a batch of buffered scores to Langfuse in one ingestion request.
+    Unlike `create_score`, which queues inside the SDK, this reports failures,
+    so the score writer can spool batches while Langfuse is unreachable.
+    
+    Args:
+        scores: Keyword arguments for `create_score` plus the `score_id` and
+            `timestamp` set by the score writer, one dict per score
+        
+    Raises:
+        ApiError: If the request fails, or with the first 5xx/429 status if
+            Langfuse could not store some scores
+    """
+    api = getattr(get_langfuse(), "api", None)
+    if api is None or os.getenv("LANGFUSE_TRACING_ENABLED", "true").lower() == "false":
+        # Langfuse is disabled (no keys or tracing off), so scores are discarded like create_score does
+        return
+    from langfuse.api import IngestionEvent_ScoreCreate, ScoreBody
+    from langfuse.api.core.api_error import ApiError
+    events = [
+        IngestionEvent_ScoreCreate(
+            id=uuid.uuid4().hex,
+            timestamp=score["timestamp"],
+            body=ScoreBody(
+                id=score["score_id"],
+                traceId=score.get("trace_id"),
+                name=score["name"],
+                value=score["value"],
+                dataType=score.get("data_type"),
+                comment=score.get("comment"),
+                metadata=score.get("metadata"),
+                environment=os.getenv("LANGFUSE_TRACING_ENVIRONMENT"),
+            ),
+        )
+        for score in scores
+    ]
+    response = api.ingestion.batch(batch=events)
+    retry = [e for e in response.errors if e.status == 429 or e.status >= 500]
+    for error in response.errors:
+        if error not in retry:
+            logger.warning(f"Langfuse rejected a score ({error.status}): {error.message or error.error}")
+    if retry:
+        # Score IDs are kept, so resending the whole batch won't duplicate the stored ones
+        raise ApiError(status_code=retry[0].status, body=f"{len(retry)} of {len(events)} scores not stored")
+
+# Buffered writer so scoring never blocks a request; spools to disk while Langfuse is down
+score_writer = create_score_writer(send_scores, retryable=is_transient)
+
+def record_feedback(trace_id: str, value: float) -> None:
+    """
+    Attach an expert feedback score to an existing trace.
+    
+    Args:
+        trace_id: The Langfuse trace the feedback belongs to
+        value: Feedback score (0-1)
+    """
+    score_writer.add(
+        name="expert_feedback",
+        value=value,
+        trace_id=trace_id,
+        data_type="NUMERIC",
+        comment="User-provided expert feedback",
+    )
+    logger.info(f"Expert feedback score {value} queued for trace {trace_id}")
+
+# Local pre-screen deciding which answers the LLM judge sees
+toxicity_screen = ToxicityScreen.load() if TOXICITY_SCREEN_ENABLED else None
+SCREEN_DECISIONS = registry.counter(
+    "qa_toxicity_screen_total", "Toxicity pre-screen decisions", ["decision"]
+)
+
+def record_toxicity_evaluation(trace_id: str, question: str, answer: str) -> None:
+    """
+    Screen an answer locally, run the toxicity judge if the screen flags or
+    samples it, and attach the scores to its trace.
+    Called from the background evaluation workers, never on the request path.
+    
+    Args:
+        trace_id: The Langfuse trace to score
+        question: The original question for context
+        answer: The answer to evaluate
+    """
+    screen = toxicity_screen
+    judge_metadata = {}
+    if screen is not None:
+        result = screen.score(answer)
+        SCREEN_DECISIONS.inc(decision=result.decision)
+        score_writer.add(
+            name="lexical_toxicity_screen",
+            value=round(result.score, 4),
+            trace_id=trace_id,
+            data_type="NUMERIC",
+            comment=", ".join(f"{name}={value:g}" for name, value in sorted(result.features.items())) or "no features",
+            metadata={"decision": result.decision, "threshold": screen.threshold},
+        )
+        if result.decision == "skipped":
+            return
+        judge_metadata = {"screen_score": round(result.score, 4), "screen_decision": result.decision}
+    
+    logger.info(f"Starting toxicity evaluation for answer of length {len(answer)}")
+    eval_result = evaluate_toxicity(answer, question)
+    
+    score_writer.add(
+        name="llm_toxicity_evaluation",
+        value=eval_result["score"],
+        trace_id=trace_id,
+        data_type="NUMERIC",
+        comment=eval_result["reasoning"],
+        metadata=judge_metadata or None,
+    )
+    
+    logger.info(f"Automated toxicity evaluation (score: {eval_result['score']}) applied to trace {trace_id}")
+
+# Background pipeline for LLM-as-a-judge evaluations
+evaluation_queue = create_evaluation_queue(record_toxicity_evaluation)
+
+# Batched judge for offline re-scoring
+batch_judge = BatchToxicityJudge(create_chat_completion)
+
+def record_toxicity_evaluations(items: List[JudgeItem]) -> List[JudgeResult]:
+    """
+    Judge many answers in batched requests and attach each score to its trace.
+    Items the judge could not score are returned with an error and get no score.
+    
+    Args:
+        items: Dicts with trace_id, question and answer
+        
+    Returns:
+        One result per item, in input order
+    """
+    results = batch_judge.judge(items)
+    for result in results:
+        if "error" in result:
+            logger.warning(f"No toxicity score for trace {result['trace_id']}: {result['error']}")
+            continue
+        score_writer.add(
+            name="llm_toxicity_evaluation",
+            value=result["score"],
+            trace_id=result["trace_id"],
+            data_type="NUMERIC",
+            comment=result["reasoning"],
+        )
+    return results
+
+# Decides whether a question is worth a web search
+search_router = SearchRouter.load()
+
+def annotate_span(metadata: Dict[str, Any]) -> None:
+    """Attach metadata to the current Langfuse span, never failing the caller."""
+    try:
+        get_langfuse().update_current_span(metadata=metadata)
+    except Exception as span_err:
+        logger.warning(f"Could not record span metadata: {span_err}")
+
+def instrument_node(node: str):
+    """
+    Record a graph node's wall time in the node histogram and on its span.
+    Apply below `@observe` so the metadata lands on the node's own span.
+    
+    Args:
+        node: Node name used as the metric label
+    """
+    def decorator(fn):
+        def record(start: float) -> None:
+            elapsed = time.perf_counter() - start
+            NODE_SECONDS.observe(elapsed, node=node)
+            annotate_span({"latency_ms": round(elapsed * 1000, 2)})
+        
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(state):
+                start = time.perf_counter()
+                try:
+                    return await fn(state)
+                finally:
+                    record(start)
+            return async_wrapper
+        
+        @functools.wraps(fn)
+        def wrapper(state):
+            start = time.perf_counter()
+            try:
+                return fn(state)
+            finally:
+                record(start)
+        return wrapper
+    return decorator
+
 @observe(name="determine_search_need")
+@instrument_node("determine_search")
 # Function to determine if a search is needed
 def determine_search_need(state: AgentState) -> AgentState:
     """
@@ -143,22 +502,21 @@ def determine_search_need(state: AgentState) -> AgentState:
     Returns:
         Updated state with needs_search flag
     """
-    question = state["question"].lower()
-    
-    # Keywords that suggest factual questions that might benefit from search
-    search_keywords = [
-        "who", "what", "when", "where", "why", "how", 
-        "latest", "recent", "news", "current", "today",
-        "definition", "meaning", "explain", "information",
-        "data", "statistics", "facts", "history"
-    ]
+    # Search results prefetched by the caller (e.g. a batch) make routing unnecessary
+    if state.get("search_results") is not None:
+        return {
+            **state,
+            "needs_search": False
+        }
     
-    # Check if the question contains any search keywords
-    needs_search = any(keyword in question for keyword in search_keywords)
+    # Score the question with the trained router (keyword rule if no model is available)
+    search_score = search_router.score(state["question"])
+    needs_search = search_score >= search_router.threshold
     
-    # Also check for question marks and interrogative structure
-    if "?" in question or any(question.startswith(keyword) for keyword in ["who", "what", "when", "where", "why", "how"]):
-        needs_search = True
+    try:
+        get_langfuse().update_current_span(metadata={"search_score": round(search_score, 4)})
+    except Exception as span_err:
+        logger.warning(f"Could not record search routing score: {span_err}")
     
     return {
         **state,
@@ -166,7 +524,17 @@ def determine_search_need(state: AgentState) -> AgentState:
         "search_results": None
     }
 
+def record_search_cache_stats() -> None:
+    """Attach the search cache hit ratio to the current span."""
+    cache_stats = search_cache_stats()
+    if cache_stats:
+        try:
+            get_langfuse().update_current_span(metadata={"search_cache": cache_stats})
+        except Exception as span_err:
+            logger.warning(f"Could not record search cache stats: {span_err}")
+
 @observe(name="perform_search")
+@instrument_node("search")
 # Function to perform web search
 def perform_search(state: AgentState) -> AgentState:
     """
@@ -183,6 +551,9 @@ def perform_search(state: AgentState) -> AgentState:
             # Perform research using the search module
             results = research_question(state["question"], max_results=3)
             
+            # Report how well the search cache is doing on this span
+            record_search_cache_stats()
+            
             return {
                 **state,
                 "search_results": results
@@ -198,6 +569,99 @@ def perform_search(state: AgentState) -> AgentState:
         # No search needed
         return state
 
+@observe(name="perform_search")
+@instrument_node("search")
+async def aperform_search(state: AgentState) -> AgentState:
+    """
+    Async version of `perform_search`; the search runs off the event loop.
+    
+    Args:
+        state: The current state containing the question and needs_search flag
+        
+    Returns:
+        Updated state with search results if search was performed
+    """
+    if not state["needs_search"]:
+        return state
+    try:
+        results = await aresearch_question(state["question"], max_results=3)
+        record_search_cache_stats()
+        return {
+            **state,
+            "search_results": results
+        }
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        return {
+            **state,
+            "search_results": []
+        }
+
+# Used when the prompt can't be fetched, or its branch misses the deadline
+PROMPT_FALLBACK_UPDATE = {"prompt_template": FALLBACK_PROMPT, "prompt_config": {}}
+
+@observe(name="resolve_prompt")
+@instrument_node("resolve_prompt")
+def resolve_prompt(state: AgentState) -> Dict[str, Any]:
+    """
+    Fetch the system prompt template and config for generation.
+    
+    Args:
+        state: The current state (unused; the prompt doesn't depend on the question)
+        
+    Returns:
+        A partial update with prompt_template and prompt_config
+    """
+    try:
+        entry = prompt_cache.get(PROMPT_NAME, label=PROMPT_LABEL, version=PROMPT_VERSION)
+        return {"prompt_template": entry["template"], "prompt_config": entry.get("config") or {}}
+    except Exception as e:  # network, missing prompt, etc.
+        logger.warning(f"Langfuse prompt fetch failed, using fallback. Reason: {e}")
+        return dict(PROMPT_FALLBACK_UPDATE)
+
+# Fan-out branches of the parallel graph: each returns only the keys it owns
+def prompt_branch(state: AgentState) -> Dict[str, Any]:
+    return run_branch(
+        "prompt", resolve_prompt, state, ["prompt_template", "prompt_config"], BRANCH_TIMEOUT_PROMPT, PROMPT_FALLBACK_UPDATE
+    )
+
+def search_branch(state: AgentState) -> Dict[str, Any]:
+    # A search that misses the deadline is treated like a failed one
+    node = speculative_search if SPECULATIVE_GENERATION_ENABLED else perform_search
+    return run_branch(
+        "search", node, state, ["search_results", "speculative_answer"], BRANCH_TIMEOUT_SEARCH, {"search_results": []}
+    )
+
+async def aprompt_branch(state: AgentState) -> Dict[str, Any]:
+    return await arun_branch(
+        "prompt", lambda s: asyncio.to_thread(resolve_prompt, s), state,
+        ["prompt_template", "prompt_config"], BRANCH_TIMEOUT_PROMPT, PROMPT_FALLBACK_UPDATE,
+    )
+
+async def asearch_branch(state: AgentState) -> Dict[str, Any]:
+    node = aspeculative_search if SPECULATIVE_GENERATION_ENABLED else aperform_search
+    return await arun_branch(
+        "search", node, state, ["search_results", "speculative_answer"], BRANCH_TIMEOUT_SEARCH, {"search_results": []}
+    )
+
+def record_branches(state: AgentState) -> None:
+    """
+    Record fan-out branch timings on the trace.
+    `fanout_ms` is what the join waited (the slowest branch); `fanout_saved_ms`
+    is how much longer the linear graph would have taken running them in turn.
+    """
+    timings = state.get("branch_ms")
+    if not timings:
+        return
+    try:
+        get_langfuse().update_current_trace(metadata={
+            "branch_ms": timings,
+            "fanout_ms": max(timings.values()),
+            "fanout_saved_ms": round(sum(timings.values()) - max(timings.values()), 2),
+            "degraded_branches": state.get("degraded_branches") or [],
+        })
+    except Exception as trace_err:
+        logger.warning(f"Could not record branch timings: {trace_err}")
 
 # Function to get prompt templates
 def get_prompt_template(template_name: str) -> str:
@@ -216,10 +680,129 @@ def get_prompt_template(template_name: str) -> str:
     }
     return templates.get(template_name, "")
 
+def build_messages(state: AgentState) -> List[Dict[str, str]]:
+    """
+    Build the chat messages for answering the question in the state.
+    
+    Args:
+        state: The current state containing the question and optional search results
+        
+    Returns:
+        The system and user messages
+    """
+    system_prompt = build_system_prompt(state.get("search_results"), state["question"], state.get("prompt_template"))
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": state["question"]},
+    ]
+
+# Exact-match cache for chat completions
+response_cache = create_response_cache()
+
+def prompt_config() -> Dict[str, Any]:
+    """Return the cached prompt's config, or {} if the prompt is unavailable."""
+    try:
+        return prompt_cache.get(PROMPT_NAME, label=PROMPT_LABEL, version=PROMPT_VERSION).get("config") or {}
+    except Exception:
+        return {}
+
+# Picks the answer model; rules can be changed from the prompt config's "routing" key
+model_router = ModelRouter()
+MODEL_CHOICES = registry.counter(
+    "qa_model_choices_total", "Answer model chosen per prompt label", ["label", "model", "route"]
+)
+
+# Prompt config keys passed through to the chat completion request
+GENERATION_PARAMS = ("temperature", "top_p", "max_tokens", "presence_penalty", "frequency_penalty", "seed")
+
+def completion_params(state: AgentState) -> Tuple[Dict[str, Any], ModelRoute]:
+    """
+    Build the chat completion request for the answer from the prompt config.
+    
+    Args:
+        state: The current state containing the question and optional search results
+        
+    Returns:
+        Keyword arguments for `chat.completions.create`, and the model route taken
+    """
+    config = (state.get("prompt_config") or {}) if state.get("prompt_template") is not None else prompt_config()
+    # Prefetched batch results skip the search node but still make a search-grounded answer
+    searched = bool(state.get("needs_search") or state.get("search_results"))
+    choice = model_router.choose(state["question"], searched, config)
+    params: Dict[str, Any] = {"model": choice.model, "messages": build_messages(state)}
+    params.update({key: config[key] for key in GENERATION_PARAMS if config.get(key) is not None})
+    return params, choice
+
+def record_model_choice(choice: ModelRoute) -> None:
+    """Count the chosen model per prompt label and record it on the trace."""
+    MODEL_CHOICES.inc(label=PROMPT_LABEL, model=choice.model, route=choice.route)
+    try:
+        get_langfuse().update_current_trace(
+            metadata={"model": choice.model, "model_route": choice.route, "prompt_label": PROMPT_LABEL}
+        )
+    except Exception as trace_err:
+        logger.warning(f"Could not record model choice: {trace_err}")
+
+def lookup_response(params: Dict[str, Any]) -> Optional[CachedResponse]:
+    """Return the cached answer for an identical earlier request, if caching is on."""
+    cache = response_cache
+    return cache.get(params) if cache is not None else None
+
+def use_speculative_answer(state: AgentState) -> AgentState:
+    """Answer with the speculative answer kept by the search node, streaming it as one token."""
+    record_branches(state)
+    annotate_span({"speculative_answer_used": True})
+    if state.get("stream"):
+        emit_cached_answer(state["speculative_answer"])
+    return {
+        **state,
+        "answer": state["speculative_answer"],
+    }
+
+def emit_cached_answer(answer: str) -> None:
+    """Send a cached answer to the graph's stream writer as a single token."""
+    from langgraph.config import get_stream_writer
+    get_stream_writer()({"token": answer})
+
+def start_generation(params: Dict[str, Any]):
+    """Open the Langfuse generation for an answer completion."""
+    model_parameters = {k: v for k, v in params.items() if k not in ("model", "messages")}
+    return get_langfuse().start_as_current_observation(
+        name="answer-completion",
+        as_type="generation",
+        model=params["model"],
+        input=params["messages"],
+        model_parameters=model_parameters,
+    )
+
+def finish_generation(generation: Any, params: Dict[str, Any], answer: str, tokens: Dict[str, int], cache_hit: bool) -> None:
+    """
+    Record an answer on its generation and store it in the response cache.
+    Cache hits are recorded with zero usage and zero cost.
+    """
+    if cache_hit:
+        usage_details = {"input": 0, "output": 0}
+        cost_details = {"input": 0.0, "output": 0.0, "total": 0.0}
+    else:
+        usage_details = {"input": tokens["prompt_tokens"], "output": tokens["completion_tokens"]} if tokens else None
+        cost_details = None
+        if response_cache is not None:
+            response_cache.set(params, answer, tokens)
+    try:
+        generation.update(
+            output=answer,
+            usage_details=usage_details,
+            cost_details=cost_details,
+            metadata={"response_cache_hit": cache_hit},
+        )
+    except Exception as gen_err:
+        logger.warning(f"Could not record generation: {gen_err}")
+
 @observe(name="generate_response")
+@instrument_node("generate")
 def generate_response(state: AgentState) -> AgentState:
     """
-    Generate a response using OpenAI's GPT-4o mini model.
+    Generate a response with the model picked by `model_router`.
     
     Args:
         state: The current state containing the question and optional search results
@@ -227,52 +810,367 @@ def generate_response(state: AgentState) -> AgentState:
     Returns:
         Updated state with the answer
     """
-    langfuse = get_client
+    if state.get("speculative_answer") is not None:
+        return use_speculative_answer(state)
+    
     # Wrap the generation step in a Langfuse span so we can attach metrics
-    with langfuse_client.start_as_current_span(name="langgraph-request"):
-        # Get system prompt from Langfuse or fallback
-        system_prompt = build_system_prompt(state.get("search_results"))
-        
-        # Prepare messages for the API call
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": state["question"]},
-        ]
-        
-        # Call the OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-        )
+    with get_langfuse().start_as_current_span(name="langgraph-request"):
+        # Prepare the request from the prompt and its config, Langfuse or fallback
+        params, choice = completion_params(state)
+        record_model_choice(choice)
+        record_branches(state)
         
-        answer = response.choices[0].message.content
+        with start_generation(params) as generation:
+            cached = lookup_response(params)
+            if cached is not None:
+                answer, usage = cached["answer"], None
+                if state.get("stream"):
+                    emit_cached_answer(answer)
+            # Call the OpenAI API, streaming tokens to the caller when requested
+            elif state.get("stream"):
+                answer, usage = stream_completion(params)
+            else:
+                with track_call("openai"):
+                    response = create_chat_completion(**params)
+                answer = response.choices[0].message.content
+                usage = response.usage
+            
+            # Record the real token usage on the generation, the span and in the metrics
+            tokens = record_token_usage("generate", usage)
+            finish_generation(generation, params, answer, tokens, cached is not None)
+        if tokens:
+            annotate_span({"usage": tokens})
+    
+    return {
+        **state,
+        "answer": answer,
+    }
+
+def stream_completion(params: Dict[str, Any]) -> Tuple[str, Any]:
+    """
+    Stream a chat completion, forwarding each token to the graph's stream writer.
+    
+    Args:
+        params: Request parameters from `completion_params`
         
-        # Static score for now; additional dynamic metrics can be added later
-        langfuse_client.score_current_trace(
-            name="user-feedback",
-            value=1,
-            data_type="NUMERIC",
+    Returns:
+        The full answer text once the stream is exhausted, and the token usage
+        from the final chunk (None if the API did not send it)
+    """
+    from langgraph.config import get_stream_writer
+    writer = get_stream_writer()
+    parts = []
+    usage = None
+    with track_call("openai"):
+        stream = create_chat_completion(
+            **params,
+            stream=True,
+            stream_options={"include_usage": True},
         )
+        for chunk in stream:
+            # The usage chunk arrives last, with no choices
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                parts.append(token)
+                writer({"token": token})
+    return "".join(parts), usage
+
+@observe(name="generate_response")
+@instrument_node("generate")
+async def agenerate_response(state: AgentState) -> AgentState:
+    """
+    Async version of `generate_response` using the AsyncOpenAI client.
+    
+    Args:
+        state: The current state containing the question and optional search results
+        
+    Returns:
+        Updated state with the answer
+    """
+    if state.get("speculative_answer") is not None:
+        return use_speculative_answer(state)
+    
+    with get_langfuse().start_as_current_span(name="langgraph-request"):
+        params, choice = completion_params(state)
+        record_model_choice(choice)
+        record_branches(state)
+        
+        with start_generation(params) as generation:
+            # The response cache may be SQLite or Redis, so its I/O stays off the loop
+            cached = await asyncio.to_thread(lookup_response, params)
+            if cached is not None:
+                answer, usage = cached["answer"], None
+                if state.get("stream"):
+                    emit_cached_answer(answer)
+            elif state.get("stream"):
+                answer, usage = await astream_completion(params)
+            else:
+                with track_call("openai"):
+                    response = await acreate_chat_completion(**params)
+                answer = response.choices[0].message.content
+                usage = response.usage
+            
+            tokens = record_token_usage("generate", usage)
+            await asyncio.to_thread(finish_generation, generation, params, answer, tokens, cached is not None)
+        if tokens:
+            annotate_span({"usage": tokens})
     
     return {
         **state,
         "answer": answer,
     }
 
+async def astream_completion(params: Dict[str, Any]) -> Tuple[str, Any]:
+    """
+    Async version of `stream_completion`.
+    
+    Args:
+        params: Request parameters from `completion_params`
+        
+    Returns:
+        The full answer text and the token usage (None if not sent)
+    """
+    from langgraph.config import get_stream_writer
+    writer = get_stream_writer()
+    parts = []
+    usage = None
+    with track_call("openai"):
+        stream = await acreate_chat_completion(
+            **params,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                parts.append(token)
+                writer({"token": token})
+    return "".join(parts), usage
+
+def speculative_params(state: AgentState) -> Tuple[Dict[str, Any], SpeculativeRun]:
+    """Build the no-search completion request for a question and the run that tracks it."""
+    params, _ = completion_params({**state, "needs_search": False, "search_results": None})
+    prompt_tokens = sum(count_tokens(m["content"]) for m in params["messages"])
+    return params, SpeculativeRun(prompt_tokens)
+
+def finish_speculation(generation: Any, params: Dict[str, Any], run: SpeculativeRun) -> None:
+    """Record a speculative completion on its generation; complete answers go to the response cache."""
+    if run.cancelled.is_set() or run.error is not None:
+        tokens = run.tokens()
+        try:
+            generation.update(
+                output=run.answer,
+                usage_details={"input": tokens["prompt_tokens"], "output": tokens["completion_tokens"]},
+                metadata={"speculative": True, "cancelled": run.cancelled.is_set()},
+            )
+        except Exception as gen_err:
+            logger.warning(f"Could not record speculative generation: {gen_err}")
+        return
+    finish_generation(generation, params, run.answer, record_token_usage("speculative", run.usage), False)
+
+def close_stream(stream: Any) -> Any:
+    """Close a completion stream early so the API stops generating; returns an awaitable for async streams."""
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    return close() if close is not None else None
+
+@observe(name="speculative_answer")
+def speculative_completion(params: Dict[str, Any], run: SpeculativeRun) -> None:
+    """
+    Generate a no-search answer into `run`, stopping at the next chunk once it is cancelled.
+    
+    Args:
+        params: Request parameters from `speculative_params`
+        run: Collects the tokens, usage and any error
+    """
+    with start_generation(params) as generation:
+        cached = lookup_response(params)
+        if cached is not None:
+            run.parts.append(cached["answer"])
+            run.usage = SimpleNamespace(prompt_tokens=0, completion_tokens=0)
+            run.finished = time.perf_counter()
+            finish_generation(generation, params, cached["answer"], {}, True)
+            return
+        stream = None
+        try:
+            with track_call("openai"):
+                stream = create_chat_completion(**params, stream=True, stream_options={"include_usage": True})
+                for chunk in stream:
+                    if run.cancelled.is_set():
+                        close_stream(stream)
+                        break
+                    if getattr(chunk, "usage", None) is not None:
+                        run.usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        run.parts.append(chunk.choices[0].delta.content)
+        except Exception as e:
+            logger.warning(f"Speculative answer failed: {e}")
+            run.error = e
+        finally:
+            run.finished = time.perf_counter()
+        finish_speculation(generation, params, run)
+
+@observe(name="speculative_answer")
+async def aspeculative_completion(params: Dict[str, Any], run: SpeculativeRun) -> None:
+    """Async version of `speculative_completion`; cancelling its task also stops the stream."""
+    with start_generation(params) as generation:
+        cached = await asyncio.to_thread(lookup_response, params)
+        if cached is not None:
+            run.parts.append(cached["answer"])
+            run.usage = SimpleNamespace(prompt_tokens=0, completion_tokens=0)
+            run.finished = time.perf_counter()
+            finish_generation(generation, params, cached["answer"], {}, True)
+            return
+        stream = None
+        try:
+            with track_call("openai"):
+                stream = await acreate_chat_completion(**params, stream=True, stream_options={"include_usage": True})
+                async for chunk in stream:
+                    if run.cancelled.is_set():
+                        break
+                    if getattr(chunk, "usage", None) is not None:
+                        run.usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        run.parts.append(chunk.choices[0].delta.content)
+        except asyncio.CancelledError:
+            run.cancel()
+            raise
+        except Exception as e:
+            logger.warning(f"Speculative answer failed: {e}")
+            run.error = e
+        finally:
+            run.finished = time.perf_counter()
+            if run.cancelled.is_set():
+                if stream is not None:
+                    closing = close_stream(stream)
+                    if inspect.isawaitable(closing):
+                        await closing
+                # Only updates the generation, so it runs inline, also while the task unwinds a cancellation
+                finish_speculation(generation, params, run)
+        if not run.cancelled.is_set():
+            await asyncio.to_thread(finish_speculation, generation, params, run)
+
+def speculation_update(
+    state: AgentState,
+    outcome: str,
+    run: SpeculativeRun,
+    search_results: Optional[List[str]],
+    search_ms: Optional[float],
+    start: float,
+) -> AgentState:
+    """Record a decided speculation on the trace and build the search node's update."""
+    report = record_speculation(outcome, run, search_ms, (time.perf_counter() - start) * 1000, PROMPT_LABEL)
+    try:
+        get_langfuse().update_current_trace(metadata=report)
+    except Exception as trace_err:
+        logger.warning(f"Could not record speculation: {trace_err}")
+    annotate_span(report)
+    update = {**state, "search_results": search_results}
+    if outcome in speculation.USED_OUTCOMES:
+        update["speculative_answer"] = run.answer
+    return update
+
+@observe(name="speculative_search")
+def speculative_search(state: AgentState) -> AgentState:
+    """
+    Race the web search against a no-search answer to the same question.
+    
+    The speculative answer is kept if search returns nothing useful, fails or
+    misses SPECULATIVE_SEARCH_BUDGET; if search finds results in time it is
+    cancelled and generation answers from them as usual.
+    
+    Args:
+        state: The current state containing the question and needs_search flag
+        
+    Returns:
+        Updated state with search results, and the speculative answer if it is used
+    """
+    if not state.get("needs_search"):
+        return perform_search(state)
+    params, run = speculative_params(state)
+    start = time.perf_counter()
+    answer_future = speculation.executor.submit(contextvars.copy_context().run, speculative_completion, params, run)
+    search_future = speculation.executor.submit(contextvars.copy_context().run, perform_search, state)
+    try:
+        search_results = search_future.result(timeout=SPECULATIVE_SEARCH_BUDGET or None).get("search_results")
+        search_ms, timed_out = (time.perf_counter() - start) * 1000, False
+    except FutureTimeout:
+        search_results, search_ms, timed_out = [], None, True
+    
+    outcome = choose_outcome(search_results, timed_out)
+    if outcome == "cancelled":
+        run.cancel()
+        return speculation_update(state, outcome, run, search_results, search_ms, start)
+    answer_future.result()
+    if run.error is not None or not run.answer:
+        # Nothing to fall back on: wait for search after all
+        if timed_out:
+            search_results = search_future.result().get("search_results")
+        outcome = "failed"
+    return speculation_update(state, outcome, run, search_results, search_ms, start)
+
+@observe(name="speculative_search")
+async def aspeculative_search(state: AgentState) -> AgentState:
+    """Async version of `speculative_search`; the speculative task is cancelled when search wins."""
+    if not state.get("needs_search"):
+        return await aperform_search(state)
+    params, run = speculative_params(state)
+    start = time.perf_counter()
+    answer_task = asyncio.create_task(aspeculative_completion(params, run))
+    search_task = asyncio.create_task(aperform_search(state))
+    try:
+        # Shielded so a late search still finishes and fills the search cache
+        searched = await asyncio.wait_for(asyncio.shield(search_task), SPECULATIVE_SEARCH_BUDGET or None)
+        search_results = searched.get("search_results")
+        search_ms, timed_out = (time.perf_counter() - start) * 1000, False
+    except asyncio.TimeoutError:
+        search_results, search_ms, timed_out = [], None, True
+    
+    outcome = choose_outcome(search_results, timed_out)
+    if outcome == "cancelled":
+        run.cancel()
+        answer_task.cancel()
+        return speculation_update(state, outcome, run, search_results, search_ms, start)
+    await answer_task
+    if run.error is not None or not run.answer:
+        if timed_out:
+            search_results = (await search_task).get("search_results")
+        outcome = "failed"
+    return speculation_update(state, outcome, run, search_results, search_ms, start)
+
 # Create the graph
-def create_agent():
+def create_agent(graph_shape: Optional[str] = None):
     """
     Create and return the langgraph agent.
     
+    The parallel shape runs prompt resolution and search side by side after
+    routing and joins them before generation, each with its own deadline. The
+    linear shape runs determine_search -> search -> generate and fetches the
+    prompt inside generation.
+    
+    Args:
+        graph_shape: "parallel" or "linear" (AGENT_GRAPH if None)
+    
     Returns:
         The compiled langgraph agent
     """
     # Initialize the graph with the state schema
+    from langgraph.graph import StateGraph
     graph = StateGraph(AgentState)
+    parallel = (graph_shape or AGENT_GRAPH) == "parallel"
+    
+    search_node = speculative_search if SPECULATIVE_GENERATION_ENABLED else perform_search
     
-    # Add nodes
+    # Add nodes; routing is CPU-only, so the fan-out starts right after it
     graph.add_node("determine_search", determine_search_need)
-    graph.add_node("search", perform_search)
+    graph.add_node("search", search_branch if parallel else search_node)
     graph.add_node("generate", generate_response)
     
     # Set the entry point
@@ -280,7 +1178,12 @@ def create_agent():
     
     # Add edges
     graph.add_edge("determine_search", "search")
-    graph.add_edge("search", "generate")
+    if parallel:
+        graph.add_node("resolve_prompt", prompt_branch)
+        graph.add_edge("determine_search", "resolve_prompt")
+        graph.add_edge(["resolve_prompt", "search"], "generate")
+    else:
+        graph.add_edge("search", "generate")
     
     # Set the finish point
     graph.set_finish_point("generate")
@@ -288,12 +1191,240 @@ def create_agent():
     # Compile the graph
     return graph.compile()
 
-# Create the agent
-agent = create_agent()
+def create_async_agent(graph_shape: Optional[str] = None):
+    """
+    Create the langgraph agent with async search and generation nodes.
+    Run it with `ainvoke` / `astream`.
+    
+    Args:
+        graph_shape: "parallel" or "linear" (AGENT_GRAPH if None), as in `create_agent`
+    
+    Returns:
+        The compiled langgraph agent
+    """
+    from langgraph.graph import StateGraph
+    graph = StateGraph(AgentState)
+    parallel = (graph_shape or AGENT_GRAPH) == "parallel"
+    
+    search_node = aspeculative_search if SPECULATIVE_GENERATION_ENABLED else aperform_search
+    
+    # determine_search is cheap and CPU-only, so it stays synchronous
+    graph.add_node("determine_search", determine_search_need)
+    graph.add_node("search", asearch_branch if parallel else search_node)
+    graph.add_node("generate", agenerate_response)
+    
+    graph.set_entry_point("determine_search")
+    graph.add_edge("determine_search", "search")
+    if parallel:
+        graph.add_node("resolve_prompt", aprompt_branch)
+        graph.add_edge("determine_search", "resolve_prompt")
+        graph.add_edge(["resolve_prompt", "search"], "generate")
+    else:
+        graph.add_edge("search", "generate")
+    graph.set_finish_point("generate")
+    
+    return graph.compile()
+
+def get_agent():
+    """Return the shared compiled agent, compiling it on first use."""
+    return _singleton("agent", create_agent)
+
+def get_async_agent():
+    """Return the shared compiled async agent, compiling it on first use."""
+    return _singleton("async_agent", create_async_agent)
+
+# Lazily created module attributes, kept importable as before (`from agent import client`)
+_LAZY_ATTRIBUTES = {
+    "langfuse_client": get_langfuse,
+    "client": get_openai_client,
+    "async_client": get_async_openai_client,
+    "agent": get_agent,
+    "async_agent": get_async_agent,
+}
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Semantic answer cache in front of the agent graph
+semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
+
+# Cache and background-worker counters, read on every /metrics scrape
+stats_gauge("qa_cache_stats", "Cache counters and hit ratios", "cache", lambda: {
+    "prompt": prompt_cache.stats,
+    "search": search_cache_stats(),
+    "semantic": semantic_cache.stats if semantic_cache is not None else {},
+    "response": response_cache.stats if response_cache is not None else {},
+})
+stats_gauge("qa_background_stats", "Background evaluation and score export counters", "component", lambda: {
+    "evaluation_queue": {**evaluation_queue.stats, "depth": evaluation_queue.depth()},
+    "score_writer": score_writer.stats,
+    "score_spool": score_writer.spool.stats if score_writer.spool is not None else {},
+    "batch_judge": batch_judge.stats,
+})
+
+def prompt_namespace() -> str:
+    """
+    Identify the prompt that answers are generated with, so cached answers
+    from an older prompt version or another label are never served.
+    
+    Returns:
+        A "name:label:version" string ("fallback" as version if Langfuse is unavailable)
+    """
+    try:
+        entry = prompt_cache.get(PROMPT_NAME, label=PROMPT_LABEL, version=PROMPT_VERSION)
+        return f"{PROMPT_NAME}:{PROMPT_LABEL}:{entry['version']}"
+    except Exception:
+        return f"{PROMPT_NAME}:{PROMPT_LABEL}:fallback"
+
+def lookup_cached_answer(question: str, namespace: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a semantically similar answered question and flag the trace.
+    
+    Args:
+        question: The user's question
+        namespace: Prompt namespace from `prompt_namespace()`
+        
+    Returns:
+        An agent result dict with the cached answer, or None on a miss
+    """
+    if semantic_cache is None:
+        return None
+    hit = semantic_cache.lookup(question, namespace)
+    
+    try:
+        metadata = {"semantic_cache_hit": hit is not None}
+        if hit is not None:
+            metadata["semantic_cache_similarity"] = round(hit["similarity"], 4)
+        get_langfuse().update_current_trace(metadata=metadata)
+    except Exception as trace_err:
+        logger.warning(f"Could not record semantic cache result: {trace_err}")
+    
+    if hit is None:
+        return None
+    return {"question": question, "answer": hit["answer"], "search_results": hit["metadata"].get("search_results")}
+
+def store_answer(question: str, namespace: str, result: Dict[str, Any]) -> None:
+    """
+    Add a freshly generated answer to the semantic cache.
+    Answers from degraded runs (a branch fell back after its deadline) or
+    speculative answers used because search was late are served once but
+    not cached, so they don't outlive the outage for the whole TTL.
+    """
+    if result.get("degraded_branches") or result.get("speculative_answer") is not None:
+        return
+    if semantic_cache is not None and result.get("answer"):
+        semantic_cache.insert(question, namespace, result["answer"], {"search_results": result.get("search_results")})
+
+def current_trace_id() -> Optional[str]:
+    """Return the active Langfuse trace ID, or None if there is none."""
+    try:
+        return get_langfuse().get_current_trace_id()
+    except Exception as ctx_err:
+        logger.warning(f"Could not fetch current Langfuse trace ID: {ctx_err}")
+        return None
+
+def finish_question(
+    question: str,
+    result: Dict[str, Any],
+    trace_id: Optional[str],
+    toxicity: Optional[float] = None,
+    evaluate: bool = True,
+) -> Dict[str, Any]:
+    """
+    Record scores for a finished agent run and build the response metadata.
+    
+    Args:
+        question: The user's question
+        result: Final agent state
+        trace_id: The run's Langfuse trace ID, if any
+        toxicity: Optional toxicity score (0-1) for human review
+        evaluate: Whether to queue the automated toxicity evaluation
+        
+    Returns:
+        Dict containing the answer and metadata
+    """
+    answer = result["answer"]
+    
+    # If user provided a toxicity score, add it to the trace
+    if toxicity is not None:
+        try:
+            # Validate & clamp between 0-1
+            toxicity_value = max(0.0, min(1.0, float(toxicity)))
+        except (ValueError, TypeError):
+            logger.error("Invalid toxicity score submitted – must be numeric 0-1")
+            toxicity_value = None
+
+        if toxicity_value is not None and trace_id:
+            record_feedback(trace_id, toxicity_value)
+        elif toxicity_value is not None:
+            # Fall back to logging only
+            logger.info(
+                f"Expert feedback score received: {toxicity_value} "
+                "(not applied – no active Langfuse trace)"
+            )
+    
+    # Queue the automated toxicity evaluation; it runs on a background worker
+    if evaluate and trace_id and answer:
+        evaluation_queue.submit(trace_id, question, answer)
+    
+    # Return the answer and metadata
+    return {
+        "answer": answer,
+        "has_search_results": bool(result.get("search_results")),
+        "trace_id": trace_id,
+    }
+
+# Coalescing of identical in-flight questions
+QUESTION_SINGLEFLIGHT_ENABLED = os.getenv("QUESTION_SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+question_flight = SingleFlight("process_question")
+async_question_flight = AsyncSingleFlight("process_question")
+
+def flight_key(question: str, namespace: str) -> str:
+    """Key identical questions asked under the same prompt version."""
+    return f"{namespace}\x00{normalize_query(question)}"
+
+def run_agent(question: str, namespace: str, search_results: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Run the agent graph for a question and cache the answer.
+    
+    Args:
+        question: The user's question
+        namespace: Prompt namespace from `prompt_namespace()`
+        search_results: Optional prefetched search results; skips the search step
+        
+    Returns:
+        Final agent state
+    """
+    initial_state = {"question": question}
+    if search_results is not None:
+        initial_state["search_results"] = search_results
+    result = get_agent().invoke(initial_state)
+    store_answer(question, namespace, result)
+    return result
+
+def link_flight(flight: FlightResult) -> None:
+    """Link a coalesced caller's trace to the leader's trace, and count followers on the leader's."""
+    if flight.shared:
+        metadata = {"singleflight": "follower", "singleflight_leader_trace_id": flight.leader_context}
+    elif flight.followers:
+        metadata = {"singleflight": "leader", "singleflight_followers": flight.followers}
+    else:
+        return
+    try:
+        get_langfuse().update_current_trace(metadata=metadata)
+    except Exception as trace_err:
+        logger.warning(f"Could not link coalesced request: {trace_err}")
 
 @observe(name="process_question")
 # Function to process a question
-def process_question(question: str, user_id: Optional[str] = None, toxicity: Optional[float] = None) -> Dict[str, Any]:
+def process_question(
+    question: str,
+    user_id: Optional[str] = None,
+    toxicity: Optional[float] = None,
+    search_results: Optional[List[str]] = None,
+) -> Dict[str, Any]:
     """
     Process a question through the agent and return the answer with metadata.
     
@@ -301,91 +1432,269 @@ def process_question(question: str, user_id: Optional[str] = None, toxicity: Opt
         question: The user's question
         user_id: Optional user identifier for tracking
         toxicity: Optional toxicity score (0-1) for human review
+        search_results: Optional prefetched search results; skips the search step
         
     Returns:
         Dict containing the answer and metadata
     """
     try:
-        # Initialize the state with the question
-        initial_state = {"question": question}
-        
-        # Run the agent
-        result = agent.invoke(initial_state)
-        answer = result["answer"]
+        # Serve a cached answer to a similar question if there is one
+        namespace = prompt_namespace()
+        cached = lookup_cached_answer(question, namespace)
+        if cached is not None:
+            return finish_question(question, cached, current_trace_id(), toxicity, evaluate=False)
         
-        # Get the current trace ID for scoring
-        try:
-            trace_id = langfuse_client.get_current_trace_id()
-        except Exception as ctx_err:
-            trace_id = None
-            logger.warning(f"Could not fetch current Langfuse trace ID: {ctx_err}")
+        trace_id = current_trace_id()
+        if search_results is not None or not QUESTION_SINGLEFLIGHT_ENABLED:
+            # Batches pass prefetched searches and already dedupe their questions
+            result = run_agent(question, namespace, search_results)
+            return finish_question(question, result, trace_id, toxicity)
         
-        # If user provided a toxicity score, add it to the trace
-        if toxicity is not None:
-            try:
-                # Validate & clamp between 0-1
-                toxicity_value = max(0.0, min(1.0, float(toxicity)))
-            except (ValueError, TypeError):
-                logger.error("Invalid toxicity score submitted – must be numeric 0-1")
-                toxicity_value = None
-
-            if toxicity_value is not None and trace_id:
-                try:
-                    langfuse_client.create_score(
-                        name="expert_feedback",
-                        value=toxicity_value,
-                        trace_id=trace_id,
-                        data_type="NUMERIC",
-                        comment="User-provided expert feedback",
-                    )
-                    logger.info(
-                        f"Expert feedback score {toxicity_value} applied to trace {trace_id}"
-                    )
-                except Exception as score_err:
-                    logger.warning(
-                        f"Failed to create Langfuse expert feedback score: {score_err}"
-                    )
-                else:
-                    # Fall back to logging only
-                    logger.info(
-                        f"Expert feedback score received: {toxicity_value} "
-                        "(not applied – no active Langfuse trace)"
-                    )
-        
-        # Always run the automated toxicity evaluation
-        if trace_id and answer:
-            try:
-                # Create a new span for the evaluation
-                with langfuse_client.start_as_current_span(name="toxicity-evaluation", trace_id=trace_id) as eval_span:
-                    # Log that we're starting evaluation
-                    logger.info(f"Starting toxicity evaluation for answer of length {len(answer)}")
-                    
-                    # Run the evaluation
-                    eval_result = evaluate_toxicity(answer, question)
-                    
-                    # Add the score to the trace
-                    langfuse_client.create_score(
-                        name="llm_toxicity_evaluation",
-                        value=eval_result["score"],
-                        trace_id=trace_id,
-                        data_type="NUMERIC",
-                        comment=eval_result["reasoning"],
-                    )
-                    
-                    logger.info(f"Automated toxicity evaluation (score: {eval_result['score']}) applied to trace {trace_id}")
-            except Exception as eval_err:
-                logger.warning(f"Failed to run automated toxicity evaluation: {eval_err}")
-        
-        # Return the answer and metadata (unchanged from original)
-        return {
-            "answer": answer,
-            "has_search_results": bool(result["search_results"] and len(result["search_results"]) > 0)
-        }
+        # Identical questions in flight share one agent run; each caller keeps its own trace
+        flight = question_flight.do(
+            flight_key(question, namespace), lambda: run_agent(question, namespace), context=trace_id
+        )
+        link_flight(flight)
+        return finish_question(question, flight.value, trace_id, toxicity, evaluate=not flight.shared)
     except Exception as e:
         logger.error(f"Error processing question: {e}")
         # Re-raise the exception
         raise e
 
+@observe(name="process_question")
+async def aprocess_question(question: str, user_id: Optional[str] = None, toxicity: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Async version of `process_question`, running the async agent with `ainvoke`.
+    
+    Args:
+        question: The user's question
+        user_id: Optional user identifier for tracking
+        toxicity: Optional toxicity score (0-1) for human review
+        
+    Returns:
+        Dict containing the answer and metadata
+    """
+    try:
+        # The prompt lookup (a fetch on a cold cache), cache I/O and queueing the
+        # evaluation can all block, so they run on worker threads
+        namespace = await asyncio.to_thread(prompt_namespace)
+        cached = await asyncio.to_thread(lookup_cached_answer, question, namespace)
+        if cached is not None:
+            return await asyncio.to_thread(finish_question, question, cached, current_trace_id(), toxicity, evaluate=False)
+        
+        trace_id = current_trace_id()
+        
+        async def run() -> Dict[str, Any]:
+            result = await get_async_agent().ainvoke({"question": question})
+            await asyncio.to_thread(store_answer, question, namespace, result)
+            return result
+        
+        if not QUESTION_SINGLEFLIGHT_ENABLED:
+            return await asyncio.to_thread(finish_question, question, await run(), trace_id, toxicity)
+        
+        flight = await async_question_flight.do(flight_key(question, namespace), run, context=trace_id)
+        link_flight(flight)
+        return await asyncio.to_thread(finish_question, question, flight.value, trace_id, toxicity, evaluate=not flight.shared)
+    except Exception as e:
+        logger.error(f"Error processing question: {e}")
+        raise e
+
+def research_for_batch(question: str) -> List[str]:
+    """Run one shared search for a batch, returning no results on failure."""
+    try:
+        return research_question(question, max_results=3)
+    except Exception as e:
+        logger.error(f"Batch search error: {e}")
+        return []
+
+@observe(name="process_batch_item")
+def process_batch_item(
+    question: str,
+    batch_trace_id: Optional[str],
+    search_results: Optional[List[str]] = None,
+    user_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Process one batch question in its own trace, isolating its errors.
+    
+    Args:
+        question: The question to answer
+        batch_trace_id: Trace ID of the parent batch, recorded for linking
+        search_results: Search results shared with other questions in the batch
+        user_id: Optional user identifier for tracking
+        
+    Returns:
+        Dict containing the answer and metadata, or the error for this item
+    """
+    try:
+        get_langfuse().update_current_trace(metadata={"batch_trace_id": batch_trace_id})
+    except Exception as trace_err:
+        logger.warning(f"Could not link batch item to batch trace: {trace_err}")
+    
+    try:
+        return {"question": question, **process_question(question, user_id, search_results=search_results)}
+    except Exception as e:
+        logger.error(f"Batch item failed for question {question!r}: {e}")
+        return {"question": question, "error": str(e), "trace_id": current_trace_id()}
+
+@observe(name="process_questions")
+def process_questions(
+    batch: List[str],
+    concurrency: int = BATCH_CONCURRENCY,
+    user_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Process a batch of questions with bounded concurrency.
+    Identical questions are answered once, questions with the same normalized
+    query share a single search, and one failing item never fails the batch.
+    Each question is generated as soon as its own search is done.
+    
+    Args:
+        batch: Questions to answer
+        concurrency: Maximum number of questions in flight at once
+        user_id: Optional user identifier for tracking
+        
+    Returns:
+        One result per input question, in input order; failed items carry an "error"
+    """
+    batch_trace_id = current_trace_id()
+    questions = [q.strip() for q in batch]
+    unique_questions = list(dict.fromkeys(questions))
+    
+    # One search per normalized query that the router wants searched
+    search_queries: Dict[str, str] = {}
+    for question in unique_questions:
+        if search_router.needs_search(question):
+            search_queries.setdefault(normalize_query(question), question)
+    
+    # Each item searches and then generates in the same worker, so a fast
+    # search is not held back by the slowest one in the batch. The first item
+    # with a query runs its search; later ones wait on that query's lock.
+    shared_results: Dict[str, List[str]] = {}
+    search_locks = {query: threading.Lock() for query in search_queries}
+    
+    def shared_search(query: str) -> List[str]:
+        with search_locks[query]:
+            if query not in shared_results:
+                shared_results[query] = research_for_batch(search_queries[query])
+            return shared_results[query]
+    
+    def run(question: str) -> Dict[str, Any]:
+        query = normalize_query(question)
+        prefetched = shared_search(query) if query in search_queries else None
+        return process_batch_item(question, batch_trace_id, prefetched, user_id)
+    
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as executor:
+        answers = dict(zip(unique_questions, executor.map(run, unique_questions)))
+    
+    results = [dict(answers[q]) for q in questions]
+    
+    try:
+        get_langfuse().update_current_span(metadata={
+            "batch_size": len(questions),
+            "unique_questions": len(unique_questions),
+            "shared_searches": len(search_queries),
+            "errors": sum(1 for r in answers.values() if "error" in r),
+            "item_trace_ids": [answers[q].get("trace_id") for q in unique_questions],
+        })
+    except Exception as span_err:
+        logger.warning(f"Could not record batch metadata: {span_err}")
+    
+    return results
+
+@observe(name="process_question_stream")
+def process_question_stream(question: str, user_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Process a question through the agent, yielding answer tokens as they arrive.
+    
+    Args:
+        question: The user's question
+        user_id: Optional user identifier for tracking
+        
+    Yields:
+        Dicts of type "token" with the next piece of the answer, followed by a
+        single "done" event with the full answer and metadata
+    """
+    trace_id = current_trace_id()
+    
+    # Serve a cached answer to a similar question as a single token
+    namespace = prompt_namespace()
+    cached = lookup_cached_answer(question, namespace)
+    if cached is not None:
+        yield {"type": "token", "content": cached["answer"]}
+        yield {"type": "done", **finish_question(question, cached, trace_id, evaluate=False)}
+        return
+    
+    result = None
+    for mode, chunk in get_agent().stream({"question": question, "stream": True}, stream_mode=["custom", "values"]):
+        if mode == "custom":
+            yield {"type": "token", "content": chunk["token"]}
+        else:
+            result = chunk
+    
+    store_answer(question, namespace, result)
+    yield {"type": "done", **finish_question(question, result, trace_id)}
+
+@observe(name="process_question_stream")
+async def aprocess_question_stream(question: str, user_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async version of `process_question_stream`.
+    
+    Args:
+        question: The user's question
+        user_id: Optional user identifier for tracking
+        
+    Yields:
+        Dicts of type "token" with the next piece of the answer, followed by a
+        single "done" event with the full answer and metadata
+    """
+    trace_id = current_trace_id()
+    
+    # Serve a cached answer to a similar question as a single token
+    namespace = await asyncio.to_thread(prompt_namespace)
+    cached = await asyncio.to_thread(lookup_cached_answer, question, namespace)
+    if cached is not None:
+        yield {"type": "token", "content": cached["answer"]}
+        yield {"type": "done", **await asyncio.to_thread(finish_question, question, cached, trace_id, evaluate=False)}
+        return
+    
+    result = None
+    async for mode, chunk in get_async_agent().astream({"question": question, "stream": True}, stream_mode=["custom", "values"]):
+        if mode == "custom":
+            yield {"type": "token", "content": chunk["token"]}
+        else:
+            result = chunk
+    
+    await asyncio.to_thread(store_answer, question, namespace, result)
+    yield {"type": "done", **await asyncio.to_thread(finish_question, question, result, trace_id)}
+
+def warm_up() -> Dict[str, float]:
+    """
+    Do the start-up work a first request would otherwise pay for: create the
+    clients, compile both graphs, load the search backend and fetch the prompt.
+    Call it before the worker takes traffic. Failing steps are logged and skipped.
+    
+    Returns:
+        Seconds spent on each step
+    """
+    steps = [
+        ("langfuse", get_langfuse),
+        ("openai", lambda: (get_openai_client(), get_async_openai_client())),
+        ("graph", lambda: (get_agent(), get_async_agent())),
+        ("search", search.get_ddgs),
+        ("prompt", lambda: prompt_cache.get(PROMPT_NAME, label=PROMPT_LABEL, version=PROMPT_VERSION)),
+    ]
+    timings = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Warm-up step '{name}' failed: {e}")
+        timings[name] = round(time.perf_counter() - start, 4)
+    logger.info(f"Agent warmed up: {timings}")
+    return timings
+
 if __name__ == "__main__":
     # Test the agent
     question = "What is artificial intelligence?"
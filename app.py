@@ -1,10 +1,11 @@
-from flask import Flask, render_template, request, jsonify, make_response
-from agent import process_question
+from flask import Flask, render_template, request, jsonify, make_response, Response, stream_with_context
+from agent import process_question, process_questions, process_question_stream, record_feedback, warm_up, BATCH_CONCURRENCY
 import os
 import uuid
 from dotenv import load_dotenv
 import logging
 import json
+from metrics import registry, PROMETHEUS_CONTENT_TYPE
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -17,9 +18,50 @@ load_dotenv()
 if not os.environ.get("OPENAI_API_KEY"):
     print("Warning: OPENAI_API_KEY is not set. Please set it in the .env file.")
 
+# Build clients, graph and prompt before serving instead of on the first request
+WARM_UP = os.getenv("WARM_UP", "true").lower() == "true"
+
+# Largest batch accepted by /ask/batch
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "50"))
+
 # Initialize Flask app
 app = Flask(__name__)
 
+def has_citations(result):
+    """Check whether an answer used search results or cites its sources"""
+    return result.get('has_search_results', False) or any(term in (result['answer'] or '').lower() for term in 
+                           ['source', 'according to', 'research', 'found', 'search'])
+
+def sse_event(event, data):
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def parse_batch_request(data):
+    """Validate a /ask/batch body, returning (questions, concurrency, error)"""
+    questions = (data or {}).get('questions')
+    if not isinstance(questions, list) or not questions:
+        return None, None, 'questions must be a non-empty list'
+    if len(questions) > BATCH_MAX_SIZE:
+        return None, None, f'At most {BATCH_MAX_SIZE} questions per batch'
+    if not all(isinstance(q, str) and q.strip() for q in questions):
+        return None, None, 'Every question must be a non-empty string'
+    try:
+        concurrency = int(data.get('concurrency', BATCH_CONCURRENCY))
+    except (ValueError, TypeError):
+        return None, None, 'concurrency must be an integer'
+    return questions, max(1, min(concurrency, BATCH_CONCURRENCY)), None
+
+def batch_item_response(result):
+    """Shape one process_questions result for the /ask/batch response"""
+    if 'error' in result:
+        return {'question': result['question'], 'error': result['error'], 'trace_id': result.get('trace_id')}
+    return {
+        'question': result['question'],
+        'answer': result['answer'],
+        'trace_id': result.get('trace_id'),
+        'has_citations': has_citations(result)
+    }
+
 @app.route('/')
 def home():
     """Render the home page"""
@@ -54,8 +96,8 @@ def ask():
         # Create response with answer and metadata
         response = jsonify({
             'answer': result['answer'],
-            'has_citations': result.get('has_search_results', False) or any(term in result['answer'].lower() for term in 
-                           ['source', 'according to', 'research', 'found', 'search'])
+            'trace_id': result.get('trace_id'),
+            'has_citations': has_citations(result)
         })
         
         # Set user_id cookie if it doesn't exist
@@ -68,18 +110,74 @@ def ask():
         # Handle any errors
         return jsonify({'error': str(e)}), 500
 
+@app.route('/ask/batch', methods=['POST'])
+def ask_batch():
+    """Answer a list of questions in one request; failed items carry an error"""
+    questions, concurrency, error = parse_batch_request(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        user_id = request.cookies.get('user_id') or str(uuid.uuid4())
+        results = process_questions(questions, concurrency, user_id)
+        return jsonify({'results': [batch_item_response(r) for r in results]})
+    except Exception as e:
+        logger.error(f"Error processing batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/ask/stream', methods=['POST'])
+def ask_stream():
+    """Process a question and stream the answer tokens as Server-Sent Events"""
+    question = request.form.get('question', '')
+    
+    if not question:
+        return jsonify({'error': 'No question provided'}), 400
+    
+    # Get user ID from cookie or generate a new one
+    user_id = request.cookies.get('user_id') or str(uuid.uuid4())
+    
+    def generate():
+        try:
+            for event in process_question_stream(question, user_id):
+                if event['type'] == 'token':
+                    yield sse_event('token', {'content': event['content']})
+                else:
+                    yield sse_event('done', {
+                        'answer': event['answer'],
+                        'trace_id': event['trace_id'],
+                        'has_citations': has_citations(event)
+                    })
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield sse_event('error', {'error': str(e)})
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    
+    # Set user_id cookie if it doesn't exist
+    if not request.cookies.get('user_id'):
+        response.set_cookie('user_id', user_id, max_age=60*60*24*30)  # 30 days
+    
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Expose in-process latency, token and cache metrics for Prometheus"""
+    return Response(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.route('/score', methods=['POST'])
 def score():
-    """Add a toxicity score to a previous answer"""
+    """Attach an expert feedback score to the trace of a previous answer"""
     try:
         # Get required parameters
         data = request.get_json() if request.is_json else request.form
         
-        question = data.get('question')
+        trace_id = data.get('trace_id')
         toxicity = data.get('toxicity')
         
-        if not question:
-            return jsonify({'error': 'Question is required'}), 400
+        if not trace_id:
+            return jsonify({'error': 'trace_id is required'}), 400
         
         if toxicity is None:
             return jsonify({'error': 'Toxicity score is required'}), 400
@@ -91,18 +189,12 @@ def score():
         except (ValueError, TypeError):
             return jsonify({'error': 'Toxicity must be a number between 0 and 1'}), 400
         
-        # Get user ID from cookie or generate a new one
-        user_id = request.cookies.get('user_id')
-        if not user_id:
-            user_id = str(uuid.uuid4())
-        
-        # Process the question again, but this time with the toxicity score
-        # This will trigger both user feedback scoring and automated LLM evaluation
-        result = process_question(question, user_id, toxicity_value)
+        # Queue the score on the existing trace; no search or LLM work is repeated
+        record_feedback(trace_id, toxicity_value)
         
         return jsonify({
             'success': True,
-            'message': f'Expert feedback score of {toxicity_value} received and applied. Automated toxicity evaluation also performed.'
+            'message': f'Expert feedback score of {toxicity_value} received for trace {trace_id}.'
         })
         
     except Exception as e:
@@ -114,5 +206,9 @@ if __name__ == '__main__':
     os.makedirs('templates', exist_ok=True)
     os.makedirs('static', exist_ok=True)
     
+    # Warm up before taking traffic
+    if WARM_UP:
+        warm_up()
+    
     # Run the Flask app
     app.run(debug=True)
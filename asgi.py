@@ -0,0 +1,170 @@
+"""
+ASGI entry point for the Q&A agent.
+Serves the same routes as app.py from an async Quart app backed by the async
+agent, so one process can hold many in-flight questions.
+
+Run with:
+    hypercorn asgi:app --bind 127.0.0.1:8000
+"""
+
+from quart import Quart, render_template, request, jsonify, make_response, Response
+from agent import aprocess_question, aprocess_question_stream, process_questions, record_feedback, warm_up
+from app import has_citations, sse_event, parse_batch_request, batch_item_response, WARM_UP
+from metrics import registry, PROMETHEUS_CONTENT_TYPE
+import os
+import asyncio
+import uuid
+from dotenv import load_dotenv
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Check if OpenAI API key is set
+if not os.environ.get("OPENAI_API_KEY"):
+    print("Warning: OPENAI_API_KEY is not set. Please set it in the .env file.")
+
+# Initialize Quart app
+app = Quart(__name__)
+
+@app.before_serving
+async def startup():
+    """Warm up the agent before the server accepts connections"""
+    if WARM_UP:
+        await asyncio.to_thread(warm_up)
+
+@app.route('/')
+async def home():
+    """Render the home page"""
+    return await render_template('index.html')
+
+@app.route('/ask', methods=['POST'])
+async def ask():
+    """Process a question and return the answer"""
+    form = await request.form
+    question = form.get('question', '')
+
+    if not question:
+        return jsonify({'error': 'No question provided'}), 400
+
+    try:
+        # Get user ID from cookie or generate a new one
+        user_id = request.cookies.get('user_id') or str(uuid.uuid4())
+
+        # Check if toxicity score is provided (optional)
+        toxicity = None
+        if 'toxicity' in form:
+            try:
+                toxicity = float(form.get('toxicity'))
+            except (ValueError, TypeError):
+                logger.warning("Invalid toxicity value provided, ignoring")
+
+        result = await aprocess_question(question, user_id, toxicity)
+
+        response = await make_response(jsonify({
+            'answer': result['answer'],
+            'trace_id': result.get('trace_id'),
+            'has_citations': has_citations(result)
+        }))
+
+        # Set user_id cookie if it doesn't exist
+        if not request.cookies.get('user_id'):
+            response.set_cookie('user_id', user_id, max_age=60*60*24*30)  # 30 days
+
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/ask/batch', methods=['POST'])
+async def ask_batch():
+    """Answer a list of questions in one request; failed items carry an error"""
+    questions, concurrency, error = parse_batch_request(await request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        user_id = request.cookies.get('user_id') or str(uuid.uuid4())
+        # The batch runs on its own bounded thread pool, off the event loop
+        results = await asyncio.to_thread(process_questions, questions, concurrency, user_id)
+        return jsonify({'results': [batch_item_response(r) for r in results]})
+    except Exception as e:
+        logger.error(f"Error processing batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/ask/stream', methods=['POST'])
+async def ask_stream():
+    """Process a question and stream the answer tokens as Server-Sent Events"""
+    form = await request.form
+    question = form.get('question', '')
+
+    if not question:
+        return jsonify({'error': 'No question provided'}), 400
+
+    user_id = request.cookies.get('user_id') or str(uuid.uuid4())
+
+    async def generate():
+        try:
+            async for event in aprocess_question_stream(question, user_id):
+                if event['type'] == 'token':
+                    yield sse_event('token', {'content': event['content']})
+                else:
+                    yield sse_event('done', {
+                        'answer': event['answer'],
+                        'trace_id': event['trace_id'],
+                        'has_citations': has_citations(event)
+                    })
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield sse_event('error', {'error': str(e)})
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.timeout = None
+
+    if not request.cookies.get('user_id'):
+        response.set_cookie('user_id', user_id, max_age=60*60*24*30)  # 30 days
+
+    return response
+
+@app.route('/metrics')
+async def metrics():
+    """Expose in-process latency, token and cache metrics for Prometheus"""
+    return Response(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/score', methods=['POST'])
+async def score():
+    """Attach an expert feedback score to the trace of a previous answer"""
+    try:
+        data = await request.get_json() if request.is_json else await request.form
+
+        trace_id = data.get('trace_id')
+        toxicity = data.get('toxicity')
+
+        if not trace_id:
+            return jsonify({'error': 'trace_id is required'}), 400
+
+        if toxicity is None:
+            return jsonify({'error': 'Toxicity score is required'}), 400
+
+        try:
+            toxicity_value = float(toxicity)
+            if not (0 <= toxicity_value <= 1):
+                return jsonify({'error': 'Toxicity must be between 0 and 1'}), 400
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Toxicity must be a number between 0 and 1'}), 400
+
+        record_feedback(trace_id, toxicity_value)
+
+        return jsonify({
+            'success': True,
+            'message': f'Expert feedback score of {toxicity_value} received for trace {trace_id}.'
+        })
+
+    except Exception as e:
+        logger.error(f"Error adding toxicity score: {e}")
+        return jsonify({'error': str(e)}), 500
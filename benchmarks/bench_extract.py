@@ -0,0 +1,70 @@
+"""
+Microbenchmark for HTML-to-text extraction.
+Compares the BeautifulSoup extractor with the streaming extractor on the saved
+HTML fixtures in benchmarks/fixtures.
+
+Usage:
+    python benchmarks/bench_extract.py [--repeat 20] [--max-length 1000]
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_extract import extract_text_soup, extract_text_streaming, EXTRACT_CHUNK_SIZE, EXTRACT_MAX_BYTES
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def chunked(data: bytes, size: int = EXTRACT_CHUNK_SIZE):
+    """Yield the body in network-sized chunks, like response.iter_content()."""
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+def measure(fn, repeat: int):
+    """Return (median seconds per call, peak bytes allocated, result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    return timings[len(timings) // 2], peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-length", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<20}{'size':>10}{'soup ms':>10}{'stream ms':>11}{'speedup':>9}{'soup KiB':>10}{'stream KiB':>12}  same output")
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            body = f.read()
+
+        soup_time, soup_peak, soup_text = measure(
+            lambda: extract_text_soup(body.decode("utf-8"), args.max_length), args.repeat
+        )
+        stream_time, stream_peak, stream_text = measure(
+            lambda: extract_text_streaming(chunked(body), args.max_length, EXTRACT_MAX_BYTES), args.repeat
+        )
+
+        # The streaming path also drops <noscript>/<template> text, so outputs can differ on such pages
+        same = soup_text == stream_text
+        print(
+            f"{os.path.basename(path):<20}{len(body) // 1024:>8}Ki"
+            f"{soup_time * 1000:>10.2f}{stream_time * 1000:>11.2f}{soup_time / stream_time:>8.1f}x"
+            f"{soup_peak // 1024:>10}{stream_peak // 1024:>12}  {same}"
+        )
+
+if __name__ == "__main__":
+    main()
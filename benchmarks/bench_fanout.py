@@ -0,0 +1,83 @@
+"""
+Benchmark for the parallel agent graph.
+Runs the same questions through the linear and the parallel graph with OpenAI,
+DuckDuckGo and the Langfuse prompt fetch replaced by fakes of fixed latency, and
+reports request latency per graph shape. With a cold prompt fetch the linear
+graph pays search + prompt + generation; the parallel graph pays the slower of
+search and prompt, then generation.
+
+Usage:
+    python benchmarks/bench_fanout.py [--prompt-latency 0.15] [--search-latency 0.3]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The benchmark must never reach the real services
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ["LANGFUSE_TRACING_ENABLED"] = "false"
+
+import agent
+import search
+from benchmarks.fakes import FakeOpenAI, FakeDDGS, RecordingLangfuse
+from benchmarks.load_test import percentile
+
+QUESTIONS = [
+    "What is the latest news about the Mars rover today?",
+    "Who won the most recent Champions League final?",
+    "What are the current interest rates in the euro area?",
+    "When is the next total solar eclipse visible in Europe?",
+]
+
+class ColdPromptCache:
+    """Prompt cache stand-in that pays the fetch latency once per request, as after expiry."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.stats = {}
+        self.cold = True
+
+    def get(self, name, label=None, version=None):
+        if self.cold:
+            time.sleep(self.latency)
+            self.cold = False
+        return {"template": agent.FALLBACK_PROMPT, "config": {}, "version": 1}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompt-latency", type=float, default=0.15, help="Seconds per prompt fetch")
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds to first token")
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    agent.client = FakeOpenAI(args.llm_latency, 0, 20)
+    agent.langfuse_client = RecordingLangfuse()
+    agent.prompt_cache = ColdPromptCache(args.prompt_latency)
+    agent.response_cache = None
+    FakeDDGS.latency = args.search_latency
+    search.DDGS = FakeDDGS
+    search.set_search_cache(None)
+
+    print(f"prompt {args.prompt_latency * 1000:.0f} ms, search {args.search_latency * 1000:.0f} ms, "
+          f"llm {args.llm_latency * 1000:.0f} ms, {args.requests} requests per graph")
+    print(f"{'graph':<10}{'p50 ms':>10}{'p95 ms':>10}")
+    p50 = {}
+    for shape in ("linear", "parallel"):
+        graph = agent.create_agent(shape)
+        latencies = []
+        for i in range(args.requests):
+            agent.prompt_cache.cold = True
+            start = time.perf_counter()
+            graph.invoke({"question": QUESTIONS[i % len(QUESTIONS)]})
+            latencies.append(time.perf_counter() - start)
+        p50[shape] = percentile(latencies, 50) * 1000
+        print(f"{shape:<10}{p50[shape]:>10.1f}{percentile(latencies, 95) * 1000:>10.1f}")
+    print(f"critical path saved at p50: {p50['linear'] - p50['parallel']:.1f} ms")
+
+if __name__ == "__main__":
+    main()
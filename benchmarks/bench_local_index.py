@@ -0,0 +1,88 @@
+"""
+Benchmark for the local BM25 index.
+Builds a synthetic corpus of short passages with a Zipf-distributed vocabulary
+in several incremental segments, then times queries before and after
+compaction and reports index size on disk.
+
+Usage:
+    python benchmarks/bench_local_index.py [--passages 1000000] [--segments 10]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_index import LocalIndex
+from benchmarks.load_test import percentile
+
+def make_vocabulary(size: int, rng: np.random.Generator) -> np.ndarray:
+    """Distinct pseudo-words, most frequent first."""
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    words = {"".join(rng.choice(letters, rng.integers(4, 10))) for _ in range(size * 2)}
+    return np.array(sorted(words)[:size])
+
+def passages(vocabulary: np.ndarray, count: int, words: int, start: int, rng: np.random.Generator):
+    """Yield passages whose words follow a Zipf distribution over the vocabulary."""
+    ranks = np.minimum(rng.zipf(1.2, size=(count, words)) - 1, len(vocabulary) - 1)
+    for i, row in enumerate(ranks):
+        yield {"title": f"Passage {start + i}", "body": " ".join(vocabulary[row]), "href": f"https://example.com/{start + i}"}
+
+def time_queries(index: LocalIndex, queries, repeat: int = 3):
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, max_results=3)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passages", type=int, default=1_000_000)
+    parser.add_argument("--segments", type=int, default=10, help="Incremental adds before compaction")
+    parser.add_argument("--words", type=int, default=40, help="Words per passage")
+    parser.add_argument("--vocabulary", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    directory = tempfile.mkdtemp(prefix="bench-index-")
+    try:
+        index = LocalIndex(directory, max_segments=args.segments + 1)
+        per_segment = args.passages // args.segments
+        start = time.perf_counter()
+        for i in range(args.segments):
+            index.add(passages(vocabulary, per_segment, args.words, i * per_segment, rng))
+        build_s = time.perf_counter() - start
+        print(f"built {index.stats()} in {build_s:.1f} s, {directory_size(directory) / 1e6:.0f} MB on disk")
+
+        # Queries of 2-5 words drawn from the same distribution, like questions after stopword removal
+        ranks = np.minimum(rng.zipf(1.2, size=(args.queries, 5)) - 1, len(vocabulary) - 1)
+        queries = [" ".join(vocabulary[row[: rng.integers(2, 6)]]) for row in ranks]
+
+        start = time.perf_counter()
+        index = LocalIndex(directory)
+        print(f"opened in {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(f"{'segments':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for label in (f"{args.segments}", "1"):
+            if label == "1":
+                index.compact()
+            time_queries(index, queries[:50], repeat=1)
+            latencies = time_queries(index, queries)
+            print(f"{label:<10}" + "".join(f"{percentile(latencies, p) * 1000:>10.3f}" for p in (50, 95, 99)))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark for search routing in determine_search_need.
+Compares the original substring rule, the whole-word keyword rule and the
+trained router on a labeled question set. Reports the search rate, accuracy,
+precision/recall and cost per call.
+
+Usage:
+    python benchmarks/bench_router.py [--data benchmarks/data/router_eval.jsonl]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routing import SearchRouter, SEARCH_KEYWORDS, keyword_rule
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "router_eval.jsonl")
+
+def legacy_rule(question: str) -> bool:
+    """The original substring matching from determine_search_need."""
+    question = question.lower()
+    needs_search = any(keyword in question for keyword in SEARCH_KEYWORDS)
+    if "?" in question or any(question.startswith(k) for k in ["who", "what", "when", "where", "why", "how"]):
+        needs_search = True
+    return needs_search
+
+def evaluate(name, predict, examples, repeat):
+    """Print quality and per-call cost for one routing strategy."""
+    predictions = [predict(q) for q, _ in examples]
+    tp = sum(p and label for p, (_, label) in zip(predictions, examples))
+    fp = sum(p and not label for p, (_, label) in zip(predictions, examples))
+    fn = sum(not p and label for p, (_, label) in zip(predictions, examples))
+    correct = sum(p == label for p, (_, label) in zip(predictions, examples))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q, _ in examples:
+            predict(q)
+    per_call_us = (time.perf_counter() - start) / (repeat * len(examples)) * 1e6
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    print(
+        f"{name:<16}{sum(predictions) / len(examples):>12.1%}{correct / len(examples):>10.1%}"
+        f"{precision:>11.1%}{recall:>8.1%}{per_call_us:>10.2f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.data, "r", encoding="utf-8") as f:
+        examples = [(r["question"], bool(r["needs_search"])) for r in map(json.loads, f) if r]
+
+    router = SearchRouter.load()
+    searches = sum(label for _, label in examples)
+    print(f"{len(examples)} labeled questions, {searches / len(examples):.1%} where search helps\n")
+    print(f"{'strategy':<16}{'search rate':>12}{'accuracy':>10}{'precision':>11}{'recall':>8}{'us/call':>10}")
+    evaluate("legacy substring", legacy_rule, examples, args.repeat)
+    evaluate("keyword regex", keyword_rule, examples, args.repeat)
+    evaluate("router model", router.needs_search, examples, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Start-up benchmark for the agent module.
+Measures, in fresh interpreters, how long `import agent` takes and how long
+the first question takes afterwards, with and without `agent.warm_up()`.
+OpenAI, DuckDuckGo and the prompt fetch are replaced by the zero-latency fakes
+from benchmarks/fakes.py, so only the agent's own start-up work is timed.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, os, sys, time
+sys.path.insert(0, os.getcwd())
+start = time.perf_counter()
+import agent
+result = {"import_s": time.perf_counter() - start}
+
+import search
+from prompt_cache import PromptCache
+from benchmarks.fakes import FakeOpenAI, FakeDDGS, FakePrompt
+
+agent.client = FakeOpenAI(latency=0, tokens_per_second=0, answer_tokens=20)
+FakeDDGS.latency = 0
+search.DDGS = FakeDDGS
+search.set_search_cache(None)
+agent.semantic_cache = None
+agent.prompt_cache = PromptCache(
+    lambda name, label, version: {"template": FakePrompt.prompt, "config": FakePrompt.config, "version": 1},
+    cache_dir=None,
+)
+
+if sys.argv[1] == "warm":
+    start = time.perf_counter()
+    agent.warm_up()
+    result["warm_up_s"] = time.perf_counter() - start
+
+start = time.perf_counter()
+agent.process_question("What is the latest news about AI?")
+result["first_request_s"] = time.perf_counter() - start
+start = time.perf_counter()
+agent.process_question("Who won the 2022 FIFA World Cup?")
+result["second_request_s"] = time.perf_counter() - start
+print(json.dumps(result))
+"""
+
+def probe(mode: str) -> dict:
+    """Run one fresh interpreter and return its timings."""
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "sk-startup"), LANGFUSE_TRACING_ENABLED="false")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, mode], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6}{'import':>10}{'warm_up':>10}{'1st req':>10}{'2nd req':>10}   (median of {args.runs}, ms)")
+    for mode in ("cold", "warm"):
+        try:
+            runs = [probe(mode) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"{mode:<6}failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        medians = {
+            key: statistics.median(run[key] for run in runs) * 1000
+            for key in ("import_s", "warm_up_s", "first_request_s", "second_request_s")
+            if key in runs[0]
+        }
+        cells = [medians.get(key) for key in ("import_s", "warm_up_s", "first_request_s", "second_request_s")]
+        print(f"{mode:<6}" + "".join(f"{c:>10.0f}" if c is not None else f"{'-':>10}" for c in cells))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark for the local toxicity pre-screen.
+Measures how the shipped screen agrees with LLM judge labels on a held-out
+answer set: recall of toxic answers (those the judge scores 0.5 or more),
+the share of answers still sent to the judge, and cost per call.
+
+Usage:
+    python benchmarks/bench_toxicity_screen.py [--data benchmarks/data/toxicity_eval.jsonl]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from toxicity_screen import ToxicityScreen
+from train_toxicity_screen import load_examples
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "toxicity_eval.jsonl")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--model", default=None, help="Screen model file (the shipped one by default)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    examples = load_examples([args.data])
+    screen = ToxicityScreen.load(args.model, calibration_rate=0) if args.model else ToxicityScreen.load(calibration_rate=0)
+    results = [screen.score(answer) for answer, _ in examples]
+    flagged = [r.decision == "flagged" for r in results]
+    toxic = sum(label for _, label in examples)
+    caught = sum(f and label for f, (_, label) in zip(flagged, examples))
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for answer, _ in examples:
+            screen.score(answer)
+    per_call_us = (time.perf_counter() - start) / (args.repeat * len(examples)) * 1e6
+
+    print(f"{len(examples)} judge-labeled answers, {toxic} toxic, threshold {screen.threshold}\n")
+    print(f"recall against judge: {caught}/{toxic} ({caught / toxic:.1%})")
+    print(f"precision:            {caught / max(1, sum(flagged)):.1%}")
+    print(f"sent to judge:        {sum(flagged) / len(examples):.1%} (plus the calibration sample)")
+    print(f"cost per call:        {per_call_us:.1f} us")
+    missed = [answer for f, (answer, label) in zip(flagged, examples) if label and not f]
+    for answer in missed:
+        print(f"  missed: {answer}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Local stand-ins for the services the agent calls, used by the replay benchmark.
+FakeOpenAI mimics the chat completions API with configurable latency and token
+rate, FakeDDGS mimics duckduckgo_search.DDGS, and RecordingLangfuse records
+client calls instead of sending them. `offline_agent` swaps the fakes into the
+agent for scripts that should run without OpenAI or DuckDuckGo.
+"""
+
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+def fake_answer(messages: List[Dict[str, str]], tokens: int) -> List[str]:
+    """Return `tokens` deterministic answer tokens for a conversation."""
+    words = (messages[-1]["content"] if messages else "answer").split() or ["answer"]
+    return [f"{words[i % len(words)]} " for i in range(tokens)]
+
+def fake_usage(messages: List[Dict[str, str]], completion_tokens: int) -> SimpleNamespace:
+    """Approximate token usage, counting four characters per prompt token."""
+    prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+    )
+
+class FakeCompletions:
+    """`chat.completions` with a time-to-first-token and a fixed token rate."""
+
+    def __init__(self, latency: float, tokens_per_second: float, answer_tokens: int):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def create(self, model: str = "", messages: Optional[List[Dict[str, str]]] = None, stream: bool = False, **kwargs):
+        self._count()
+        messages = messages or []
+        tokens = fake_answer(messages, self.answer_tokens)
+        if kwargs.get("response_format", {}).get("type") == "json_object":
+            tokens = ['{"results": []}']
+        time.sleep(self.latency)
+        if stream:
+            usage = fake_usage(messages, len(tokens)) if kwargs.get("stream_options", {}).get("include_usage") else None
+            return self._stream(tokens, usage)
+        time.sleep(len(tokens) * self._token_delay())
+        message = SimpleNamespace(content="".join(tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=fake_usage(messages, len(tokens)))
+
+    def _stream(self, tokens: List[str], usage: Optional[SimpleNamespace] = None):
+        for token in tokens:
+            time.sleep(self._token_delay())
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))], usage=None)
+        if usage is not None:
+            yield SimpleNamespace(choices=[], usage=usage)
+
+class FakeAsyncCompletions(FakeCompletions):
+    """Async `chat.completions` with the same timing model."""
+
+    async def create(self, model: str = "", messages: Optional[List[Dict[str, str]]] = None, stream: bool = False, **kwargs):
+        self._count()
+        messages = messages or []
+        tokens = fake_answer(messages, self.answer_tokens)
+        await asyncio.sleep(self.latency)
+        if stream:
+            usage = fake_usage(messages, len(tokens)) if kwargs.get("stream_options", {}).get("include_usage") else None
+            return self._astream(tokens, usage)
+        await asyncio.sleep(len(tokens) * self._token_delay())
+        message = SimpleNamespace(content="".join(tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=fake_usage(messages, len(tokens)))
+
+    async def _astream(self, tokens: List[str], usage: Optional[SimpleNamespace] = None):
+        for token in tokens:
+            await asyncio.sleep(self._token_delay())
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))], usage=None)
+        if usage is not None:
+            yield SimpleNamespace(choices=[], usage=usage)
+
+class FakeOpenAI:
+    """OpenAI-compatible client stub."""
+
+    completions_class = FakeCompletions
+
+    def __init__(self, latency: float = 0.3, tokens_per_second: float = 80.0, answer_tokens: int = 60):
+        """
+        Args:
+            latency: Seconds before the first token
+            tokens_per_second: Generation speed after the first token
+            answer_tokens: Number of tokens in every answer
+        """
+        self.chat = SimpleNamespace(completions=self.completions_class(latency, tokens_per_second, answer_tokens))
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    """AsyncOpenAI-compatible client stub."""
+
+    completions_class = FakeAsyncCompletions
+
+class FakeDDGS:
+    """`duckduckgo_search.DDGS` stub returning canned results after a delay."""
+
+    latency = 0.2
+
+    def __init__(self, timeout: Optional[float] = None, **kwargs):
+        self.timeout = timeout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def text(self, query: str, max_results: int = 3) -> List[Dict[str, str]]:
+        time.sleep(self.latency)
+        return [
+            {
+                "title": f"Result {i + 1} for {query}",
+                "body": f"Snippet {i + 1} about {query}. " * 4,
+                "href": f"https://example.com/{i + 1}",
+            }
+            for i in range(max_results)
+        ]
+
+class FakePrompt:
+    """Langfuse prompt object with a fixed template."""
+
+    prompt = (
+        "You are a helpful assistant that provides clear and concise answers. "
+        "When you use information from search results, cite your sources. "
+        "{{search_context}}"
+    )
+    config = {"model": "gpt-4o-mini", "temperature": 0}
+    version = 1
+
+class RecordingLangfuse:
+    """
+    Langfuse client stub that records method calls and does no I/O.
+
+    Any method not defined here is accepted and recorded too, so new SDK calls
+    in the agent do not break the benchmark.
+    """
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def get_prompt(self, name: str, **kwargs) -> FakePrompt:
+        self._record("get_prompt")
+        return FakePrompt()
+
+    @contextmanager
+    def start_as_current_span(self, **kwargs):
+        self._record("start_as_current_span")
+        yield SimpleNamespace(update=lambda **kw: None, end=lambda **kw: None)
+
+    @contextmanager
+    def start_as_current_observation(self, as_type: str = "span", **kwargs):
+        self._record(f"start_as_current_observation:{as_type}")
+        yield SimpleNamespace(update=lambda **kw: None, end=lambda **kw: None)
+
+    def get_current_trace_id(self) -> str:
+        self._record("get_current_trace_id")
+        return "0" * 32
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            self._record(name)
+        return method
+
+@contextmanager
+def offline_agent():
+    """Answer with the fakes instead of OpenAI and DuckDuckGo, then restore the real clients."""
+    import agent
+    import search
+    from evaluation import EvaluationQueue
+
+    saved = (agent.__dict__.get("client"), agent.response_cache, agent.evaluation_queue, search.DDGS, search.search_cache)
+    agent.client = FakeOpenAI(latency=0.01, tokens_per_second=0, answer_tokens=20)
+    agent.response_cache = None
+    agent.evaluation_queue = EvaluationQueue(agent.record_toxicity_evaluation)
+    search.DDGS = FakeDDGS
+    search.set_search_cache(None)
+    try:
+        yield
+    finally:
+        # Background judge calls must also finish on the fake client
+        agent.evaluation_queue.shutdown()
+        agent.client, agent.response_cache, agent.evaluation_queue, search.DDGS, cache = saved
+        search.set_search_cache(cache)
@@ -0,0 +1,90 @@
+"""
+HTTP load test for the /ask endpoint.
+Fires questions at a running server with a fixed number of concurrent clients
+and reports throughput and latency percentiles. Run it once against the Flask
+server and once against the ASGI server to compare them.
+
+Usage:
+    python app.py                                   # Flask, port 5000
+    hypercorn asgi:app --bind 127.0.0.1:8000        # ASGI, port 8000
+
+    python benchmarks/load_test.py --url http://127.0.0.1:5000/ask --concurrency 50 --requests 500
+    python benchmarks/load_test.py --url http://127.0.0.1:8000/ask --concurrency 50 --requests 500
+"""
+
+import ssl
+import time
+import asyncio
+import argparse
+import statistics
+
+import httpx
+
+DEFAULT_QUESTIONS = [
+    "What is artificial intelligence?",
+    "Who won the 2022 FIFA World Cup?",
+    "Write a haiku about autumn.",
+    "What is the capital of Australia?",
+    "Explain recursion in simple terms.",
+]
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run(url: str, concurrency: int, total: int, timeout: float):
+    """Send `total` requests with `concurrency` workers and collect latencies."""
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    # One single-connection client per worker: a shared pool rescans every
+    # keep-alive connection on each request, which at high concurrency makes
+    # the load generator, not the server, the bottleneck
+    ssl_context = ssl.create_default_context()
+
+    async def worker():
+        nonlocal errors
+        async with httpx.AsyncClient(timeout=timeout, verify=ssl_context, limits=httpx.Limits(max_connections=1)) as client:
+            for i in counter:
+                question = DEFAULT_QUESTIONS[i % len(DEFAULT_QUESTIONS)]
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, data={"question": question})
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except Exception:
+                    errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000/ask")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    latencies, errors, elapsed = asyncio.run(run(args.url, args.concurrency, args.requests, args.timeout))
+
+    print(f"url:          {args.url}")
+    print(f"concurrency:  {args.concurrency}")
+    print(f"completed:    {len(latencies)}  errors: {errors}")
+    print(f"elapsed:      {elapsed:.2f}s")
+    print(f"throughput:   {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        print(f"latency mean: {statistics.mean(latencies) * 1000:.0f} ms")
+        for pct in (50, 95, 99):
+            print(f"latency p{pct}:  {percentile(latencies, pct) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Offline replay benchmark for the Q&A pipeline.
+Replays a question corpus through process_question, the compiled graph and the
+Flask /ask route at a fixed concurrency, with OpenAI, DuckDuckGo and Langfuse
+replaced by the local fakes in benchmarks/fakes.py. Reports p50/p95/p99
+latency per node and per request, throughput and memory, and writes them to a
+JSON file so runs can be compared across commits.
+
+Usage:
+    python benchmarks/replay.py --concurrency 8 --requests 200 --output replay.json
+    python benchmarks/replay.py --output replay-new.json --baseline replay.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import platform
+import threading
+import functools
+import subprocess
+import tracemalloc
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The benchmark must never reach the real services
+os.environ.setdefault("OPENAI_API_KEY", "sk-replay")
+os.environ["LANGFUSE_TRACING_ENABLED"] = "false"
+
+import agent
+import search
+import app as flask_app
+from prompt_cache import PromptCache
+from benchmarks.fakes import FakeOpenAI, FakeAsyncOpenAI, FakeDDGS, RecordingLangfuse
+from benchmarks.load_test import percentile
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "router_eval.jsonl")
+MODES = ("process_question", "graph", "flask")
+NODES = {
+    "determine_search": "determine_search_need",
+    "search": "perform_search",
+    "prompt": "resolve_prompt",
+    "generate": "generate_response",
+    "toxicity": "evaluate_toxicity",
+}
+
+class NodeTimer:
+    """Thread-safe collector of per-node durations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, List[float]] = {name: [] for name in NODES}
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.durations[name].append(elapsed)
+        return timed
+
+    def reset(self):
+        with self._lock:
+            self.durations = {name: [] for name in NODES}
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Count and p50/p95/p99 in milliseconds."""
+    return {
+        "count": len(values),
+        **{f"p{pct}_ms": round(percentile(values, pct) * 1000, 2) for pct in (50, 95, 99)},
+    }
+
+def install_fakes(args, timer: NodeTimer) -> RecordingLangfuse:
+    """Swap every external dependency for a local fake and time the graph nodes."""
+    agent.client = FakeOpenAI(args.llm_latency, args.token_rate, args.answer_tokens)
+    agent.async_client = FakeAsyncOpenAI(args.llm_latency, args.token_rate, args.answer_tokens)
+    FakeDDGS.latency = args.search_latency
+    search.DDGS = FakeDDGS
+
+    langfuse = RecordingLangfuse()
+    agent.langfuse_client = langfuse
+    agent.prompt_cache = PromptCache(agent.fetch_prompt, cache_dir=tempfile.mkdtemp(prefix="replay-prompts-"))
+
+    if not args.caches:
+        agent.semantic_cache = None
+        agent.response_cache = None
+        search.set_search_cache(None)
+
+    for name, attr in NODES.items():
+        setattr(agent, attr, timer.wrap(name, getattr(agent, attr)))
+    # Rebuild the graph so it picks up the timed nodes
+    agent.agent = agent.create_agent()
+    return langfuse
+
+def wait_for_evaluations(timeout: float):
+    """Block until the background toxicity queue has processed every job."""
+    stats = agent.evaluation_queue.stats
+    deadline = time.monotonic() + timeout
+    while stats["completed"] + stats["failed"] < stats["submitted"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def make_request(mode: str) -> Callable[[str], None]:
+    """Return a callable that sends one question through the given entry point."""
+    if mode == "process_question":
+        return lambda question: agent.process_question(question)
+    if mode == "graph":
+        return lambda question: agent.agent.invoke({"question": question})
+
+    def post(question: str):
+        response = flask_app.app.test_client().post("/ask", data={"question": question})
+        if response.status_code != 200:
+            raise RuntimeError(f"/ask returned {response.status_code}")
+    return post
+
+def run_mode(mode: str, questions: List[str], args, timer: NodeTimer) -> Dict:
+    """Replay the corpus through one entry point and summarize the run."""
+    timer.reset()
+    send = make_request(mode)
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            send(questions[i % len(questions)])
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+        except Exception:
+            with lock:
+                errors += 1
+
+    if args.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    wait_for_evaluations(args.eval_timeout)
+
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency": summarize(latencies),
+        "nodes": {name: summarize(values) for name, values in timer.durations.items() if values},
+    }
+    if args.trace_memory:
+        result["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+    return result
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def print_report(report: Dict, baseline: Dict = None):
+    """Print a table of the run, with deltas against a baseline report if given."""
+    for mode, result in report["modes"].items():
+        print(f"\n{mode}: {result['requests']} ok, {result['errors']} errors, "
+              f"{result['throughput_rps']} req/s")
+        rows = [("request", result["latency"])] + list(result["nodes"].items())
+        old = (baseline or {}).get("modes", {}).get(mode)
+        for name, stats in rows:
+            line = f"  {name:<17}{stats['count']:>6}" + "".join(f"{stats[f'p{p}_ms']:>10.1f}" for p in (50, 95, 99))
+            old_stats = None
+            if old:
+                old_stats = old["latency"] if name == "request" else old["nodes"].get(name)
+            if old_stats and old_stats["p95_ms"]:
+                line += f"   p95 {(stats['p95_ms'] / old_stats['p95_ms'] - 1):+.1%}"
+            print(line)
+        if old and old["throughput_rps"]:
+            print(f"  throughput vs baseline ({baseline['commit']}): "
+                  f"{result['throughput_rps'] / old['throughput_rps'] - 1:+.1%}")
+    print(f"\npeak RSS: {report['peak_rss_mb']} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL file with a 'question' field per line")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds to first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Tokens per second after the first")
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--caches", action="store_true", help="Keep the semantic, search and response caches enabled")
+    parser.add_argument("--trace-memory", action="store_true", help="Record Python allocation peaks (slower)")
+    parser.add_argument("--eval-timeout", type=float, default=60)
+    parser.add_argument("--output", default="replay.json")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+
+    timer = NodeTimer()
+    langfuse = install_fakes(args, timer)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "modes": {},
+    }
+    for mode in args.modes:
+        report["modes"][mode] = run_mode(mode, questions, args, timer)
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    report["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+    report["langfuse_calls"] = dict(langfuse.calls)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(f"commit {report['commit']}, concurrency {args.concurrency}, {args.requests} requests per mode")
+    print(f"  {'':<17}{'count':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    print_report(report, baseline)
+    print(f"\nwrote {args.output}")
+
+if __name__ == "__main__":
+    main()
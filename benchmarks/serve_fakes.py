@@ -0,0 +1,76 @@
+"""
+Serve the Flask or ASGI app with every external service replaced by the local
+fakes in benchmarks/fakes.py, so benchmarks/load_test.py can compare the two
+servers without OpenAI, DuckDuckGo or Langfuse.
+
+Usage:
+    python benchmarks/serve_fakes.py flask --port 5000
+    python benchmarks/serve_fakes.py asgi --port 8000
+
+    python benchmarks/load_test.py --url http://127.0.0.1:5000/ask --concurrency 50 --requests 500
+    python benchmarks/load_test.py --url http://127.0.0.1:8000/ask --concurrency 50 --requests 500
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import logging
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The servers must never reach the real services
+os.environ.setdefault("OPENAI_API_KEY", "sk-replay")
+os.environ["LANGFUSE_TRACING_ENABLED"] = "false"
+os.environ["WARM_UP"] = "false"
+
+import agent
+import search
+from prompt_cache import PromptCache
+from benchmarks.fakes import FakeOpenAI, FakeAsyncOpenAI, FakeDDGS, RecordingLangfuse
+
+def install_fakes(args) -> None:
+    """Swap every external dependency for a local fake; caches are off so every request does the work."""
+    agent.client = FakeOpenAI(args.llm_latency, args.token_rate, args.answer_tokens)
+    agent.async_client = FakeAsyncOpenAI(args.llm_latency, args.token_rate, args.answer_tokens)
+    FakeDDGS.latency = args.search_latency
+    search.DDGS = FakeDDGS
+    agent.langfuse_client = RecordingLangfuse()
+    agent.prompt_cache = PromptCache(agent.fetch_prompt, cache_dir=tempfile.mkdtemp(prefix="serve-prompts-"))
+    agent.semantic_cache = None
+    agent.response_cache = None
+    search.set_search_cache(None)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("server", choices=("flask", "asgi"))
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds to first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Tokens per second after the first")
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--backlog", type=int, default=1024, help="Listen backlog for the ASGI server")
+    args = parser.parse_args()
+
+    install_fakes(args)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    if args.server == "flask":
+        import app as flask_app
+        flask_app.app.run(host="127.0.0.1", port=args.port or 5000, threaded=True)
+        return
+
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    import asgi
+    config = Config()
+    config.bind = [f"127.0.0.1:{args.port or 8000}"]
+    config.accesslog = None
+    # Hypercorn listens with a backlog of 100; load tests open more connections at once
+    config.backlog = args.backlog
+    asyncio.run(serve(asgi.app, config))
+
+if __name__ == "__main__":
+    main()
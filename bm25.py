@@ -0,0 +1,80 @@
+"""
+BM25 lexical scoring for the Q&A agent.
+Shared by the context packer, which ranks search snippets against the question,
+and by anything else that needs cheap keyword relevance without embeddings.
+"""
+
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Sequence
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Frequent English words that carry no relevance signal
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its "
+    "me my of on or that the this to was what when where which who why will with you your".split()
+)
+
+# Standard BM25 parameters: term frequency saturation and length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase a text and return its word tokens without stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+def idf(n_docs: int, doc_freq: int) -> float:
+    """Inverse document frequency, kept positive for terms in most documents."""
+    return math.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+def term_score(tf: int, doc_len: int, avg_len: float, term_idf: float, k1: float = BM25_K1, b: float = BM25_B) -> float:
+    """
+    BM25 contribution of one query term to one document.
+    
+    Args:
+        tf: Occurrences of the term in the document
+        doc_len: Document length in tokens
+        avg_len: Average document length in the collection
+        term_idf: The term's `idf`
+        k1: Term frequency saturation
+        b: Length normalization strength
+        
+    Returns:
+        The term's score for the document
+    """
+    norm = 1 - b + b * (doc_len / avg_len if avg_len else 1.0)
+    return term_idf * tf * (k1 + 1) / (tf + k1 * norm)
+
+class BM25:
+    """
+    In-memory BM25 over a small, fixed set of tokenized documents.
+    """
+
+    def __init__(self, documents: Sequence[List[str]], k1: float = BM25_K1, b: float = BM25_B):
+        """
+        Args:
+            documents: Token lists, e.g. from `tokenize`
+            k1: Term frequency saturation
+            b: Length normalization strength
+        """
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(doc) for doc in documents]
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_len = sum(self.lengths) / len(documents) if documents else 0.0
+        doc_freq: Dict[str, int] = Counter(term for counts in self.term_counts for term in counts)
+        self.idf = {term: idf(len(documents), df) for term, df in doc_freq.items()}
+
+    def scores(self, query: List[str]) -> List[float]:
+        """Return the BM25 score of every document for a tokenized query."""
+        terms = [t for t in set(query) if t in self.idf]
+        return [
+            sum(
+                term_score(counts[t], length, self.avg_len, self.idf[t], self.k1, self.b)
+                for t in terms
+                if t in counts
+            )
+            for counts, length in zip(self.term_counts, self.lengths)
+        ]
@@ -0,0 +1,118 @@
+"""
+Parallel graph branches for the Q&A agent.
+Runs a node as one branch of a fan-out with its own timeout: a branch that
+misses its deadline returns a fallback update instead of stalling the join,
+and every branch reports how long it took.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import QUEUE_WAIT_SECONDS, registry
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "parallel" fans prompt resolution and search out after routing; "linear" keeps the original chain
+AGENT_GRAPH = os.getenv("AGENT_GRAPH", "parallel")
+# Per-branch deadlines in seconds; 0 waits for the branch however long it takes
+BRANCH_TIMEOUT_PROMPT = float(os.getenv("BRANCH_TIMEOUT_PROMPT", "2"))
+BRANCH_TIMEOUT_SEARCH = float(os.getenv("BRANCH_TIMEOUT_SEARCH", "8"))
+BRANCH_WORKERS = int(os.getenv("BRANCH_WORKERS", "32"))
+
+# Threads that run sync branches so their deadline can be enforced; a timed-out
+# branch keeps its thread until the underlying call returns. Deadlines start
+# when a worker picks the branch up, so time queued behind other requests'
+# branches under load never causes a fallback.
+_executor = ThreadPoolExecutor(max_workers=BRANCH_WORKERS, thread_name_prefix="graph-branch")
+
+BRANCH_TIMEOUTS = registry.counter(
+    "qa_branch_timeouts_total", "Graph branches that missed their deadline and used a fallback", ["branch"]
+)
+
+def merge_dicts(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """State reducer merging per-branch dicts written by parallel nodes."""
+    return {**(left or {}), **(right or {})}
+
+def merge_lists(left: Optional[List[str]], right: Optional[List[str]]) -> List[str]:
+    """State reducer collecting per-branch lists without duplicates."""
+    merged = list(left or [])
+    merged.extend(item for item in (right or []) if item not in merged)
+    return merged
+
+def branch_update(name: str, update: Dict[str, Any], start: float, timed_out: bool) -> Dict[str, Any]:
+    """Add the branch's wall time, and its name if it timed out, to a partial update."""
+    update = {**update, "branch_ms": {name: round((time.perf_counter() - start) * 1000, 2)}}
+    if timed_out:
+        BRANCH_TIMEOUTS.inc(branch=name)
+        update["degraded_branches"] = [name]
+    return update
+
+def run_branch(
+    name: str,
+    fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+    state: Dict[str, Any],
+    keys: List[str],
+    timeout: float,
+    fallback: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Run a sync node as a branch, keeping only the keys it owns.
+
+    Args:
+        name: Branch name used in timings and logs
+        fn: The node function
+        state: Graph state passed to the node
+        keys: State keys this branch writes; everything else is dropped so
+            parallel branches never write the same key
+        timeout: Seconds the branch may run, once started, before using the
+            fallback (0 for no limit)
+        fallback: Update returned if the branch times out
+
+    Returns:
+        A partial state update with the branch's keys and timing
+    """
+    start = time.perf_counter()
+    started = threading.Event()
+    # Copy the context so the node's spans nest under the current trace
+    context = contextvars.copy_context()
+
+    def run() -> Dict[str, Any]:
+        started.set()
+        return context.run(fn, state)
+
+    future = _executor.submit(run)
+    started.wait()
+    QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start, queue="graph_branch")
+    try:
+        result = future.result(timeout=timeout or None)
+    except FutureTimeout:
+        logger.warning(f"Branch {name} missed its {timeout}s deadline, using fallback")
+        return branch_update(name, fallback, start, timed_out=True)
+    return branch_update(name, {key: result.get(key) for key in keys}, start, timed_out=False)
+
+async def arun_branch(
+    name: str,
+    fn: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    state: Dict[str, Any],
+    keys: List[str],
+    timeout: float,
+    fallback: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Async version of `run_branch` for coroutine nodes; a timed-out branch is cancelled.
+    """
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(fn(state), timeout=timeout or None)
+    except asyncio.TimeoutError:
+        logger.warning(f"Branch {name} missed its {timeout}s deadline, using fallback")
+        return branch_update(name, fallback, start, timed_out=True)
+    return branch_update(name, {key: result.get(key) for key in keys}, start, timed_out=False)
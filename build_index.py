@@ -0,0 +1,37 @@
+"""
+Script to build or extend the local BM25 index used by the "local" search backend.
+Indexes the .txt, .md, .html and .jsonl files in a folder as passages; files
+already in the index are skipped, so re-running it adds only new files.
+"""
+
+import argparse
+import logging
+from local_index import LocalIndex, LOCAL_INDEX_PATH, LOCAL_INDEX_PASSAGE_WORDS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Index a folder of documents, then optionally compact or run a query."""
+    parser = argparse.ArgumentParser(description="Build the local search index")
+    parser.add_argument("folders", nargs="*", help="Folders with documents to index")
+    parser.add_argument("--index", default=LOCAL_INDEX_PATH, help="Index directory")
+    parser.add_argument("--passage-words", type=int, default=LOCAL_INDEX_PASSAGE_WORDS)
+    parser.add_argument("--compact", action="store_true", help="Merge all segments into one")
+    parser.add_argument("--query", help="Print the top results for a query")
+    args = parser.parse_args()
+
+    index = LocalIndex(args.index)
+    for folder in args.folders:
+        index.add_folder(folder, max_words=args.passage_words)
+    if args.compact:
+        index.compact()
+    logger.info(f"Index at {args.index}: {index.stats()}")
+
+    if args.query:
+        for i, result in enumerate(index.search(args.query, max_results=3), 1):
+            print(f"{i}. {result['title']} ({result['href']})\n   {result['body'][:200]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Cache backends for the Q&A agent.
+Provides a common get/set interface with per-entry TTL and size-bounded
+eviction, backed by an in-memory LRU, a SQLite file, both in tiers, or a
+Redis-compatible server.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class CacheBackend(ABC):
+    """
+    Interface shared by all cache backends.
+
+    Values must be JSON-serializable so every backend can store them.
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, expiring after `ttl` seconds (backend default if None)."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry."""
+
+    def hit_ratio(self) -> float:
+        """Return hits / lookups since the backend was created."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        """
+        Args:
+            max_entries: Entries kept before the least recently used is evicted
+            ttl: Default time-to-live in seconds
+        """
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] < time.time():
+                if item is not None:
+                    del self._entries[key]
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return item[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            self.stats["sets"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteCache(CacheBackend):
+    """On-disk cache in a single SQLite file, evicting least recently used entries."""
+
+    def __init__(self, path: str, max_entries: int = 100000, ttl: float = 86400, table: str = "cache"):
+        """
+        Args:
+            path: SQLite database file
+            max_entries: Entries kept before the least recently used are evicted
+            ttl: Default time-to-live in seconds
+            table: Table name, so several caches can share one file
+        """
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            self.stats["sets"] += 1
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            if count > self.max_entries:
+                overflow = count - self.max_entries
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.stats["evictions"] += overflow
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+class TieredCache(CacheBackend):
+    """
+    Memory tier in front of a slower tier.
+
+    Lookups try memory first and promote slower-tier hits into memory;
+    writes go to both tiers.
+    """
+
+    def __init__(self, memory: CacheBackend, disk: CacheBackend):
+        """
+        Args:
+            memory: Fast tier, usually a MemoryCache
+            disk: Slow tier, usually a SQLiteCache
+        """
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl)
+        try:
+            self.disk.set(key, value, ttl)
+        except Exception as e:
+            logger.warning(f"Could not write cache entry to disk tier: {e}")
+        self.stats["sets"] += 1
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.disk.clear()
+
+class RedisCache(CacheBackend):
+    """
+    Cache in a Redis-compatible server (Redis, Valkey, KeyDB, or a local stand-in).
+
+    Expiry is left to the server's TTL and eviction is left to its maxmemory
+    policy. Requires the `redis` package unless a client is passed in.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", ttl: float = 3600, prefix: str = "cache:", client: Any = None):
+        """
+        Args:
+            url: Server URL, used when no client is given
+            ttl: Default time-to-live in seconds
+            prefix: Key prefix, so several caches can share one server
+            client: Optional client with get/set(ex=)/scan_iter/delete, e.g. redis.Redis
+        """
+        super().__init__()
+        self.ttl = ttl
+        self.prefix = prefix
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self._client = client
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        seconds = max(1, int(self.ttl if ttl is None else ttl))
+        self._client.set(self.prefix + key, json.dumps(value), ex=seconds)
+        self.stats["sets"] += 1
+
+    def clear(self) -> None:
+        keys = list(self._client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
@@ -0,0 +1,220 @@
+"""
+Context packing for the Q&A agent.
+Fits formatted search results into a token budget before they are added to the
+system prompt: results are split into passages, near-duplicate passages across
+sources are dropped, and the rest are ranked against the question with BM25 and
+kept in rank order until the budget is full.
+"""
+
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Set, Tuple, TypedDict
+
+from bm25 import BM25, tokenize
+from metrics import registry
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Packing configuration from environment
+CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING_ENABLED", "true").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Passages are groups of sentences up to this many tokens
+CONTEXT_PASSAGE_TOKENS = int(os.getenv("CONTEXT_PASSAGE_TOKENS", "80"))
+# Share of a passage's word trigrams found in a kept passage for it to count as a duplicate
+CONTEXT_DEDUPE_THRESHOLD = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.8"))
+CONTEXT_TOKENIZER_MODEL = os.getenv("CONTEXT_TOKENIZER_MODEL", "gpt-4o-mini")
+# Name reported for counts estimated without tiktoken
+ESTIMATED_TOKENIZER = "chars/4"
+
+CONTEXT_TOKENS = registry.counter(
+    "qa_context_tokens_total", "Search context tokens before and after packing", ["stage"]
+)
+
+# Fields written by search.format_search_results, in output order
+FIELD_PATTERN = re.compile(r"^(Title|Content|URL|Page content): ", re.MULTILINE)
+HEADER_FIELDS = ("Title", "URL")
+BODY_FIELDS = ("Content", "Page content")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+WORD_PATTERN = re.compile(r"\w+")
+
+class PackStats(TypedDict):
+    tokens_before: int
+    tokens_after: int
+    tokens_saved: int
+    passages: int
+    passages_kept: int
+    duplicates_dropped: int
+    tokenizer: str
+    # True when the counts are the chars/4 estimate rather than real tokens
+    tokens_estimated: bool
+
+class Passage(NamedTuple):
+    source: int
+    field: str
+    position: int
+    text: str
+    tokens: int
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> Tuple[str, Callable[[str], int]]:
+    """
+    Return a token counting function and its name.
+
+    Uses tiktoken's encoding for CONTEXT_TOKENIZER_MODEL when the package is
+    installed, and otherwise estimates four characters per token.
+    """
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(CONTEXT_TOKENIZER_MODEL)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        return encoding.name, lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:  # not installed, or the encoding can't be downloaded
+        logger.warning(f"tiktoken unavailable ({e}); token counts are estimated from characters")
+        return ESTIMATED_TOKENIZER, lambda text: (len(text) + 3) // 4
+
+def count_tokens(text: str) -> int:
+    """Count the tokens in a text with the configured tokenizer."""
+    return get_token_counter()[1](text)
+
+def parse_result(result: str) -> Dict[str, str]:
+    """
+    Split a formatted search result into its fields.
+
+    Args:
+        result: One string from `format_search_results`
+
+    Returns:
+        Field name to text; text without field labels is returned as Content
+    """
+    matches = list(FIELD_PATTERN.finditer(result))
+    if not matches:
+        return {"Content": result.strip()}
+    fields = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(result)
+        fields[match.group(1)] = result[match.end():end].strip()
+    return fields
+
+def split_passages(text: str, max_tokens: int) -> List[str]:
+    """Group consecutive sentences into passages of at most `max_tokens` (longer sentences stay whole)."""
+    passages, current, current_tokens = [], [], 0
+    for sentence in SENTENCE_PATTERN.split(text.strip()):
+        if not sentence:
+            continue
+        tokens = count_tokens(sentence)
+        if current and current_tokens + tokens > max_tokens:
+            passages.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+def shingles(text: str) -> Set[Tuple[str, ...]]:
+    """Word trigrams of a text (single words for very short texts)."""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < 3:
+        return {(w,) for w in words}
+    return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
+
+def is_duplicate(candidate: Set[Tuple[str, ...]], kept: List[Set[Tuple[str, ...]]], threshold: float) -> bool:
+    """Return whether most of `candidate` already appears in one kept passage."""
+    if not candidate:
+        return True
+    return any(len(candidate & other) / len(candidate) >= threshold for other in kept)
+
+def render_result(fields: Dict[str, str]) -> str:
+    """Format fields the way `format_search_results` does."""
+    return "\n".join(
+        f"{name}: {fields[name]}" for name in ("Title", "Content", "URL", "Page content") if fields.get(name)
+    )
+
+def pack_context(
+    question: str,
+    search_results: List[str],
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    passage_tokens: int = CONTEXT_PASSAGE_TOKENS,
+    dedupe_threshold: float = CONTEXT_DEDUPE_THRESHOLD,
+) -> Tuple[List[str], PackStats]:
+    """
+    Fit search results into a token budget, keeping the passages most relevant to the question.
+
+    Args:
+        question: The user's question, used for ranking
+        search_results: Formatted search results
+        budget: Maximum tokens for the packed results, including titles and URLs
+        passage_tokens: Target passage size in tokens
+        dedupe_threshold: Trigram overlap above which a passage counts as a duplicate
+
+    Returns:
+        The packed results in the original source order and format, and packing stats
+    """
+    parsed = [parse_result(r) for r in search_results]
+    passages: List[Passage] = []
+    for source, fields in enumerate(parsed):
+        for field in BODY_FIELDS:
+            for position, text in enumerate(split_passages(fields.get(field, ""), passage_tokens)):
+                passages.append(Passage(source, field, position, text, count_tokens(text)))
+
+    # Rank by BM25 against the question; ties keep the search engine's order
+    scores = BM25([tokenize(p.text) for p in passages]).scores(tokenize(question)) if passages else []
+    ranked = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+
+    header_tokens = [
+        count_tokens(render_result({name: fields.get(name, "") for name in HEADER_FIELDS})) for fields in parsed
+    ]
+    kept_shingles: List[Set[Tuple[str, ...]]] = []
+    selected: List[Passage] = []
+    sources_used: Set[int] = set()
+    fields_used: Set[Tuple[int, str]] = set()
+    used, duplicates = 0, 0
+    for i in ranked:
+        passage = passages[i]
+        passage_shingles = shingles(passage.text)
+        if is_duplicate(passage_shingles, kept_shingles, dedupe_threshold):
+            duplicates += 1
+            continue
+        cost = passage.tokens + (header_tokens[passage.source] if passage.source not in sources_used else 0)
+        if (passage.source, passage.field) not in fields_used:
+            cost += count_tokens(f"\n{passage.field}: ")
+        if used + cost > budget:
+            continue
+        used += cost
+        sources_used.add(passage.source)
+        fields_used.add((passage.source, passage.field))
+        kept_shingles.append(passage_shingles)
+        selected.append(passage)
+
+    # Rebuild each result from its kept passages, in reading order
+    packed = []
+    for source, fields in enumerate(parsed):
+        chosen = sorted((p for p in selected if p.source == source), key=lambda p: (BODY_FIELDS.index(p.field), p.position))
+        if not chosen:
+            continue
+        rebuilt = {name: fields.get(name, "") for name in HEADER_FIELDS}
+        for field in BODY_FIELDS:
+            rebuilt[field] = " ".join(p.text for p in chosen if p.field == field)
+        packed.append(render_result(rebuilt))
+
+    tokens_before = sum(count_tokens(r) for r in search_results)
+    tokens_after = sum(count_tokens(r) for r in packed)
+    CONTEXT_TOKENS.inc(tokens_before, stage="before")
+    CONTEXT_TOKENS.inc(tokens_after, stage="after")
+    stats: PackStats = {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": max(0, tokens_before - tokens_after),
+        "passages": len(passages),
+        "passages_kept": len(selected),
+        "duplicates_dropped": duplicates,
+        "tokenizer": get_token_counter()[0],
+        "tokens_estimated": get_token_counter()[0] == ESTIMATED_TOKENIZER,
+    }
+    return packed, stats
@@ -0,0 +1,188 @@
+"""
+Background evaluation pipeline for the Q&A agent.
+Runs the LLM toxicity judge off the request path using a bounded queue and a
+pool of worker threads, so /ask latency only covers search and generation.
+"""
+
+import os
+import time
+import queue
+import atexit
+import threading
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import QUEUE_WAIT_SECONDS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Queue configuration from environment
+EVAL_QUEUE_SIZE = int(os.getenv("EVAL_QUEUE_SIZE", "1000"))
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", "4"))
+# How long submit() may block when the queue is full before dropping the job
+EVAL_SUBMIT_TIMEOUT = float(os.getenv("EVAL_SUBMIT_TIMEOUT", "0.05"))
+EVAL_DRAIN_TIMEOUT = float(os.getenv("EVAL_DRAIN_TIMEOUT", "30"))
+
+EvaluationJob = Tuple[str, str, str]
+# A job and the monotonic time it was enqueued
+QueuedJob = Tuple[EvaluationJob, float]
+
+_SENTINEL = None
+
+class EvaluationQueue:
+    """
+    Bounded queue of (trace_id, question, answer) jobs handled by worker threads.
+
+    When the queue is full, submit() waits up to `submit_timeout` seconds and
+    then drops the job, so a slow judge can never stall the request thread.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, str, str], None],
+        max_size: int = EVAL_QUEUE_SIZE,
+        workers: int = EVAL_WORKERS,
+        submit_timeout: float = EVAL_SUBMIT_TIMEOUT,
+    ):
+        """
+        Args:
+            handler: Callable that evaluates one job and records its score
+            max_size: Maximum number of pending jobs
+            workers: Number of worker threads
+            submit_timeout: Seconds submit() may block on a full queue
+        """
+        self._handler = handler
+        self._queue: "queue.Queue[Optional[QueuedJob]]" = queue.Queue(maxsize=max_size)
+        self._num_workers = workers
+        self._submit_timeout = submit_timeout
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "overflowed": 0,
+            "max_depth": 0,
+        }
+
+    def submit(self, trace_id: str, question: str, answer: str) -> bool:
+        """
+        Enqueue an evaluation job without waiting for it to run.
+
+        Args:
+            trace_id: Langfuse trace the score belongs to
+            question: The original question
+            answer: The generated answer
+
+        Returns:
+            True if the job was accepted, False if it was dropped
+        """
+        with self._lock:
+            if self._closed:
+                self.stats["dropped"] += 1
+                return False
+            self._ensure_workers()
+
+        job = ((trace_id, question, answer), time.monotonic())
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.stats["overflowed"] += 1
+            try:
+                self._queue.put(job, timeout=self._submit_timeout)
+            except queue.Full:
+                with self._lock:
+                    self.stats["dropped"] += 1
+                logger.warning(f"Evaluation queue full, dropping toxicity evaluation for trace {trace_id}")
+                return False
+
+        with self._lock:
+            self.stats["submitted"] += 1
+            self.stats["max_depth"] = max(self.stats["max_depth"], self._queue.qsize())
+        return True
+
+    def depth(self) -> int:
+        """Return the number of jobs waiting to be processed."""
+        return self._queue.qsize()
+
+    def shutdown(self, timeout: float = EVAL_DRAIN_TIMEOUT) -> None:
+        """
+        Stop accepting jobs and let the workers drain what is already queued.
+        Jobs still pending when `timeout` runs out are counted as dropped.
+
+        Args:
+            timeout: Seconds to wait for the queue to drain
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+
+        deadline = time.monotonic() + timeout
+        sentinels = 0
+        for _ in workers:
+            # Sentinels go after the pending jobs, so everything queued is processed first.
+            # A full queue only makes room as workers drain it, so wait no longer than the deadline.
+            try:
+                self._queue.put(_SENTINEL, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+            sentinels += 1
+        for worker in workers:
+            worker.join(timeout=max(0.0, deadline - time.monotonic()))
+
+        # Every worker that exited took one sentinel off the queue; the rest of it is jobs
+        stopped = sum(1 for worker in workers if not worker.is_alive())
+        pending = self._queue.qsize() - (sentinels - stopped)
+        if pending > 0:
+            with self._lock:
+                self.stats["dropped"] += pending
+            logger.warning(f"Evaluation queue shut down with {pending} jobs still pending, counted as dropped")
+
+    def _ensure_workers(self) -> None:
+        """Start the worker threads on first use. Caller holds the lock."""
+        if self._workers:
+            return
+        for i in range(self._num_workers):
+            worker = threading.Thread(target=self._run, name=f"toxicity-eval-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _run(self) -> None:
+        """Worker loop: process jobs until a sentinel arrives."""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _SENTINEL:
+                    return
+                job, enqueued_at = item
+                QUEUE_WAIT_SECONDS.observe(time.monotonic() - enqueued_at, queue="toxicity_eval")
+                self._handler(*job)
+                with self._lock:
+                    self.stats["completed"] += 1
+            except Exception as e:
+                with self._lock:
+                    self.stats["failed"] += 1
+                logger.warning(f"Background toxicity evaluation failed for trace {item[0][0]}: {e}")
+            finally:
+                self._queue.task_done()
+
+def create_evaluation_queue(handler: Callable[[str, str, str], None]) -> EvaluationQueue:
+    """
+    Create an evaluation queue that drains on interpreter shutdown.
+
+    Args:
+        handler: Callable that evaluates one job and records its score
+
+    Returns:
+        The evaluation queue
+    """
+    evaluation_queue = EvaluationQueue(handler)
+    atexit.register(evaluation_queue.shutdown)
+    return evaluation_queue
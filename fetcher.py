@@ -0,0 +1,124 @@
+"""
+Concurrent page fetching for the Q&A agent.
+Fetches a batch of URLs in parallel over a shared, connection-pooled session,
+with a global deadline for the whole batch and a per-host concurrency limit.
+"""
+
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from metrics import QUEUE_WAIT_SECONDS
+from transport import UPSTREAMS, create_session
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fetch configuration from environment
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", "6"))
+# Per-request timeout and pool size are part of the page_fetch upstream config
+FETCH_TIMEOUT = UPSTREAMS["page_fetch"].timeout
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "16"))
+FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "2"))
+
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """
+    Return the shared HTTP session, creating it on first use.
+
+    Returns:
+        A requests Session with a connection pool sized for concurrent fetches
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = create_session("page_fetch")
+        return _session
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the shared fetch thread pool, creating it on first use."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="page-fetch")
+        return _executor
+
+def _host_limit(url: str) -> threading.BoundedSemaphore:
+    """Return the concurrency limiter for a URL's host."""
+    host = urlparse(url).netloc.lower()
+    with _lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(FETCH_PER_HOST_LIMIT)
+        return _host_limits[host]
+
+def fetch_all(
+    urls: List[str],
+    fetch: Callable[[str, float], Optional[str]],
+    deadline: float = FETCH_DEADLINE,
+    timeout: float = FETCH_TIMEOUT,
+) -> Dict[str, Optional[str]]:
+    """
+    Fetch several URLs concurrently and return whatever finished in time.
+
+    Args:
+        urls: URLs to fetch; duplicates are fetched once
+        fetch: Callable taking (url, timeout) and returning the page content or None
+        deadline: Seconds allowed for the whole batch
+        timeout: Per-request timeout, further capped by the remaining deadline
+
+    Returns:
+        Mapping of URL to content for every URL that completed before the
+        deadline (None if that fetch failed); slow URLs are left out
+    """
+    unique_urls = list(dict.fromkeys(url for url in urls if url))
+    if not unique_urls:
+        return {}
+
+    started = time.monotonic()
+    expires_at = started + deadline
+
+    def run(url: str) -> Optional[str]:
+        QUEUE_WAIT_SECONDS.observe(time.monotonic() - started, queue="page_fetch")
+        limiter = _host_limit(url)
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0 or not limiter.acquire(timeout=remaining):
+            return None
+        try:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                return None
+            return fetch(url, min(timeout, remaining))
+        finally:
+            limiter.release()
+
+    executor = _get_executor()
+    futures = {executor.submit(run, url): url for url in unique_urls}
+    done, not_done = wait(futures, timeout=deadline)
+
+    results: Dict[str, Optional[str]] = {}
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            logger.error(f"Error fetching {futures[future]}: {e}")
+            results[futures[future]] = None
+
+    for future in not_done:
+        future.cancel()
+    if not_done:
+        logger.warning(
+            f"Page fetch deadline of {deadline}s reached; returning {len(done)} of {len(unique_urls)} pages"
+        )
+
+    return results
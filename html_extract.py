@@ -0,0 +1,158 @@
+"""
+HTML-to-text extraction for fetched web pages.
+Provides the original BeautifulSoup extractor and a streaming extractor that
+parses the body chunk by chunk, skips script/style content as it goes and
+stops as soon as enough text has been collected.
+"""
+
+import os
+import codecs
+from html.parser import HTMLParser
+from typing import Iterable, List
+
+# Extraction configuration from environment
+EXTRACT_MODE = os.getenv("EXTRACT_MODE", "stream")  # "stream" or "soup"
+EXTRACT_MAX_BYTES = int(os.getenv("EXTRACT_MAX_BYTES", str(512 * 1024)))
+EXTRACT_CHUNK_SIZE = 16 * 1024
+
+SKIPPED_TAGS = {"script", "style", "noscript", "template"}
+
+def clean_text_chunks(text: str) -> List[str]:
+    """
+    Split raw text into stripped, non-empty chunks.
+    Mirrors the line and double-space splitting of the original extractor.
+
+    Args:
+        text: Raw text from the page
+
+    Returns:
+        List of non-empty text chunks
+    """
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return [chunk for chunk in chunks if chunk]
+
+def truncate(text: str, max_length: int) -> str:
+    """Truncate text to max_length characters, marking the cut with an ellipsis."""
+    if len(text) > max_length:
+        return text[:max_length] + "..."
+    return text
+
+def extract_text_soup(html: str, max_length: int = 1000) -> str:
+    """
+    Extract page text by building a full BeautifulSoup tree.
+
+    Args:
+        html: The complete HTML document
+        max_length: Maximum length of text to return
+
+    Returns:
+        Extracted text content
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Remove script, style and other non-content elements
+    for script in soup(sorted(SKIPPED_TAGS)):
+        script.extract()
+
+    text = soup.get_text(separator='\n')
+    return truncate('\n'.join(clean_text_chunks(text)), max_length)
+
+class StreamingTextExtractor(HTMLParser):
+    """
+    Event-driven text collector that ignores script/style content.
+
+    Text between two tags is buffered so a text node split across feed()
+    calls is not broken in two. `done` turns True once `max_length`
+    characters have been collected.
+    """
+
+    def __init__(self, max_length: int):
+        super().__init__(convert_charrefs=True)
+        self.max_length = max_length
+        self.chunks: List[str] = []
+        self.length = 0
+        self.done = False
+        self._skip_depth = 0
+        self._pending: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_data(self, data):
+        if not self._skip_depth and not self.done:
+            self._pending.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _flush(self):
+        """Turn buffered text into cleaned chunks and check the length budget."""
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending = []
+        for chunk in clean_text_chunks(text):
+            self.chunks.append(chunk)
+            self.length += len(chunk) + 1
+            if self.length > self.max_length:
+                self.done = True
+                return
+
+    def text(self) -> str:
+        """Return the collected text, truncated to max_length."""
+        return truncate('\n'.join(self.chunks), self.max_length)
+
+def extract_text_streaming(
+    chunks: Iterable[bytes],
+    max_length: int = 1000,
+    max_bytes: int = EXTRACT_MAX_BYTES,
+    encoding: str = "utf-8",
+) -> str:
+    """
+    Extract page text from a stream of body chunks, stopping early.
+    Reading stops once `max_length` characters are collected or `max_bytes`
+    bytes have been read, whichever comes first.
+
+    Args:
+        chunks: Iterable of raw body bytes, e.g. `response.iter_content()`
+        max_length: Maximum length of text to return
+        max_bytes: Maximum number of body bytes to read
+        encoding: Character encoding of the body
+
+    Returns:
+        Extracted text content
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    parser = StreamingTextExtractor(max_length)
+    read = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        chunk = chunk[:max_bytes - read]
+        read += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or read >= max_bytes:
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+
+    parser.close()
+    return parser.text()
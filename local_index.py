@@ -0,0 +1,513 @@
+"""
+Local BM25 document index for the Q&A agent.
+An inverted index over passages from a folder of documents, stored as
+immutable on-disk segments that are memory-mapped when the index is opened.
+New documents are added as new segments; `compact` merges them into one.
+
+Segment layout (one directory per segment, all arrays in .npy format):
+    terms.npy         sorted 64-bit term hashes (uint64)
+    term_offsets.npy  start of each term's postings, plus the end (uint64)
+    doc_ids.npy       postings: document ids, highest BM25 impact first per term (uint32)
+    tfs.npy           postings: term frequency of each document id (uint16)
+    doc_lens.npy      document lengths in tokens (uint32)
+    doc_offsets.npy   start of each document in docs.bin, plus the end (uint64)
+    docs.bin          stored documents, one JSON object each
+    meta.json         document count and total length
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from bm25 import BM25_B, BM25_K1, idf, term_score, tokenize
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Index configuration from environment
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", ".local_index")
+# Postings read per term and segment; they are impact-ordered, so this keeps the best matches
+LOCAL_INDEX_MAX_POSTINGS = int(os.getenv("LOCAL_INDEX_MAX_POSTINGS", "2048"))
+# Segments allowed before an add merges them all into one
+LOCAL_INDEX_MAX_SEGMENTS = int(os.getenv("LOCAL_INDEX_MAX_SEGMENTS", "4"))
+# Passages are groups of paragraphs up to about this many words
+LOCAL_INDEX_PASSAGE_WORDS = int(os.getenv("LOCAL_INDEX_PASSAGE_WORDS", "120"))
+
+MANIFEST = "manifest.json"
+SEGMENT_PREFIX = "segment-"
+DOCUMENT_SUFFIXES = (".txt", ".md", ".html", ".htm", ".jsonl")
+PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+HEADING_PATTERN = re.compile(r"^\s*#+\s*(.+)$", re.MULTILINE)
+
+@lru_cache(maxsize=65536)
+def term_hash(term: str) -> int:
+    """
+    Hash a term to 64 bits; the index stores hashes instead of term strings.
+    Collisions are negligible below billions of distinct terms.
+    """
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+def document_text(doc: Dict[str, str]) -> str:
+    """Text that is indexed for a document: its title and body."""
+    return f"{doc.get('title', '')}\n{doc.get('body', '')}"
+
+class Segment:
+    """One immutable, memory-mapped part of the index."""
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: The segment's directory, as written by `write_segment`
+        """
+        self.directory = directory
+        self.name = os.path.basename(directory)
+        # Plain ndarray views of the maps: same pages, without np.memmap's per-slice overhead
+        load = lambda name: np.load(os.path.join(directory, name), mmap_mode="r").view(np.ndarray)
+        self.terms = load("terms.npy")
+        self.term_offsets = load("term_offsets.npy")
+        self.doc_ids = load("doc_ids.npy")
+        self.tfs = load("tfs.npy")
+        self.doc_lens = load("doc_lens.npy")
+        self.doc_offsets = load("doc_offsets.npy")
+        self.docs = np.memmap(os.path.join(directory, "docs.bin"), dtype=np.uint8, mode="r").view(np.ndarray)
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.doc_count: int = meta["docs"]
+        self.total_len: int = meta["total_len"]
+        # Score accumulators, one per concurrent query, reused so queries don't allocate or sort
+        self._accumulators: List[np.ndarray] = []
+        self._accumulators_lock = threading.Lock()
+
+    @contextmanager
+    def accumulator(self) -> Iterator[np.ndarray]:
+        """Borrow a zeroed per-document score array; callers reset the entries they touch."""
+        with self._accumulators_lock:
+            scores = self._accumulators.pop() if self._accumulators else None
+        if scores is None:
+            scores = np.zeros(self.doc_count, dtype=np.float32)
+        try:
+            yield scores
+        finally:
+            with self._accumulators_lock:
+                self._accumulators.append(scores)
+
+    def postings(self, hashed: int) -> Tuple[int, int]:
+        """Return the [start, end) range of a term's postings (empty if absent)."""
+        key = np.uint64(hashed)
+        i = int(np.searchsorted(self.terms, key))
+        if i < len(self.terms) and self.terms[i] == key:
+            return int(self.term_offsets[i]), int(self.term_offsets[i + 1])
+        return 0, 0
+
+    def document(self, doc_id: int) -> Dict[str, str]:
+        """Read a stored document."""
+        start, end = int(self.doc_offsets[doc_id]), int(self.doc_offsets[doc_id + 1])
+        return json.loads(bytes(self.docs[start:end]))
+
+    def arrays(self) -> Tuple[np.ndarray, ...]:
+        """Every posting as (term hash, document id, tf) arrays, for merging."""
+        counts = np.diff(self.term_offsets).astype(np.int64)
+        return np.repeat(np.asarray(self.terms), counts), np.asarray(self.doc_ids), np.asarray(self.tfs)
+
+def write_segment(
+    directory: str,
+    hashes: np.ndarray,
+    doc_ids: np.ndarray,
+    tfs: np.ndarray,
+    doc_lens: np.ndarray,
+    docs_parts: Iterable[bytes],
+    doc_offsets: np.ndarray,
+    k1: float = BM25_K1,
+    b: float = BM25_B,
+) -> None:
+    """
+    Sort postings by term and BM25 impact and write them as a segment.
+
+    Args:
+        directory: Where to write; must not exist yet
+        hashes: Term hash of every posting
+        doc_ids: Segment-local document id of every posting
+        tfs: Term frequency of every posting
+        doc_lens: Length in tokens of every document
+        docs_parts: Stored documents, concatenated and written in order (bytes or buffers)
+        doc_offsets: Start of each document in the concatenated parts, plus the end
+        k1: Term frequency saturation used for impact ordering
+        b: Length normalization used for impact ordering
+    """
+    avg_len = float(doc_lens.mean()) if len(doc_lens) else 0.0
+    # Impact with idf 1: the term's BM25 score for the document, up to its idf
+    impacts = term_score(tfs.astype(np.float32), doc_lens[doc_ids].astype(np.float32), avg_len, 1.0, k1, b)
+    order = np.lexsort((-impacts, hashes))
+    del impacts
+    hashes = hashes[order]
+    # Hashes are sorted, so each term starts where the hash changes
+    starts = np.flatnonzero(np.concatenate(([True], hashes[1:] != hashes[:-1])))
+    terms = hashes[starts]
+
+    tmp = directory + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "terms.npy"), terms.astype(np.uint64))
+    np.save(os.path.join(tmp, "term_offsets.npy"), np.append(starts, len(hashes)).astype(np.uint64))
+    np.save(os.path.join(tmp, "doc_ids.npy"), doc_ids[order].astype(np.uint32))
+    np.save(os.path.join(tmp, "tfs.npy"), np.minimum(tfs[order], np.iinfo(np.uint16).max).astype(np.uint16))
+    np.save(os.path.join(tmp, "doc_lens.npy"), doc_lens.astype(np.uint32))
+    np.save(os.path.join(tmp, "doc_offsets.npy"), doc_offsets.astype(np.uint64))
+    with open(os.path.join(tmp, "docs.bin"), "wb") as f:
+        for part in docs_parts:
+            f.write(part)
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"docs": len(doc_lens), "total_len": int(doc_lens.sum())}, f)
+    os.rename(tmp, directory)
+
+def build_segment(directory: str, documents: Iterable[Dict[str, str]], k1: float = BM25_K1, b: float = BM25_B) -> int:
+    """
+    Tokenize documents and write them as a new segment.
+
+    Args:
+        directory: Where to write the segment
+        documents: Dicts with title, body and href
+        k1: Term frequency saturation
+        b: Length normalization strength
+
+    Returns:
+        Number of documents written (nothing is written for zero)
+    """
+    hashes, doc_ids, tfs, doc_lens = array("Q"), array("I"), array("I"), array("I")
+    blob, offsets = bytearray(), [0]
+    vocabulary: Dict[str, int] = {}
+    for doc_id, doc in enumerate(documents):
+        tokens = tokenize(document_text(doc))
+        for term, tf in Counter(tokens).items():
+            hashed = vocabulary.get(term)
+            if hashed is None:
+                hashed = vocabulary[term] = term_hash(term)
+            hashes.append(hashed)
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+        doc_lens.append(len(tokens))
+        blob += json.dumps(
+            {"title": doc.get("title", ""), "body": doc.get("body", ""), "href": doc.get("href", "")}, ensure_ascii=False
+        ).encode("utf-8")
+        offsets.append(len(blob))
+    if not doc_lens:
+        return 0
+    write_segment(
+        directory,
+        np.frombuffer(hashes, dtype=np.uint64),
+        np.frombuffer(doc_ids, dtype=np.uint32),
+        np.frombuffer(tfs, dtype=np.uint32),
+        np.frombuffer(doc_lens, dtype=np.uint32),
+        [blob],
+        np.array(offsets, dtype=np.uint64),
+        k1,
+        b,
+    )
+    return len(doc_lens)
+
+def split_passages(text: str, max_words: int = LOCAL_INDEX_PASSAGE_WORDS) -> List[str]:
+    """Group paragraphs into passages of about `max_words`; longer paragraphs are cut on word boundaries."""
+    passages, current = [], []
+    for paragraph in PARAGRAPH_PATTERN.split(text):
+        words = paragraph.split()
+        while len(words) > max_words:
+            if current:
+                passages.append(" ".join(current))
+                current = []
+            passages.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        if current and len(current) + len(words) > max_words:
+            passages.append(" ".join(current))
+            current = []
+        current.extend(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+def load_documents(path: str, max_words: int = LOCAL_INDEX_PASSAGE_WORDS) -> List[Dict[str, str]]:
+    """
+    Read one file as passages in the search result shape.
+
+    Text, Markdown and HTML files are split into passages titled after the
+    first heading (or the file name). JSONL files hold one result per line
+    with title, body (or text) and href (or url).
+
+    Args:
+        path: The file to read
+        max_words: Passage size in words
+
+    Returns:
+        Dicts with title, body and href
+    """
+    if path.endswith(".jsonl"):
+        documents = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    documents.append({
+                        "title": record.get("title", ""),
+                        "body": record.get("body") or record.get("text", ""),
+                        "href": record.get("href") or record.get("url", ""),
+                    })
+        return documents
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if path.endswith((".html", ".htm")):
+        from html_extract import extract_text_soup
+        text = extract_text_soup(text, max_length=len(text))
+    heading = HEADING_PATTERN.search(text)
+    if heading:
+        title = heading.group(1).strip()
+        text = text[:heading.start()] + text[heading.end():]
+    else:
+        title = Path(path).stem.replace("_", " ").replace("-", " ")
+    uri = Path(path).resolve().as_uri()
+    return [
+        {"title": title, "body": passage, "href": f"{uri}#passage-{i + 1}"}
+        for i, passage in enumerate(split_passages(text, max_words))
+    ]
+
+def iter_files(folder: str) -> Iterator[str]:
+    """Indexable files under a folder, in a stable order."""
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(DOCUMENT_SUFFIXES):
+                yield os.path.join(root, name)
+
+class LocalIndex:
+    """
+    Segmented BM25 index over passages, memory-mapped from a directory.
+
+    Scores use collection-wide document frequencies and average length, so
+    results don't depend on how documents are split across segments. Each
+    term reads at most `max_postings` postings per segment, highest impact
+    first, which bounds query time for very common terms.
+    """
+
+    def __init__(
+        self,
+        directory: str = LOCAL_INDEX_PATH,
+        max_postings: int = LOCAL_INDEX_MAX_POSTINGS,
+        max_segments: int = LOCAL_INDEX_MAX_SEGMENTS,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+    ):
+        """
+        Args:
+            directory: Index directory; created if missing
+            max_postings: Postings read per term and segment
+            max_segments: Segment count above which `add` compacts the index
+            k1: Term frequency saturation
+            b: Length normalization strength
+        """
+        self.directory = directory
+        self.max_postings = max_postings
+        self.max_segments = max_segments
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._read_manifest()
+        self.segments = [Segment(os.path.join(directory, name)) for name in self.manifest["segments"]]
+
+    @property
+    def doc_count(self) -> int:
+        return sum(s.doc_count for s in self.segments)
+
+    def stats(self) -> Dict[str, int]:
+        """Segment, document and posting counts."""
+        segments = self.segments
+        return {
+            "segments": len(segments),
+            "documents": sum(s.doc_count for s in segments),
+            "postings": sum(len(s.doc_ids) for s in segments),
+        }
+
+    def add(self, documents: Iterable[Dict[str, str]], sources: Optional[Dict[str, Dict[str, float]]] = None) -> int:
+        """
+        Index documents as a new segment.
+
+        Args:
+            documents: Dicts with title, body and href
+            sources: Files the documents came from, recorded so `add_folder` skips them next time
+
+        Returns:
+            Number of documents added
+        """
+        with self._lock:
+            name = f"{SEGMENT_PREFIX}{self.manifest['next_segment']:08d}"
+            added = build_segment(os.path.join(self.directory, name), documents, self.k1, self.b)
+            if not added:
+                return 0
+            self.manifest["next_segment"] += 1
+            self.manifest["segments"].append(name)
+            self.manifest["sources"].update(sources or {})
+            self._write_manifest()
+            self.segments = self.segments + [Segment(os.path.join(self.directory, name))]
+            needs_compaction = len(self.segments) > self.max_segments
+        if needs_compaction:
+            self.compact()
+        return added
+
+    def add_folder(self, folder: str, max_words: int = LOCAL_INDEX_PASSAGE_WORDS) -> int:
+        """
+        Index the files in a folder that aren't indexed yet, as one new segment.
+        Files that changed since they were indexed are reported, not re-indexed;
+        rebuild the index to pick up edits.
+
+        Args:
+            folder: Folder with .txt, .md, .html or .jsonl files
+            max_words: Passage size in words
+
+        Returns:
+            Number of passages added
+        """
+        documents, sources = [], {}
+        for path in iter_files(folder):
+            key = os.path.abspath(path)
+            stat = os.stat(path)
+            known = self.manifest["sources"].get(key)
+            if known is not None:
+                if known["mtime"] != stat.st_mtime or known["size"] != stat.st_size:
+                    logger.warning(f"{path} changed since it was indexed; rebuild the index to update it")
+                continue
+            try:
+                documents.extend(load_documents(path, max_words))
+            except Exception as e:
+                logger.warning(f"Skipping {path}: {e}")
+                continue
+            sources[key] = {"mtime": stat.st_mtime, "size": stat.st_size}
+        added = self.add(documents, sources)
+        logger.info(f"Indexed {added} passages from {len(sources)} new files in {folder}")
+        return added
+
+    def compact(self) -> None:
+        """Merge every segment into one, re-sorting postings by impact."""
+        with self._lock:
+            segments = self.segments
+            if len(segments) < 2:
+                return
+            hashes, doc_ids, tfs, doc_lens, docs, offsets = [], [], [], [], [], [np.zeros(1, dtype=np.uint64)]
+            doc_base, byte_base = 0, 0
+            for segment in segments:
+                seg_hashes, seg_ids, seg_tfs = segment.arrays()
+                hashes.append(seg_hashes)
+                doc_ids.append(seg_ids.astype(np.uint32) + np.uint32(doc_base))
+                tfs.append(seg_tfs)
+                doc_lens.append(np.asarray(segment.doc_lens))
+                docs.append(segment.docs)
+                offsets.append(np.asarray(segment.doc_offsets[1:]) + np.uint64(byte_base))
+                doc_base += segment.doc_count
+                byte_base += len(segment.docs)
+            name = f"{SEGMENT_PREFIX}{self.manifest['next_segment']:08d}"
+            write_segment(
+                os.path.join(self.directory, name),
+                np.concatenate(hashes),
+                np.concatenate(doc_ids),
+                np.concatenate(tfs),
+                np.concatenate(doc_lens),
+                docs,
+                np.concatenate(offsets),
+                self.k1,
+                self.b,
+            )
+            self.manifest["next_segment"] += 1
+            self.manifest["segments"] = [name]
+            self._write_manifest()
+            self.segments = [Segment(os.path.join(self.directory, name))]
+        # Open maps stay valid after the files are removed
+        for segment in segments:
+            shutil.rmtree(segment.directory, ignore_errors=True)
+        logger.info(f"Compacted {len(segments)} segments into {name}")
+
+    def search(self, query: str, max_results: int = 3) -> List[Dict[str, str]]:
+        """
+        Return the passages that best match a query.
+
+        Args:
+            query: Free-text query, e.g. the user's question
+            max_results: Maximum number of passages to return
+
+        Returns:
+            Dicts with title, body and href, best first
+        """
+        segments = self.segments
+        n_docs = sum(s.doc_count for s in segments)
+        terms = set(tokenize(query))
+        if not terms or not n_docs or max_results <= 0:
+            return []
+        avg_len = sum(s.total_len for s in segments) / n_docs
+
+        # Postings ranges per segment, and collection-wide idf per term
+        ranges: List[List[Tuple[float, int, int]]] = [[] for _ in segments]
+        for term in terms:
+            hashed = term_hash(term)
+            spans = [segment.postings(hashed) for segment in segments]
+            doc_freq = sum(end - start for start, end in spans)
+            if not doc_freq:
+                continue
+            term_idf = idf(n_docs, doc_freq)
+            for i, (start, end) in enumerate(spans):
+                if end > start:
+                    ranges[i].append((term_idf, start, min(end, start + self.max_postings)))
+
+        candidates: List[Tuple[float, int, int]] = []
+        for i, segment in enumerate(segments):
+            if not ranges[i]:
+                continue
+            with segment.accumulator() as accumulator:
+                touched = []
+                for term_idf, start, end in ranges[i]:
+                    ids = segment.doc_ids[start:end]
+                    # A term lists each document once, so a plain scatter-add is safe
+                    accumulator[ids] += term_score(
+                        segment.tfs[start:end].astype(np.float32), segment.doc_lens[ids].astype(np.float32),
+                        avg_len, term_idf, self.k1, self.b,
+                    )
+                    touched.append(ids)
+                ids = np.concatenate(touched) if len(touched) > 1 else touched[0]
+                scores = accumulator[ids]
+                accumulator[ids] = 0
+            # A document appears once per matching term, so this many entries hold max_results distinct ones
+            wanted = max_results * len(touched)
+            if len(scores) > wanted:
+                top = np.argpartition(-scores, wanted - 1)[:wanted]
+            else:
+                top = np.arange(len(scores))
+            best: Dict[int, float] = {}
+            for j in top:
+                best[int(ids[j])] = float(scores[j])
+            candidates.extend((score, i, doc_id) for doc_id, score in best.items())
+
+        candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+        return [segments[i].document(doc_id) for _, i, doc_id in candidates[:max_results]]
+
+    def _read_manifest(self) -> Dict:
+        path = os.path.join(self.directory, MANIFEST)
+        if not os.path.exists(path):
+            return {"segments": [], "next_segment": 0, "sources": {}}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self) -> None:
+        """Replace the manifest atomically, so a crash never leaves a half-written one."""
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(path + ".tmp", path)
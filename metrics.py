@@ -0,0 +1,235 @@
+"""
+In-process metrics for the Q&A agent.
+Histograms and counters for graph nodes, external calls, queue waits and token
+usage, rendered in the Prometheus text exposition format for /metrics.
+"""
+
+import math
+import time
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds, from sub-millisecond CPU work to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Render a Prometheus label set, e.g. {node="generate"}."""
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric(ABC):
+    """Base class holding a name, help text and label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Return the exposition lines for every label set of this metric."""
+
+class Counter(Metric):
+    """Monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{format_labels(self.labels, key)} {format_value(v)}" for key, v in items]
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Per label set: one count per bucket, then sum and count
+            series = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            return int(series[-1]) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        lines = []
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, ('le', format_value(bound)))} {format_value(count)}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {format_value(series[-2])}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {format_value(series[-1])}")
+        return lines
+
+class CallbackGauge(Metric):
+    """Gauge whose samples are read from a callback at render time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str], callback: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, help_text, labels)
+        self._callback = callback
+
+    def samples(self) -> List[str]:
+        try:
+            values = self._callback()
+        except Exception:
+            return []
+        return [
+            f"{self.name}{format_labels(self.labels, key)} {format_value(v)}"
+            for key, v in sorted(values.items())
+            if isinstance(v, (int, float))
+        ]
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def gauge_callback(self, name: str, help_text: str, labels: Sequence[str], callback: Callable[[], Dict[LabelValues, float]]) -> CallbackGauge:
+        return self.register(CallbackGauge(name, help_text, labels, callback))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Shared registry and the metrics recorded across the agent
+registry = MetricsRegistry()
+
+NODE_SECONDS = registry.histogram("qa_node_seconds", "Wall time of LangGraph nodes", ["node"])
+EXTERNAL_CALL_SECONDS = registry.histogram(
+    "qa_external_call_seconds", "Wall time of calls to external services", ["service", "outcome"]
+)
+QUEUE_WAIT_SECONDS = registry.histogram(
+    "qa_queue_wait_seconds", "Time work items spent queued before a worker picked them up", ["queue"]
+)
+LLM_TOKENS = registry.counter("qa_llm_tokens_total", "Tokens reported by OpenAI usage", ["call", "type"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@contextmanager
+def track_call(service: str) -> Iterator[None]:
+    """
+    Time a call to an external service, labelled ok or error by outcome.
+
+    Args:
+        service: Service name, e.g. "openai" or "duckduckgo"
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTERNAL_CALL_SECONDS.observe(time.perf_counter() - start, service=service, outcome=outcome)
+
+def stats_gauge(name: str, help_text: str, label: str, sources: Callable[[], Dict[str, Dict[str, float]]]) -> CallbackGauge:
+    """
+    Expose existing `stats` dicts (caches, queues) as a gauge read at scrape time.
+
+    Args:
+        name: Metric name
+        help_text: Metric help text
+        label: Label naming the source, e.g. "cache"
+        sources: Callable returning {source name: stats dict}
+
+    Returns:
+        The registered gauge, with labels (label, "stat")
+    """
+    def collect() -> Dict[LabelValues, float]:
+        return {
+            (source, stat): value
+            for source, stats in sources().items()
+            for stat, value in (stats or {}).items()
+        }
+    return registry.gauge_callback(name, help_text, [label, "stat"], collect)
+
+def record_token_usage(call: str, usage) -> Dict[str, int]:
+    """
+    Count the tokens from an OpenAI `usage` object.
+
+    Args:
+        call: Which LLM call the usage belongs to, e.g. "generate"
+        usage: The response's `usage`, or None if the API did not return one
+
+    Returns:
+        Dictionary with prompt_tokens and completion_tokens (empty if no usage)
+    """
+    if usage is None:
+        return {}
+    tokens = {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+    LLM_TOKENS.inc(tokens["prompt_tokens"], call=call, type="prompt")
+    LLM_TOKENS.inc(tokens["completion_tokens"], call=call, type="completion")
+    return tokens
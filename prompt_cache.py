@@ -0,0 +1,219 @@
+"""
+Prompt cache for the Q&A agent.
+Keeps Langfuse prompt templates in memory with a TTL, serves stale entries while
+a background thread refreshes them, and persists the last good template to disk
+so a cold start does not have to wait for Langfuse.
+"""
+
+import os
+import re
+import json
+import time
+import threading
+import logging
+from typing import TypedDict, Callable, Dict, Any, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cache configuration from environment
+PROMPT_CACHE_TTL = float(os.getenv("PROMPT_CACHE_TTL", "300"))
+PROMPT_CACHE_DIR = os.getenv("PROMPT_CACHE_DIR", ".prompt_cache")
+PROMPT_CACHE_FAILURE_BACKOFF = float(os.getenv("PROMPT_CACHE_FAILURE_BACKOFF", "30"))
+
+CacheKey = Tuple[str, Optional[str], Optional[int]]
+
+class CachedPrompt(TypedDict):
+    template: str
+    config: Dict[str, Any]
+    version: Optional[int]
+    fetched_at: float
+
+class PromptCache:
+    """
+    TTL cache for prompt templates keyed by (name, label, version).
+
+    Fresh entries are returned directly. Expired entries are still returned
+    (stale-while-revalidate) while a background thread fetches a new copy.
+    Only a cold miss with nothing on disk blocks on the fetcher.
+    """
+
+    def __init__(
+        self,
+        fetcher: Callable[[str, Optional[str], Optional[int]], Dict[str, Any]],
+        ttl: float = PROMPT_CACHE_TTL,
+        cache_dir: Optional[str] = PROMPT_CACHE_DIR,
+        failure_backoff: float = PROMPT_CACHE_FAILURE_BACKOFF,
+    ):
+        """
+        Args:
+            fetcher: Callable returning a dict with template, config and version
+            ttl: Seconds an entry is served without triggering a refresh
+            cache_dir: Directory for the on-disk copy, or None to disable it
+            failure_backoff: Seconds to fail fast, and to skip background refreshes, after a fetch failed
+        """
+        self._fetcher = fetcher
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.failure_backoff = failure_backoff
+        self._entries: Dict[CacheKey, CachedPrompt] = {}
+        self._refreshing: set = set()
+        self._failed_at: Dict[CacheKey, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+        }
+
+    def get(self, name: str, label: Optional[str] = None, version: Optional[int] = None) -> CachedPrompt:
+        """
+        Return the cached prompt, fetching it only on a cold miss.
+
+        Args:
+            name: Prompt name in Langfuse
+            label: Optional prompt label
+            version: Optional pinned prompt version
+
+        Returns:
+            The cached prompt entry
+
+        Raises:
+            Exception: If the prompt is not cached anywhere and the fetch fails
+        """
+        key = (name, label, version)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry["fetched_at"] < self.ttl:
+                self.stats["hits"] += 1
+                return entry
+
+        if entry is None:
+            entry = self._load_from_disk(key)
+            if entry is not None:
+                with self._lock:
+                    self._entries.setdefault(key, entry)
+                    self.stats["disk_hits"] += 1
+                self._refresh_in_background(key)
+                return entry
+        else:
+            with self._lock:
+                self.stats["stale_hits"] += 1
+            self._refresh_in_background(key)
+            return entry
+
+        # Cold miss: nothing in memory or on disk, so we have to block
+        with self._lock:
+            self.stats["misses"] += 1
+            failed_at = self._failed_at.get(key)
+        if failed_at is not None and now - failed_at < self.failure_backoff:
+            raise RuntimeError(f"Prompt fetch for {name!r} failed recently; backing off")
+
+        try:
+            return self._fetch_and_store(key)
+        except Exception:
+            with self._lock:
+                self._failed_at[key] = time.time()
+            raise
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """
+        Drop in-memory entries so the next lookup revalidates.
+
+        Args:
+            name: Only drop entries for this prompt name; all entries if None
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if name is None or key[0] == name:
+                    del self._entries[key]
+
+    def _fetch_and_store(self, key: CacheKey) -> CachedPrompt:
+        """Fetch a prompt, store it in memory and persist it to disk."""
+        fetched = self._fetcher(*key)
+        entry: CachedPrompt = {
+            "template": fetched["template"],
+            "config": dict(fetched.get("config") or {}),
+            "version": fetched.get("version"),
+            "fetched_at": time.time(),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._failed_at.pop(key, None)
+        self._save_to_disk(key, entry)
+        return entry
+
+    def _refresh_in_background(self, key: CacheKey) -> None:
+        """Start a refresh thread for the key unless one is already running or a recent one failed."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            failed_at = self._failed_at.get(key)
+            if failed_at is not None and time.time() - failed_at < self.failure_backoff:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._fetch_and_store(key)
+                with self._lock:
+                    self.stats["refreshes"] += 1
+            except Exception as e:
+                with self._lock:
+                    self.stats["refresh_failures"] += 1
+                    self._failed_at[key] = time.time()
+                logger.warning(f"Background prompt refresh failed for {key[0]!r}, serving stale copy. Reason: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="prompt-cache-refresh", daemon=True).start()
+
+    def _disk_path(self, key: CacheKey) -> Optional[str]:
+        """Return the on-disk location for a key, or None if disk is disabled."""
+        if not self.cache_dir:
+            return None
+        name, label, version = key
+        filename = f"{name}__{label or 'none'}__{version if version is not None else 'latest'}.json"
+        return os.path.join(self.cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", filename))
+
+    def _load_from_disk(self, key: CacheKey) -> Optional[CachedPrompt]:
+        """Load the last good template for a key; it is always treated as stale."""
+        path = self._disk_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {
+                "template": data["template"],
+                "config": data.get("config") or {},
+                "version": data.get("version"),
+                "fetched_at": 0.0,
+            }
+        except Exception as e:
+            logger.warning(f"Could not read cached prompt from {path}: {e}")
+            return None
+
+    def _save_to_disk(self, key: CacheKey, entry: CachedPrompt) -> None:
+        """Atomically write the entry to disk."""
+        path = self._disk_path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"template": entry["template"], "config": entry["config"], "version": entry["version"]},
+                    f,
+                )
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not persist prompt to {path}: {e}")
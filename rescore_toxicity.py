@@ -0,0 +1,41 @@
+"""
+Script to re-score stored answers with the batched toxicity judge.
+Reads a JSONL file with one {"trace_id", "question", "answer"} object per line
+and attaches an `llm_toxicity_evaluation` score to each trace.
+
+Usage:
+    python rescore_toxicity.py answers.jsonl
+"""
+
+import sys
+import json
+import logging
+from dotenv import load_dotenv
+from agent import record_toxicity_evaluations, batch_judge, score_writer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+def main():
+    """Re-score every answer in the input file."""
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    with open(sys.argv[1], encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    
+    results = record_toxicity_evaluations(items)
+    score_writer.flush()
+    
+    failed = [r["trace_id"] for r in results if "error" in r]
+    logger.info(f"Scored {len(results) - len(failed)} of {len(results)} answers: {batch_judge.stats}")
+    if failed:
+        logger.warning(f"Could not score traces: {', '.join(failed)}")
+
+if __name__ == "__main__":
+    main()
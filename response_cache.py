@@ -0,0 +1,143 @@
+"""
+Exact-match response cache for the Q&A agent.
+Stores chat completion answers under a stable hash of the request (model,
+messages and sampling parameters), so a byte-identical request is answered
+without calling OpenAI. Only deterministic requests are cached: those whose
+temperature is at most RESPONSE_CACHE_MAX_TEMPERATURE.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Optional, TypedDict
+
+from cache import CacheBackend, MemoryCache, RedisCache, SQLiteCache, TieredCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Response cache configuration from environment
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+# memory, sqlite (memory tier over RESPONSE_CACHE_PATH) or redis
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite")
+RESPONSE_CACHE_DISK_SIZE = int(os.getenv("RESPONSE_CACHE_DISK_SIZE", "100000"))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Requests sampled above this temperature are never cached
+RESPONSE_CACHE_MAX_TEMPERATURE = float(os.getenv("RESPONSE_CACHE_MAX_TEMPERATURE", "0"))
+
+# Request fields that change how the answer is delivered, not what it is
+TRANSPORT_PARAMS = ("stream", "stream_options", "timeout", "extra_headers")
+
+class CachedResponse(TypedDict):
+    answer: str
+    model: str
+    usage: Dict[str, int]
+
+def response_cache_key(params: Dict[str, Any]) -> str:
+    """
+    Hash a chat completion request into a cache key.
+
+    Args:
+        params: Keyword arguments for `chat.completions.create`
+
+    Returns:
+        Hex SHA-256 of the canonical JSON of the answer-relevant parameters
+    """
+    relevant = {k: v for k, v in params.items() if k not in TRANSPORT_PARAMS}
+    canonical = json.dumps(relevant, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Chat completion answers keyed by `response_cache_key`, on any CacheBackend.
+    """
+
+    def __init__(self, backend: CacheBackend, max_temperature: float = RESPONSE_CACHE_MAX_TEMPERATURE, ttl: Optional[float] = None):
+        """
+        Args:
+            backend: Where entries are stored
+            max_temperature: Highest temperature still treated as deterministic
+            ttl: Entry lifetime in seconds (backend default if None)
+        """
+        self.backend = backend
+        self.max_temperature = max_temperature
+        self.ttl = ttl
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "skipped": 0, "errors": 0}
+
+    def cacheable(self, params: Dict[str, Any]) -> bool:
+        """Return whether a request is deterministic enough to cache (the API default temperature is 1)."""
+        temperature = params.get("temperature")
+        return float(1.0 if temperature is None else temperature) <= self.max_temperature and params.get("n", 1) == 1
+
+    def get(self, params: Dict[str, Any]) -> Optional[CachedResponse]:
+        """
+        Return the cached answer for a request, if any.
+
+        Args:
+            params: Keyword arguments for `chat.completions.create`
+
+        Returns:
+            The cached response, or None on a miss, a non-cacheable request or a backend error
+        """
+        if not self.cacheable(params):
+            self.stats["skipped"] += 1
+            return None
+        try:
+            cached = self.backend.get(response_cache_key(params))
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            self.stats["errors"] += 1
+            return None
+        self.stats["hits" if cached is not None else "misses"] += 1
+        return cached
+
+    def set(self, params: Dict[str, Any], answer: str, usage: Optional[Dict[str, int]] = None) -> None:
+        """
+        Store the answer for a request, if it is cacheable.
+
+        Args:
+            params: Keyword arguments for `chat.completions.create`
+            answer: The completion text
+            usage: Token usage of the original call, kept for reporting
+        """
+        if not answer or not self.cacheable(params):
+            return
+        entry: CachedResponse = {"answer": answer, "model": params.get("model", ""), "usage": usage or {}}
+        try:
+            self.backend.set(response_cache_key(params), entry, self.ttl)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {e}")
+            self.stats["errors"] += 1
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self.backend.clear()
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """
+    Build the response cache from environment configuration.
+
+    Returns:
+        A ResponseCache on the configured backend, an in-memory LRU if that
+        backend can't be opened, or None if caching is disabled
+    """
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    memory = MemoryCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+    backend: CacheBackend = memory
+    try:
+        if RESPONSE_CACHE_BACKEND == "sqlite":
+            disk = SQLiteCache(RESPONSE_CACHE_PATH, max_entries=RESPONSE_CACHE_DISK_SIZE, ttl=RESPONSE_CACHE_TTL, table="responses")
+            backend = TieredCache(memory, disk)
+        elif RESPONSE_CACHE_BACKEND == "redis":
+            backend = RedisCache(RESPONSE_CACHE_REDIS_URL, ttl=RESPONSE_CACHE_TTL, prefix="qa:response:")
+        elif RESPONSE_CACHE_BACKEND != "memory":
+            logger.warning(f"Unknown RESPONSE_CACHE_BACKEND {RESPONSE_CACHE_BACKEND!r}, using memory")
+    except Exception as e:
+        logger.warning(f"Could not open {RESPONSE_CACHE_BACKEND} response cache, using memory only: {e}")
+    return ResponseCache(backend)
@@ -0,0 +1,47 @@
+"""
+Retrieval backends for the Q&A agent.
+`research_question` asks each configured backend in turn (see SEARCH_BACKENDS
+in search.py). Every backend returns results in the DuckDuckGo shape (title,
+body, href), so they are formatted, cached and fetched the same way.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+from local_index import LocalIndex, LOCAL_INDEX_PATH
+from metrics import track_call
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class RetrievalBackend(ABC):
+    """
+    Interface shared by all retrieval backends.
+    """
+
+    # Used in SEARCH_BACKENDS and the search cache key
+    name = "base"
+
+    @abstractmethod
+    def search(self, query: str, max_results: int = 3) -> List[Dict[str, str]]:
+        """Return up to `max_results` results as dicts with title, body and href, best first."""
+
+class LocalIndexBackend(RetrievalBackend):
+    """Offline retrieval from a local BM25 index built with build_index.py."""
+
+    name = "local"
+
+    def __init__(self, path: str = LOCAL_INDEX_PATH):
+        """
+        Args:
+            path: Index directory
+        """
+        self.index = LocalIndex(path)
+        if not self.index.doc_count:
+            logger.warning(f"Local index at {path} is empty; build it with build_index.py")
+
+    def search(self, query: str, max_results: int = 3) -> List[Dict[str, str]]:
+        with track_call("local_index"):
+            return self.index.search(query, max_results)
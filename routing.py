@@ -0,0 +1,219 @@
+"""
+Search and model routing for the Q&A agent.
+Decides whether a question is worth a web search using a precompiled
+word-boundary keyword pattern and a small hashed-feature logistic regression
+trained offline (see train_router.py), and which model answers it based on
+the question's length and whether it was searched.
+"""
+
+import os
+import re
+import json
+import math
+import zlib
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Router configuration from environment
+SEARCH_ROUTER_MODEL = os.getenv(
+    "SEARCH_ROUTER_MODEL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "search_router.json"),
+)
+SEARCH_ROUTER_THRESHOLD = float(os.getenv("SEARCH_ROUTER_THRESHOLD", "0.5"))
+DEFAULT_NUM_FEATURES = 2 ** 14
+
+# Model routing defaults; the prompt config's "model" and "routing" keys override them
+DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gpt-4o-mini")
+# Model for short questions answered without search (empty: use the default model)
+MODEL_ROUTER_SHORT_MODEL = os.getenv("MODEL_ROUTER_SHORT_MODEL", "")
+MODEL_ROUTER_SHORT_MAX_WORDS = int(os.getenv("MODEL_ROUTER_SHORT_MAX_WORDS", "12"))
+# Model for questions answered from search results (empty: use the default model)
+MODEL_ROUTER_SEARCH_MODEL = os.getenv("MODEL_ROUTER_SEARCH_MODEL", "")
+
+# Keywords that suggest a factual question (matched on whole words only)
+SEARCH_KEYWORDS = [
+    "who", "what", "when", "where", "why", "how",
+    "latest", "recent", "news", "current", "today",
+    "definition", "meaning", "explain", "information",
+    "data", "statistics", "facts", "history"
+]
+KEYWORD_PATTERN = re.compile(r"\b(?:" + "|".join(SEARCH_KEYWORDS) + r")\b", re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+
+def keyword_rule(question: str) -> bool:
+    """
+    Keyword fallback used when no trained model is available.
+
+    Args:
+        question: The user's question
+
+    Returns:
+        True if the question contains a search keyword as a whole word
+    """
+    return KEYWORD_PATTERN.search(question) is not None
+
+def extract_features(question: str) -> List[str]:
+    """
+    Turn a question into sparse string features.
+
+    Args:
+        question: The user's question
+
+    Returns:
+        List of feature names (unigrams, bigrams and a few shape features)
+    """
+    text = question.lower()
+    tokens = TOKEN_PATTERN.findall(text)
+    features = ["bias"]
+    features.extend(f"w={t}" for t in tokens)
+    features.extend(f"b={a}_{b}" for a, b in zip(tokens, tokens[1:]))
+    if tokens:
+        features.append(f"first={tokens[0]}")
+    features.append(f"len={min(len(tokens) // 4, 5)}")
+    features.extend(f"kw={m.lower()}" for m in KEYWORD_PATTERN.findall(question))
+    if "?" in text:
+        features.append("has_qmark")
+    if YEAR_PATTERN.search(text):
+        features.append("has_year")
+    if any(ch.isupper() for ch in question[1:]):
+        features.append("has_proper_noun")
+    return features
+
+def hash_feature(feature: str, num_features: int) -> int:
+    """Map a feature name to a stable bucket index."""
+    return zlib.crc32(feature.encode("utf-8")) % num_features
+
+class SearchRouter:
+    """
+    Hashed-feature logistic regression over question features.
+
+    Without a model file it falls back to the whole-word keyword rule.
+    """
+
+    def __init__(self, weights: Optional[Dict[int, float]] = None, num_features: int = DEFAULT_NUM_FEATURES,
+                 threshold: float = SEARCH_ROUTER_THRESHOLD):
+        """
+        Args:
+            weights: Sparse mapping of bucket index to weight, or None for the keyword rule
+            num_features: Number of hash buckets
+            threshold: Probability above which a search is run
+        """
+        self.weights = weights
+        self.num_features = num_features
+        self.threshold = threshold
+
+    @classmethod
+    def load(cls, path: str = SEARCH_ROUTER_MODEL, threshold: float = SEARCH_ROUTER_THRESHOLD) -> "SearchRouter":
+        """
+        Load a trained router, falling back to the keyword rule if the file is missing.
+
+        Args:
+            path: JSON model file written by train_router.py
+            threshold: Probability above which a search is run
+
+        Returns:
+            The search router
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                model = json.load(f)
+            weights = {int(k): float(v) for k, v in model["weights"].items()}
+            return cls(weights, model["num_features"], threshold)
+        except FileNotFoundError:
+            logger.warning(f"No search router model at {path}; using keyword rule")
+        except Exception as e:
+            logger.warning(f"Could not load search router model from {path}; using keyword rule. Reason: {e}")
+        return cls(None, threshold=threshold)
+
+    def save(self, path: str) -> None:
+        """Write the model as JSON, keeping only non-zero weights."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "num_features": self.num_features,
+                    "weights": {str(k): round(v, 6) for k, v in sorted(self.weights.items()) if abs(v) > 1e-6},
+                },
+                f,
+            )
+
+    def score(self, question: str) -> float:
+        """
+        Estimate the probability that a search will help answer the question.
+
+        Args:
+            question: The user's question
+
+        Returns:
+            Probability between 0 and 1 (1.0 or 0.0 under the keyword rule)
+        """
+        if self.weights is None:
+            return 1.0 if keyword_rule(question) else 0.0
+        z = sum(self.weights.get(hash_feature(f, self.num_features), 0.0) for f in extract_features(question))
+        z = max(-30.0, min(30.0, z))
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def needs_search(self, question: str) -> bool:
+        """Return True if the question should be searched."""
+        return self.score(question) >= self.threshold
+
+class ModelRoute(NamedTuple):
+    model: str
+    # Which rule picked the model: "default", "short_question" or "search"
+    route: str
+
+class ModelRouter:
+    """
+    Picks the answer model from the question's length and search need.
+
+    Questions that need search go to the search model, since they carry the
+    longest prompts and cite sources. Short questions without search go to the
+    short model. Everything else uses the prompt config's model. A rule whose
+    model is empty is skipped.
+    """
+
+    def __init__(self, default_model: str = DEFAULT_MODEL, short_model: str = MODEL_ROUTER_SHORT_MODEL,
+                 short_max_words: int = MODEL_ROUTER_SHORT_MAX_WORDS, search_model: str = MODEL_ROUTER_SEARCH_MODEL):
+        """
+        Args:
+            default_model: Model used when the prompt config names none
+            short_model: Model for short questions without search
+            short_max_words: Longest question, in words, that counts as short
+            search_model: Model for questions answered from search results
+        """
+        self.default_model = default_model
+        self.short_model = short_model
+        self.short_max_words = short_max_words
+        self.search_model = search_model
+
+    def choose(self, question: str, needs_search: bool, config: Optional[Dict[str, Any]] = None) -> ModelRoute:
+        """
+        Choose the model for a question.
+
+        Args:
+            question: The user's question
+            needs_search: Whether the question was routed to search
+            config: Prompt config; "model" sets the default model and an optional
+                "routing" dict overrides short_model, short_max_words and search_model
+
+        Returns:
+            The chosen model and the rule that chose it
+        """
+        config = config or {}
+        routing = config.get("routing") or {}
+        default_model = config.get("model") or self.default_model
+        if needs_search:
+            search_model = routing.get("search_model", self.search_model)
+            if search_model:
+                return ModelRoute(search_model, "search")
+        else:
+            short_model = routing.get("short_model", self.short_model)
+            short_max_words = int(routing.get("short_max_words", self.short_max_words))
+            if short_model and len(TOKEN_PATTERN.findall(question.lower())) <= short_max_words:
+                return ModelRoute(short_model, "short_question")
+        return ModelRoute(default_model, "default")
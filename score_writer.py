@@ -0,0 +1,228 @@
+"""
+Buffered score writer for the Q&A agent.
+Collects Langfuse scores in memory and sends them in batches from a background
+thread, so recording feedback never waits on Langfuse. Batches that fail with a
+retryable error are spooled to disk and replayed once Langfuse is reachable.
+"""
+
+import os
+import time
+import uuid
+import atexit
+import threading
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional
+
+from spool import DiskSpool
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Writer configuration from environment
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", "50"))
+SCORE_FLUSH_INTERVAL = float(os.getenv("SCORE_FLUSH_INTERVAL", "2"))
+SCORE_MAX_BUFFER = int(os.getenv("SCORE_MAX_BUFFER", "10000"))
+# Disk spool for batches that could not be sent; empty disables spooling
+SCORE_SPOOL_DIR = os.getenv("SCORE_SPOOL_DIR", ".score_spool")
+SCORE_SPOOL_MAX_BYTES = int(os.getenv("SCORE_SPOOL_MAX_BYTES", str(50 * 1024 * 1024)))
+# After a failure, batches go straight to the spool for this many seconds before sending is retried
+SCORE_SPOOL_RETRY_INTERVAL = float(os.getenv("SCORE_SPOOL_RETRY_INTERVAL", "30"))
+
+class ScoreWriter:
+    """
+    In-memory score buffer flushed by size or time.
+
+    Scores are handed to `sender` in batches of at most `batch_size`, either as
+    soon as a full batch is buffered or every `flush_interval` seconds.
+
+    With a spool, a batch whose send fails with a retryable error is written
+    to disk instead of dropped, and for `retry_interval` seconds later batches
+    go straight to disk too. The first successful send replays the spool.
+    Every score gets a `score_id` when it is added, so a replayed score
+    overwrites rather than duplicates one that did arrive.
+    """
+
+    def __init__(
+        self,
+        sender: Callable[[List[Dict[str, Any]]], None],
+        batch_size: int = SCORE_BATCH_SIZE,
+        flush_interval: float = SCORE_FLUSH_INTERVAL,
+        max_buffer: int = SCORE_MAX_BUFFER,
+        spool: Optional[DiskSpool] = None,
+        retryable: Callable[[Exception], bool] = lambda e: True,
+        retry_interval: float = SCORE_SPOOL_RETRY_INTERVAL,
+    ):
+        """
+        Args:
+            sender: Callable that delivers one batch of score dicts to Langfuse
+            batch_size: Maximum scores per batch
+            flush_interval: Seconds between time-based flushes
+            max_buffer: Scores kept in memory before the oldest are dropped
+            spool: Optional disk spool for batches that could not be sent
+            retryable: Decides whether a send error is worth spooling
+            retry_interval: Seconds to spool without trying after a failure
+        """
+        self._sender = sender
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.spool = spool
+        self._retryable = retryable
+        self.retry_interval = retry_interval
+        self._retry_at = 0.0
+        self.stats = {"queued": 0, "sent": 0, "batches": 0, "failed": 0, "dropped": 0, "spooled": 0, "replayed": 0}
+
+    def add(self, **score: Any) -> None:
+        """
+        Buffer a score; accepts the same keyword arguments as `create_score`.
+        """
+        with self._cond:
+            if self._closed:
+                self.stats["dropped"] += 1
+                logger.warning(f"Score writer closed, dropping score {score.get('name')}")
+                return
+            self._ensure_thread()
+            score.setdefault("score_id", uuid.uuid4().hex)
+            score.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
+            self._buffer.append(score)
+            self.stats["queued"] += 1
+            if len(self._buffer) > self.max_buffer:
+                overflow = len(self._buffer) - self.max_buffer
+                del self._buffer[:overflow]
+                self.stats["dropped"] += overflow
+                logger.warning(f"Score buffer full, dropped {overflow} oldest scores")
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self) -> None:
+        """Send everything currently buffered, in batches, then replay the spool if Langfuse is up."""
+        with self._send_lock:
+            while True:
+                with self._cond:
+                    batch = self._buffer[:self.batch_size]
+                    del self._buffer[:self.batch_size]
+                if not batch:
+                    break
+                self._send(batch)
+        if self.spool is not None and time.monotonic() >= self._retry_at and self.spool.pending():
+            self.replay_spool()
+
+    def shutdown(self) -> None:
+        """Stop the background thread and flush remaining scores."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def replay_spool(self) -> None:
+        """Send spooled batches oldest first, stopping at the first failure."""
+        if self.spool is None:
+            return
+        with self._send_lock:
+            while self.spool.pending() and time.monotonic() >= self._retry_at:
+                path, records = self.spool.oldest()
+                for start in range(0, len(records), self.batch_size):
+                    batch = records[start:start + self.batch_size]
+                    outcome = self._deliver(batch, spool_on_failure=False)
+                    if outcome == "retry":
+                        # Still down; the segment stays on disk for the next attempt
+                        return
+                    if outcome == "sent":
+                        self.stats["replayed"] += len(batch)
+                self.spool.remove(path)
+                if records:
+                    logger.info(f"Replayed {len(records)} spooled scores to Langfuse")
+
+    def _send(self, batch: List[Dict[str, Any]]) -> None:
+        """Deliver one batch, spooling or counting rather than raising on failure."""
+        if self.spool is not None and time.monotonic() < self._retry_at:
+            # Langfuse failed recently; don't hold the batch up waiting on it again
+            self._spool(batch)
+            return
+        self._deliver(batch, spool_on_failure=True)
+
+    def _deliver(self, batch: List[Dict[str, Any]], spool_on_failure: bool) -> str:
+        """
+        Call the sender once and handle a failure.
+
+        Returns:
+            "sent", "retry" (retryable error, spooled if requested) or "failed" (dropped)
+        """
+        try:
+            self._sender(batch)
+            self.stats["sent"] += len(batch)
+            self.stats["batches"] += 1
+            return "sent"
+        except Exception as e:
+            if self.spool is not None and self._retryable(e):
+                self._retry_at = time.monotonic() + self.retry_interval
+                logger.warning(f"Failed to send {len(batch)} scores to Langfuse, spooling to disk: {e}")
+                if spool_on_failure:
+                    self._spool(batch)
+                return "retry"
+            self.stats["failed"] += len(batch)
+            logger.warning(f"Failed to send {len(batch)} scores to Langfuse: {e}")
+            return "failed"
+
+    def _spool(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self.spool.append(batch)
+            self.stats["spooled"] += len(batch)
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            logger.warning(f"Could not spool {len(batch)} scores: {e}")
+
+    def _ensure_thread(self) -> None:
+        """Start the flush thread on first use. Caller holds the condition."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="score-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        """Flush loop: wake on a full batch, the interval or shutdown."""
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.batch_size:
+                    self._cond.wait(timeout=self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+def create_score_writer(
+    sender: Callable[[List[Dict[str, Any]]], None],
+    retryable: Callable[[Exception], bool] = lambda e: True,
+) -> ScoreWriter:
+    """
+    Create a score writer that flushes on interpreter shutdown and spools to
+    SCORE_SPOOL_DIR when Langfuse is unreachable.
+
+    Args:
+        sender: Callable that delivers one batch of score dicts to Langfuse
+        retryable: Decides whether a send error is worth spooling
+
+    Returns:
+        The score writer
+    """
+    spool = None
+    if SCORE_SPOOL_DIR:
+        try:
+            spool = DiskSpool(SCORE_SPOOL_DIR, max_bytes=SCORE_SPOOL_MAX_BYTES)
+        except Exception as e:
+            logger.warning(f"Could not open score spool at {SCORE_SPOOL_DIR}, failed scores will be dropped: {e}")
+    writer = ScoreWriter(sender, spool=spool, retryable=retryable)
+    if spool is not None and spool.pending():
+        # Replay what an earlier process left behind, even before any new score arrives
+        with writer._cond:
+            writer._ensure_thread()
+    atexit.register(writer.shutdown)
+    return writer
@@ -1,18 +1,116 @@
 """
 Search module for the Q&A agent.
-Provides functionality to search the web using DuckDuckGo.
+Provides functionality to search the web using DuckDuckGo, or a local index,
+through the retrieval backends configured in SEARCH_BACKENDS.
 """
 
-from duckduckgo_search import DDGS
-import requests
-from bs4 import BeautifulSoup
 from typing import List, Dict, Any, Optional
+import os
+import re
+import json
+import asyncio
 import logging
+from urllib.parse import urlparse
+from cache import CacheBackend, MemoryCache, SQLiteCache, TieredCache
+from fetcher import fetch_all, get_session, FETCH_TIMEOUT
+from metrics import track_call
+from transport import UPSTREAMS, call_upstream
+from singleflight import SingleFlight
+from retrieval import RetrievalBackend, LocalIndexBackend
+from html_extract import EXTRACT_MODE, EXTRACT_MAX_BYTES, EXTRACT_CHUNK_SIZE, extract_text_soup, extract_text_streaming
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Search cache configuration from environment
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+# Optional SQLite file for a persistent second tier
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "")
+SEARCH_CACHE_DISK_SIZE = int(os.getenv("SEARCH_CACHE_DISK_SIZE", "100000"))
+SEARCH_SINGLEFLIGHT_ENABLED = os.getenv("SEARCH_SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+# Retrieval backends asked in order until one returns results: duckduckgo, local
+SEARCH_BACKENDS = [name.strip() for name in os.getenv("SEARCH_BACKENDS", "duckduckgo").split(",") if name.strip()]
+
+def create_search_cache() -> Optional[CacheBackend]:
+    """
+    Build the search result cache from environment configuration.
+    
+    Returns:
+        An in-memory LRU cache, tiered over SQLite when SEARCH_CACHE_PATH is
+        set, or None if caching is disabled
+    """
+    if not SEARCH_CACHE_ENABLED:
+        return None
+    memory = MemoryCache(max_entries=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+    if not SEARCH_CACHE_PATH:
+        return memory
+    try:
+        disk = SQLiteCache(SEARCH_CACHE_PATH, max_entries=SEARCH_CACHE_DISK_SIZE, ttl=SEARCH_CACHE_TTL, table="search_results")
+        return TieredCache(memory, disk)
+    except Exception as e:
+        logger.warning(f"Could not open search cache at {SEARCH_CACHE_PATH}, using memory only: {e}")
+        return memory
+
+# Result cache for research_question; replace with set_search_cache()
+search_cache = create_search_cache()
+
+# Coalesces concurrent identical searches
+search_flight = SingleFlight("search")
+
+def set_search_cache(cache: Optional[CacheBackend]) -> None:
+    """
+    Replace the search result cache, or disable it with None.
+    
+    Args:
+        cache: Any CacheBackend implementation
+    """
+    global search_cache
+    search_cache = cache
+
+def search_cache_stats() -> Dict[str, Any]:
+    """
+    Summarize search cache effectiveness for tracing.
+    
+    Returns:
+        Dictionary with hits, misses and hit_ratio (empty if caching is disabled)
+    """
+    cache = search_cache
+    if cache is None:
+        return {}
+    return {
+        "hits": cache.stats["hits"],
+        "misses": cache.stats["misses"],
+        "hit_ratio": round(cache.hit_ratio(), 4),
+    }
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivially different phrasings share a cache entry.
+    Case-folds, replaces punctuation with spaces and collapses whitespace.
+    
+    Args:
+        query: The raw query
+        
+    Returns:
+        The normalized query
+    """
+    query = re.sub(r"[^\w\s]", " ", query.casefold())
+    return " ".join(query.split())
+
+# duckduckgo_search is imported on first search (or by `get_ddgs`) to keep imports fast
+DDGS = None
+
+def get_ddgs():
+    """Return the DDGS class, importing duckduckgo_search on first use."""
+    global DDGS
+    if DDGS is None:
+        from duckduckgo_search import DDGS as ddgs_class
+        DDGS = ddgs_class
+    return DDGS
+
 def search_duckduckgo(query: str, max_results: int = 3) -> List[Dict[str, str]]:
     """
     Search DuckDuckGo for the given query and return results.
@@ -25,13 +123,89 @@ def search_duckduckgo(query: str, max_results: int = 3) -> List[Dict[str, str]]:
         List of search result dictionaries with title, body, and href
     """
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
-            return results
+        ddgs_class = get_ddgs()
+        timeout = int(UPSTREAMS["duckduckgo"].timeout)
+        
+        def attempt() -> List[Dict[str, str]]:
+            with ddgs_class(timeout=timeout) as ddgs:
+                return list(ddgs.text(query, max_results=max_results))
+        
+        with track_call("duckduckgo"):
+            return call_upstream("duckduckgo", attempt)
     except Exception as e:
         logger.error(f"DuckDuckGo search error: {e}")
         return []
 
+class DuckDuckGoBackend(RetrievalBackend):
+    """Live web search through `search_duckduckgo`."""
+
+    name = "duckduckgo"
+
+    def search(self, query: str, max_results: int = 3) -> List[Dict[str, str]]:
+        return search_duckduckgo(query, max_results)
+
+BACKEND_FACTORIES = {
+    "duckduckgo": DuckDuckGoBackend,
+    "local": LocalIndexBackend,
+}
+
+def create_retrieval_backends(names: Optional[List[str]] = None) -> List[RetrievalBackend]:
+    """
+    Build the retrieval backends from configuration.
+    
+    Args:
+        names: Backend names in the order they are asked (SEARCH_BACKENDS if None)
+        
+    Returns:
+        The backends that could be created; unknown names and backends that
+        fail to open are skipped with a warning
+    """
+    backends = []
+    for name in SEARCH_BACKENDS if names is None else names:
+        factory = BACKEND_FACTORIES.get(name)
+        if factory is None:
+            logger.warning(f"Unknown search backend {name!r}, skipping")
+            continue
+        try:
+            backends.append(factory())
+        except Exception as e:
+            logger.warning(f"Could not open search backend {name!r}, skipping: {e}")
+    return backends
+
+# Backends used by research_question; replace with set_retrieval_backends()
+retrieval_backends = create_retrieval_backends()
+
+def set_retrieval_backends(backends: List[RetrievalBackend]) -> None:
+    """
+    Replace the retrieval backends, e.g. to serve from a local index in tests.
+    
+    Args:
+        backends: Backends asked in order until one returns results
+    """
+    global retrieval_backends
+    retrieval_backends = backends
+
+def retrieve(query: str, max_results: int = 3) -> List[Dict[str, str]]:
+    """
+    Ask each retrieval backend in turn and return the first non-empty results.
+    
+    Args:
+        query: The search query
+        max_results: Maximum number of results to return
+        
+    Returns:
+        List of search result dictionaries with title, body, and href
+    """
+    for backend in retrieval_backends:
+        try:
+            results = backend.search(query, max_results)
+        except Exception as e:
+            logger.error(f"{backend.name} search error: {e}")
+            continue
+        if results:
+            return results
+    return []
+
 def format_search_results(results: List[Dict[str, str]]) -> List[str]:
     """
     Format search results into a list of readable strings.
@@ -47,16 +221,26 @@ def format_search_results(results: List[Dict[str, str]]) -> List[str]:
         formatted = f"Title: {r.get('title', 'No title')}\n"
         formatted += f"Content: {r.get('body', 'No content')}\n"
         formatted += f"URL: {r.get('href', 'No URL')}"
+        if r.get('webpage_content'):
+            formatted += f"\nPage content: {r['webpage_content']}"
         formatted_results.append(formatted)
     return formatted_results
 
-def fetch_webpage_content(url: str, max_length: int = 1000) -> Optional[str]:
+def fetch_webpage_content(
+    url: str,
+    max_length: int = 1000,
+    timeout: float = FETCH_TIMEOUT,
+    mode: str = EXTRACT_MODE,
+) -> Optional[str]:
     """
     Fetch and extract the main content from a webpage.
     
     Args:
         url: The URL to fetch
         max_length: Maximum length of content to return
+        timeout: Request timeout in seconds
+        mode: "stream" to parse the body incrementally and stop early,
+            or "soup" to download it fully and parse it with BeautifulSoup
         
     Returns:
         Extracted text content or None if failed
@@ -65,37 +249,34 @@ def fetch_webpage_content(url: str, max_length: int = 1000) -> Optional[str]:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        response = requests.get(url, headers=headers, timeout=5)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.extract()
+        timeouts = (min(UPSTREAMS["page_fetch"].connect_timeout, timeout), timeout)
         
-        # Get text
-        text = soup.get_text(separator='\n')
-        
-        # Break into lines and remove leading and trailing space on each
-        lines = (line.strip() for line in text.splitlines())
-        # Break multi-headlines into a line each
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        # Drop blank lines
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        # Truncate if needed
-        if len(text) > max_length:
-            text = text[:max_length] + "..."
+        def attempt() -> Optional[str]:
+            if mode == "soup":
+                response = get_session().get(url, headers=headers, timeout=timeouts)
+                response.raise_for_status()
+                return extract_text_soup(response.text, max_length)
             
-        return text
+            # Stream the body and stop reading once enough text is collected
+            with get_session().get(url, headers=headers, timeout=timeouts, stream=True) as response:
+                response.raise_for_status()
+                return extract_text_streaming(
+                    response.iter_content(chunk_size=EXTRACT_CHUNK_SIZE),
+                    max_length=max_length,
+                    max_bytes=EXTRACT_MAX_BYTES,
+                    encoding=response.encoding or "utf-8",
+                )
+        
+        # One breaker per host, so a single slow site can't block the others
+        with track_call("page_fetch"):
+            return call_upstream("page_fetch", attempt, key=urlparse(url).netloc.lower())
     except Exception as e:
         logger.error(f"Error fetching webpage content from {url}: {e}")
         return None
 
 def research_question(question: str, max_results: int = 3, fetch_content: bool = False) -> List[str]:
     """
-    Research a question by searching DuckDuckGo and optionally fetching webpage content.
+    Research a question through the retrieval backends and optionally fetch webpage content.
     
     Args:
         question: The question to research
@@ -105,24 +286,76 @@ def research_question(question: str, max_results: int = 3, fetch_content: bool =
     Returns:
         List of research results as formatted strings
     """
-    # Search DuckDuckGo
-    search_results = search_duckduckgo(question, max_results)
+    cache = search_cache
+    backends = [backend.name for backend in retrieval_backends]
+    cache_key = json.dumps([normalize_query(question), max_results, fetch_content, backends])
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    # Identical searches already in flight share one DuckDuckGo round trip
+    if SEARCH_SINGLEFLIGHT_ENABLED:
+        return search_flight.do(
+            cache_key, lambda: run_research(question, max_results, fetch_content, cache_key)
+        ).value
+    return run_research(question, max_results, fetch_content, cache_key)
+
+def run_research(question: str, max_results: int, fetch_content: bool, cache_key: str) -> List[str]:
+    """
+    Search, optionally fetch pages, format the results and cache them.
+    
+    Args:
+        question: The question to research
+        max_results: Maximum number of search results to return
+        fetch_content: Whether to fetch and include webpage content
+        cache_key: Search cache key for the formatted results
+        
+    Returns:
+        List of research results as formatted strings
+    """
+    cache = search_cache
+    
+    # Search the configured backends (DuckDuckGo by default)
+    search_results = retrieve(question, max_results)
     
     if not search_results:
         logger.warning(f"No search results found for question: {question}")
         return []
     
-    # If fetch_content is True, fetch and add webpage content
+    # If fetch_content is True, fetch all web pages concurrently and add what arrives in time;
+    # local index results already hold their passage
     if fetch_content:
+        contents = fetch_all(
+            [result.get('href') for result in search_results if str(result.get('href', '')).startswith(("http://", "https://"))],
+            lambda url, timeout: fetch_webpage_content(url, timeout=timeout),
+        )
         for result in search_results:
-            url = result.get('href')
-            if url:
-                content = fetch_webpage_content(url)
-                if content:
-                    result['webpage_content'] = content
+            content = contents.get(result.get('href'))
+            if content:
+                result['webpage_content'] = content
     
     # Format the results
-    return format_search_results(search_results)
+    formatted = format_search_results(search_results)
+    if cache is not None:
+        cache.set(cache_key, formatted)
+    return formatted
+
+async def aresearch_question(question: str, max_results: int = 3, fetch_content: bool = False) -> List[str]:
+    """
+    Async version of `research_question`.
+    The DuckDuckGo client is synchronous, so the search runs on a worker
+    thread and the event loop stays free for other requests.
+    
+    Args:
+        question: The question to research
+        max_results: Maximum number of search results to return
+        fetch_content: Whether to fetch and include webpage content
+        
+    Returns:
+        List of research results as formatted strings
+    """
+    return await asyncio.to_thread(research_question, question, max_results, fetch_content)
 
 if __name__ == "__main__":
     # Test the search functionality
@@ -0,0 +1,230 @@
+"""
+Semantic answer cache for the Q&A agent.
+Embeds questions with a local, CPU-only hashing vectorizer and serves a stored
+answer when a new question is close enough (cosine similarity) to a cached one
+asked under the same prompt version. A close match is only served when it
+asks about the same numbers, uses the same negations and names its content
+words in the same order, since questions like "Celsius to Fahrenheit" and
+"Fahrenheit to Celsius", or "What is X?" and "What is not X?", embed almost
+identically.
+"""
+
+import os
+import re
+import time
+import zlib
+import threading
+import logging
+from typing import Any, Dict, List, Optional, TypedDict
+
+import numpy as np
+
+from bm25 import STOPWORDS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cache configuration from environment
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "5000"))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "1024"))
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# Contractions expanded before embedding so "what's" matches "what is"
+CONTRACTIONS = {"'s": " is", "'re": " are", "'m": " am", "n't": " not", "'ll": " will", "'ve": " have", "'d": " would"}
+# Stopwords that flip a question's meaning, so they must match exactly like numbers
+NEGATIONS = {"not", "no", "never", "without", "nor"}
+
+def normalize_words(text: str) -> List[str]:
+    """Lowercase a text, expand contractions and return its words."""
+    text = text.lower()
+    for short, expanded in CONTRACTIONS.items():
+        text = text.replace(short, expanded)
+    return WORD_PATTERN.findall(text)
+
+def question_signature(text: str) -> Dict[str, Any]:
+    """
+    Summarize what a question must share with a cached one to reuse its answer.
+
+    Args:
+        text: The question
+
+    Returns:
+        Dictionary with the sorted numeric tokens, the sorted negation words
+        and the content words in order
+    """
+    words = normalize_words(text)
+    return {
+        "numbers": sorted(w for w in words if w.isdigit()),
+        "negations": sorted(w for w in words if w in NEGATIONS),
+        "content": [w for w in words if w not in STOPWORDS and not w.isdigit()],
+    }
+
+def signatures_match(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    """
+    Check that two questions ask about the same numbers with the same
+    negations and that the content words they share appear in the same order.
+    """
+    if a["numbers"] != b["numbers"] or a["negations"] != b["negations"]:
+        return False
+    shared = set(a["content"]) & set(b["content"])
+    return [w for w in a["content"] if w in shared] == [w for w in b["content"] if w in shared]
+
+class SemanticHit(TypedDict):
+    answer: str
+    metadata: Dict[str, Any]
+    similarity: float
+
+class HashingVectorizer:
+    """
+    Stateless text embedder using the hashing trick.
+
+    Features are word unigrams, word bigrams and character trigrams, hashed
+    with a sign bit into `dim` buckets and L2-normalized, so cosine
+    similarity is a plain dot product.
+    """
+
+    def __init__(self, dim: int = SEMANTIC_CACHE_DIM):
+        self.dim = dim
+
+    def features(self, text: str) -> List[str]:
+        """Return the feature strings for a text."""
+        words = normalize_words(text)
+        features = [f"w:{w}" for w in words]
+        features.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+        for w in words:
+            padded = f" {w} "
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def transform(self, text: str) -> np.ndarray:
+        """
+        Embed a text.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            L2-normalized float32 vector of length `dim`
+        """
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in self.features(text)), dtype=np.uint64)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if hashes.size:
+            signs = np.where(hashes & np.uint64(1 << 31), -1.0, 1.0).astype(np.float32)
+            np.add.at(vector, (hashes % np.uint64(self.dim)).astype(np.int64), signs)
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector
+
+class SemanticCache:
+    """
+    Fixed-capacity matrix of question embeddings with per-row metadata.
+
+    Lookups are one matrix-vector product over all rows, masked to the
+    requested namespace (prompt label/version) and unexpired entries. Rows
+    above the threshold are tried best first until one passes
+    `signatures_match`. When full, the least recently used row is overwritten.
+    """
+
+    def __init__(
+        self,
+        vectorizer: Optional[HashingVectorizer] = None,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        capacity: int = SEMANTIC_CACHE_SIZE,
+    ):
+        """
+        Args:
+            vectorizer: Embedder; a HashingVectorizer by default
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds an entry can be served
+            capacity: Maximum number of cached answers
+        """
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.threshold = threshold
+        self.ttl = ttl
+        self.capacity = capacity
+        self._vectors = np.zeros((capacity, self.vectorizer.dim), dtype=np.float32)
+        self._expires_at = np.zeros(capacity, dtype=np.float64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._row_namespace = np.full(capacity, -1, dtype=np.int32)
+        self._namespace_ids: Dict[str, int] = {}
+        self._payloads: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "rejected": 0, "inserts": 0, "evictions": 0}
+
+    def lookup(self, question: str, namespace: str) -> Optional[SemanticHit]:
+        """
+        Find a cached answer for a similar question.
+
+        Args:
+            question: The user's question
+            namespace: Prompt label/version the answer must have been generated with
+
+        Returns:
+            The best hit above the threshold with matching numbers and word
+            order, or None
+        """
+        vector = self.vectorizer.transform(question)
+        signature = question_signature(question)
+        now = time.time()
+        with self._lock:
+            namespace_id = self._namespace_ids.get(namespace)
+            if namespace_id is None:
+                self.stats["misses"] += 1
+                return None
+            similarities = self._vectors @ vector
+            valid = (self._expires_at > now) & (self._row_namespace == namespace_id)
+            similarities = np.where(valid, similarities, -1.0)
+            candidates = np.flatnonzero(similarities >= self.threshold)
+            best = None
+            for row in candidates[np.argsort(-similarities[candidates], kind="stable")]:
+                if signatures_match(signature, self._payloads[row]["signature"]):
+                    best = int(row)
+                    break
+                self.stats["rejected"] += 1
+            if best is None:
+                self.stats["misses"] += 1
+                return None
+            similarity = float(similarities[best])
+            self._last_used[best] = now
+            self.stats["hits"] += 1
+            payload = self._payloads[best]
+        return {"answer": payload["answer"], "metadata": payload["metadata"], "similarity": similarity}
+
+    def insert(self, question: str, namespace: str, answer: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Cache an answer for a question.
+
+        Args:
+            question: The question that was answered
+            namespace: Prompt label/version the answer was generated with
+            answer: The answer text
+            metadata: Extra fields returned on a hit (e.g. has_search_results)
+        """
+        vector = self.vectorizer.transform(question)
+        now = time.time()
+        with self._lock:
+            expired = np.flatnonzero(self._expires_at <= now)
+            if expired.size:
+                row = int(expired[0])
+            else:
+                row = int(np.argmin(self._last_used))
+                self.stats["evictions"] += 1
+            self._vectors[row] = vector
+            self._expires_at[row] = now + self.ttl
+            self._last_used[row] = now
+            self._row_namespace[row] = self._namespace_ids.setdefault(namespace, len(self._namespace_ids))
+            self._payloads[row] = {"answer": answer, "metadata": dict(metadata or {}), "signature": question_signature(question)}
+            self.stats["inserts"] += 1
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._expires_at[:] = 0
+            self._row_namespace[:] = -1
+            self._payloads = [None] * self.capacity
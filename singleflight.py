@@ -0,0 +1,167 @@
+"""
+Request coalescing for the Q&A agent.
+Concurrent calls with the same key share one in-flight computation: the first
+caller (the leader) runs it, the others (followers) wait for its result.
+Nothing is cached once the computation finishes.
+"""
+
+import asyncio
+import threading
+import logging
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, TypeVar
+
+from metrics import registry
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_CALLS = registry.counter(
+    "qa_singleflight_calls_total", "Coalesced calls by role", ["flight", "role"]
+)
+
+class FlightResult(NamedTuple):
+    value: Any
+    # True for followers, which received the leader's result
+    shared: bool
+    # Whatever the leader passed as `context`, e.g. its trace ID
+    leader_context: Any
+    # Number of followers that joined the flight (only known to the leader)
+    followers: int
+
+class _Call:
+    """One in-flight computation and the callers waiting on it."""
+
+    def __init__(self, context: Any):
+        self.context = context
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+class SingleFlight:
+    """
+    Thread-safe single-flight group.
+
+    Errors are shared too: if the leader's computation raises, every follower
+    waiting on it receives the same exception.
+    """
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Label used in metrics
+        """
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], T], context: Any = None) -> FlightResult:
+        """
+        Run `fn` once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the computation
+            fn: Zero-argument callable run by the leader
+            context: Leader information handed to followers
+
+        Returns:
+            The shared value and whether this caller was a follower
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call(context)
+                leader = True
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.inc(flight=self.name, role="follower")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return FlightResult(call.value, True, call.context, 0)
+
+        SINGLEFLIGHT_CALLS.inc(flight=self.name, role="leader")
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return FlightResult(call.value, False, context, call.followers)
+
+    def in_flight(self) -> int:
+        """Return the number of keys currently being computed."""
+        with self._lock:
+            return len(self._calls)
+
+class _AsyncCall:
+    """One in-flight task and the number of callers that joined it."""
+
+    def __init__(self, task: "asyncio.Task", context: Any):
+        self.task = task
+        self.context = context
+        self.followers = 0
+
+class AsyncSingleFlight:
+    """
+    Single-flight group for coroutines running on one event loop.
+
+    The computation runs in its own task, which every caller (the leader
+    included) awaits through `asyncio.shield`. Cancelling one caller, e.g.
+    when its client disconnects, therefore never cancels the others; the
+    task keeps running until it finishes.
+    """
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Label used in metrics
+        """
+        self.name = name
+        self._calls: Dict[str, _AsyncCall] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]], context: Any = None) -> FlightResult:
+        """
+        Await `fn()` once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the computation
+            fn: Zero-argument callable returning a new awaitable, run by the leader
+            context: Leader information handed to followers
+
+        Returns:
+            The shared value and whether this caller was a follower
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            call.followers += 1
+            SINGLEFLIGHT_CALLS.inc(flight=self.name, role="follower")
+            value = await asyncio.shield(call.task)
+            return FlightResult(value, True, call.context, 0)
+
+        SINGLEFLIGHT_CALLS.inc(flight=self.name, role="leader")
+        call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn()), context)
+        call.task.add_done_callback(lambda task: self._finish(key, call))
+        value = await asyncio.shield(call.task)
+        return FlightResult(value, False, context, call.followers)
+
+    def _finish(self, key: str, call: _AsyncCall) -> None:
+        """Forget a finished flight so the next call with its key runs again."""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Retrieve the error once so a flight whose callers all left doesn't log a warning
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def in_flight(self) -> int:
+        """Return the number of keys currently being computed."""
+        return len(self._calls)
@@ -0,0 +1,134 @@
+"""
+Speculative generation for the Q&A agent.
+Tracks a no-search answer generated while the web search is still running,
+decides whether it is used or cancelled once the search is in, and counts the
+tokens it used or wasted per prompt label.
+"""
+
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from metrics import registry
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Speculation is opt-in: it spends tokens on answers that are often thrown away
+SPECULATIVE_GENERATION_ENABLED = os.getenv("SPECULATIVE_GENERATION_ENABLED", "false").lower() == "true"
+# Seconds to wait for search before answering with the speculative answer (0 waits for search)
+SPECULATIVE_SEARCH_BUDGET = float(os.getenv("SPECULATIVE_SEARCH_BUDGET", "1.5"))
+# Search results needed to cancel the speculative answer
+SPECULATIVE_MIN_RESULTS = int(os.getenv("SPECULATIVE_MIN_RESULTS", "1"))
+SPECULATIVE_WORKERS = int(os.getenv("SPECULATIVE_WORKERS", "32"))
+
+SPECULATIONS = registry.counter(
+    "qa_speculative_generations_total", "Speculative no-search answers by outcome", ["label", "outcome"]
+)
+SPECULATIVE_TOKENS = registry.counter(
+    "qa_speculative_tokens_total", "Tokens spent on speculative answers, used or wasted", ["label", "kind"]
+)
+
+# Outcomes in which the speculative answer is returned to the user
+USED_OUTCOMES = ("used_empty", "used_timeout")
+
+# Threads for the speculative completion and the search it races; separate
+# from the graph branch pool so a branch never waits on its own pool
+executor = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculation")
+
+class SpeculativeRun:
+    """
+    Progress of one speculative completion, shared with the thread or task producing it.
+
+    The producer appends tokens to `parts` and checks `cancelled` between
+    chunks, so a cancelled run stops generating at the next token.
+    """
+
+    def __init__(self, prompt_tokens: int):
+        """
+        Args:
+            prompt_tokens: Estimated prompt size, counted as spent once the request is sent
+        """
+        self.prompt_tokens = prompt_tokens
+        self.parts: List[str] = []
+        self.usage: Any = None
+        self.error: Optional[Exception] = None
+        self.cancelled = threading.Event()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    @property
+    def answer(self) -> str:
+        return "".join(self.parts)
+
+    def cancel(self) -> None:
+        """Ask the producer to stop at its next chunk."""
+        self.cancelled.set()
+
+    def tokens(self) -> Dict[str, int]:
+        """Tokens spent so far: the API's usage once complete, otherwise an estimate (one chunk per token)."""
+        if self.usage is not None:
+            return {
+                "prompt_tokens": getattr(self.usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(self.usage, "completion_tokens", 0) or 0,
+            }
+        return {"prompt_tokens": self.prompt_tokens, "completion_tokens": len(self.parts)}
+
+    def generation_ms(self) -> float:
+        """Time from start to the finished answer (or until now if still running)."""
+        return ((self.finished or time.perf_counter()) - self.started) * 1000
+
+def is_useful(search_results: Optional[List[str]], min_results: int = SPECULATIVE_MIN_RESULTS) -> bool:
+    """Return whether search found enough to answer from."""
+    return len([r for r in (search_results or []) if r and r.strip()]) >= min_results
+
+def choose_outcome(search_results: Optional[List[str]], timed_out: bool) -> str:
+    """
+    Decide what happens to the speculative answer once search is in or out of time.
+
+    Returns:
+        "cancelled" if search found useful results in time, "used_timeout" if it
+        missed the budget, or "used_empty" if it returned nothing useful or failed
+    """
+    if timed_out:
+        return "used_timeout"
+    return "cancelled" if is_useful(search_results) else "used_empty"
+
+def record_speculation(
+    outcome: str, run: SpeculativeRun, search_ms: Optional[float], elapsed_ms: float, label: str
+) -> Dict[str, Any]:
+    """
+    Count a finished speculation and describe it for the trace.
+
+    Args:
+        outcome: From `choose_outcome`, or "failed" if the speculative call failed
+        run: The speculative run
+        search_ms: How long search took, or None if it missed the budget
+        elapsed_ms: Time from start until the node could return
+        label: Prompt label, so speculation can be tuned per label
+
+    Returns:
+        Trace metadata: outcome, tokens spent and wasted, and latency saved
+    """
+    tokens = run.tokens()
+    spent = tokens["prompt_tokens"] + tokens["completion_tokens"]
+    used = outcome in USED_OUTCOMES
+    SPECULATIONS.inc(label=label, outcome=outcome)
+    SPECULATIVE_TOKENS.inc(spent, label=label, kind="used" if used else "wasted")
+
+    # Without speculation the answer would start after search (at least the budget, if it timed out)
+    latency_saved_ms = 0.0
+    if used:
+        waited_ms = search_ms if search_ms is not None else SPECULATIVE_SEARCH_BUDGET * 1000
+        latency_saved_ms = max(0.0, waited_ms + run.generation_ms() - elapsed_ms)
+    return {
+        "speculation": outcome,
+        "speculative_tokens": spent,
+        "speculative_wasted_tokens": 0 if used else spent,
+        "speculative_latency_saved_ms": round(latency_saved_ms, 2),
+        "prompt_label": label,
+    }
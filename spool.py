@@ -0,0 +1,143 @@
+"""
+Append-only disk spool for the Q&A agent.
+Holds JSON records that could not be delivered (e.g. scores while Langfuse is
+down) in size-bounded segment files, so they can be replayed after recovery.
+"""
+
+import os
+import json
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+
+class DiskSpool:
+    """
+    Directory of append-only JSON-lines segments, replayed oldest first.
+
+    New records go to the newest segment until it reaches `segment_bytes`.
+    When the spool grows past `max_bytes`, whole segments are deleted oldest
+    first, so disk usage stays bounded during a long outage.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 50 * 1024 * 1024, segment_bytes: int = 1024 * 1024):
+        """
+        Args:
+            directory: Where segment files are kept; created if missing
+            max_bytes: Disk budget for all segments together
+            segment_bytes: Size at which a new segment is started
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        segments = self._segments()
+        self._next_seq = self._seq(segments[-1]) + 1 if segments else 0
+        self.stats: Dict[str, int] = {"appended": 0, "removed": 0, "dropped": 0, "segments": len(segments), "bytes": self._size(segments)}
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Write records to the newest segment, rotating and trimming as needed.
+
+        Args:
+            records: JSON-serializable dicts
+        """
+        if not records:
+            return
+        data = "".join(json.dumps(r, default=str) + "\n" for r in records).encode("utf-8")
+        with self._lock:
+            segments = self._segments()
+            path = segments[-1] if segments else None
+            if path is None or os.path.getsize(path) >= self.segment_bytes:
+                path = self._new_segment()
+            with open(path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.stats["appended"] += len(records)
+            self._trim()
+
+    def oldest(self) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Return the oldest segment and its records, or None if the spool is empty.
+        The newest segment is sealed first, so appends don't race the replay.
+        """
+        with self._lock:
+            segments = self._segments()
+            if not segments:
+                return None
+            path = segments[0]
+            if len(segments) == 1:
+                # Start a fresh segment for new appends while this one is replayed
+                self._new_segment()
+        records = []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn last line from a crash mid-write
+                        logger.warning(f"Skipping unreadable record in {path}")
+        except FileNotFoundError:
+            # Trimmed while we were reading it
+            pass
+        return path, records
+
+    def remove(self, path: str) -> None:
+        """Delete a replayed segment."""
+        with self._lock:
+            try:
+                os.remove(path)
+                self.stats["removed"] += 1
+            except FileNotFoundError:
+                pass
+            self._refresh_stats()
+
+    def pending(self) -> bool:
+        """Return whether any non-empty segment is waiting to be replayed."""
+        with self._lock:
+            return any(os.path.getsize(p) > 0 for p in self._segments())
+
+    def _segments(self) -> List[str]:
+        """Segment paths, oldest first. Caller holds the lock or is the constructor."""
+        names = [n for n in os.listdir(self.directory) if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)]
+        return [os.path.join(self.directory, n) for n in sorted(names, key=lambda n: self._seq(n))]
+
+    @staticmethod
+    def _seq(path: str) -> int:
+        return int(os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+    @staticmethod
+    def _size(segments: List[str]) -> int:
+        return sum(os.path.getsize(p) for p in segments if os.path.exists(p))
+
+    def _new_segment(self) -> str:
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self._next_seq:08d}{SEGMENT_SUFFIX}")
+        open(path, "ab").close()
+        self._next_seq += 1
+        return path
+
+    def _trim(self) -> None:
+        """Delete the oldest segments while over the disk budget. Caller holds the lock."""
+        segments = self._segments()
+        while len(segments) > 1 and self._size(segments) > self.max_bytes:
+            oldest = segments.pop(0)
+            with open(oldest, "r", encoding="utf-8") as f:
+                dropped = sum(1 for _ in f)
+            os.remove(oldest)
+            self.stats["dropped"] += dropped
+            logger.warning(f"Spool over {self.max_bytes} bytes, dropped {dropped} oldest records")
+        self._refresh_stats()
+
+    def _refresh_stats(self) -> None:
+        segments = self._segments()
+        self.stats["segments"] = len(segments)
+        self.stats["bytes"] = self._size(segments)
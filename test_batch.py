@@ -0,0 +1,78 @@
+"""
+Test script for the batch question API.
+This script replaces the shared search and the per-question agent run with
+timed stand-ins, so it checks how process_questions schedules work without
+OpenAI or DuckDuckGo.
+"""
+
+import time
+import logging
+import threading
+from types import SimpleNamespace
+import agent
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# One slow search with a quick answer, and quick searches with slow answers
+SEARCH_SECONDS = {"q0": 0.4, "q1": 0.05, "q2": 0.05, "q3": 0.05}
+GENERATE_SECONDS = {"q0": 0.05, "q1": 0.4, "q2": 0.4, "q3": 0.4}
+
+def run_batch(questions, concurrency):
+    """Run process_questions with timed stand-ins and return results, calls and wall time."""
+    calls = {"search": [], "generate": []}
+    lock = threading.Lock()
+
+    def research(question):
+        time.sleep(SEARCH_SECONDS[question])
+        with lock:
+            calls["search"].append(question)
+        return [f"Title: {question}\nContent: result"]
+
+    def answer(question, user_id=None, search_results=None):
+        assert search_results == [f"Title: {question}\nContent: result"]
+        time.sleep(GENERATE_SECONDS[question])
+        with lock:
+            calls["generate"].append(question)
+        return {"answer": f"answer to {question}", "trace_id": None}
+
+    saved = (agent.research_for_batch, agent.process_question, agent.search_router)
+    agent.research_for_batch = research
+    agent.process_question = answer
+    agent.search_router = SimpleNamespace(needs_search=lambda question: True)
+    try:
+        start = time.perf_counter()
+        results = agent.process_questions(questions, concurrency)
+        return results, calls, time.perf_counter() - start
+    finally:
+        agent.research_for_batch, agent.process_question, agent.search_router = saved
+
+def test_items_generate_as_soon_as_their_search_is_done():
+    """Concurrent items overlap; nothing waits for the slowest search in the batch."""
+    questions = list(SEARCH_SECONDS)
+    _, _, sequential = run_batch(questions, concurrency=1)
+    results, calls, concurrent = run_batch(questions, concurrency=4)
+
+    assert [r["answer"] for r in results] == [f"answer to {q}" for q in questions]
+    # Sequential is the sum of every search and generation (~1.8s). Searching
+    # everything before generating anything would take the slowest search plus
+    # the slowest generation (~0.8s); pipelined items take the slowest pair (~0.45s)
+    assert sequential >= 1.7
+    assert concurrent < 0.7
+    # The quick searches' answers are generated while q0 is still searching
+    assert calls["search"][-1] == "q0"
+    logger.info(f"Batch of {len(questions)}: sequential {sequential:.2f}s, concurrent {concurrent:.2f}s")
+
+def test_duplicate_questions_share_one_search_and_answer():
+    """Repeated questions are searched and answered once and keep input order."""
+    results, calls, _ = run_batch(["q1", " q1", "q2", "q1"], concurrency=4)
+    assert [r["question"] for r in results] == ["q1", "q1", "q2", "q1"]
+    assert sorted(calls["search"]) == ["q1", "q2"]
+    assert sorted(calls["generate"]) == ["q1", "q2"]
+
+if __name__ == "__main__":
+    logger.info("Testing batch question processing")
+    test_items_generate_as_soon_as_their_search_is_done()
+    test_duplicate_questions_share_one_search_and_answer()
+    logger.info("All batch checks passed")
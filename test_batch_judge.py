@@ -0,0 +1,93 @@
+"""
+Test script for the batched toxicity judge.
+This script uses a fake completion function, so it runs without an OpenAI key.
+"""
+
+import json
+import logging
+from types import SimpleNamespace
+from batch_judge import BatchToxicityJudge, parse_batch_result
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def fake_response(results):
+    """Build an OpenAI-style response carrying the given judge results."""
+    message = SimpleNamespace(content=json.dumps({"results": results}))
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+def make_items(count):
+    return [{"trace_id": f"t{i}", "question": f"q{i}", "answer": f"a{i}"} for i in range(count)]
+
+def test_scores_map_back_to_trace_ids():
+    """One request scores the whole batch and results keep input order."""
+    calls = []
+    def complete(**kwargs):
+        items = json.loads(kwargs["messages"][1]["content"].split("\n", 1)[1])
+        calls.append(len(items))
+        return fake_response([{"id": item["id"], "score": 0.25, "reasoning": "ok"} for item in reversed(items)])
+    
+    results = BatchToxicityJudge(complete, batch_size=10).judge(make_items(3))
+    assert calls == [3]
+    assert [r["trace_id"] for r in results] == ["t0", "t1", "t2"]
+    assert all(r["score"] == 0.25 for r in results)
+
+def test_invalid_items_are_retried_alone_then_reported():
+    """A missing or out-of-range score is retried on its own, never defaulted to 0."""
+    def complete(**kwargs):
+        items = json.loads(kwargs["messages"][1]["content"].split("\n", 1)[1])
+        if len(items) > 1:
+            return fake_response([{"id": "0", "score": 0.0, "reasoning": "fine"}, {"id": "1", "score": 7}])
+        if items[0]["question"] == "q1":
+            return fake_response([{"id": "0", "score": 0.5, "reasoning": "retried"}])
+        return fake_response([])
+    
+    judge = BatchToxicityJudge(complete, max_retries=1)
+    results = judge.judge(make_items(3))
+    assert results[0]["score"] == 0.0
+    assert results[1]["score"] == 0.5
+    assert "error" in results[2] and "score" not in results[2]
+    assert judge.batches[0]["retried"] == 2 and judge.batches[0]["failed"] == 1
+    assert judge.batches[0]["prompt_tokens"] == 300
+
+def test_request_errors_fail_the_batch_without_item_retries():
+    """An outage is retried once as a batch, not once per item."""
+    calls = []
+    def complete(**kwargs):
+        calls.append(1)
+        raise ConnectionError("judge unreachable")
+    
+    judge = BatchToxicityJudge(complete, batch_size=10, max_retries=2, request_retries=1)
+    results = judge.judge(make_items(10))
+    assert len(calls) == 2
+    assert all("Judge request failed" in r["error"] for r in results)
+    assert judge.stats["failed"] == 10 and judge.stats["requests"] == 2
+
+def test_batch_retry_recovers_from_one_request_error():
+    """A batch whose first request fails is scored by the whole-batch retry."""
+    calls = []
+    def complete(**kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise TimeoutError("slow")
+        items = json.loads(kwargs["messages"][1]["content"].split("\n", 1)[1])
+        return fake_response([{"id": item["id"], "score": 0.0, "reasoning": "ok"} for item in items])
+    
+    results = BatchToxicityJudge(complete, request_retries=1).judge(make_items(4))
+    assert len(calls) == 2
+    assert all(r["score"] == 0.0 for r in results)
+
+def test_unparseable_output_yields_no_results():
+    """Non-JSON output is treated as a failure for every item."""
+    assert parse_batch_result("Score: 0.2", 2) == {}
+
+if __name__ == "__main__":
+    logger.info("Testing batched toxicity judge")
+    test_scores_map_back_to_trace_ids()
+    test_invalid_items_are_retried_alone_then_reported()
+    test_request_errors_fail_the_batch_without_item_retries()
+    test_batch_retry_recovers_from_one_request_error()
+    test_unparseable_output_yields_no_results()
+    logger.info("All batch judge checks passed")
@@ -0,0 +1,140 @@
+"""
+Test script for the parallel agent graph.
+This script checks that prompt resolution and search run side by side, that a
+branch missing its deadline falls back instead of stalling the answer, and
+that the linear graph still works, with local stand-ins for the network calls.
+"""
+
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import agent
+import branches
+from branches import run_branch, arun_branch
+from semantic_cache import SemanticCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BRANCH_DELAY = 0.2
+
+def slow_search(state):
+    time.sleep(BRANCH_DELAY)
+    return {**state, "search_results": ["Title: Result\nContent: Found it."]}
+
+def slow_prompt(state):
+    time.sleep(BRANCH_DELAY)
+    return {"prompt_template": "Test prompt {{search_context}}", "prompt_config": {"model": "test-model"}}
+
+def echo_generate(state):
+    """Answer with what generation would see, without calling OpenAI."""
+    return {**state, "answer": f"{state.get('prompt_template')}|{len(state.get('search_results') or [])}"}
+
+def build_agent(graph_shape):
+    """Compile the agent graph around the stand-in nodes."""
+    originals = (agent.perform_search, agent.resolve_prompt, agent.generate_response)
+    agent.perform_search, agent.resolve_prompt, agent.generate_response = slow_search, slow_prompt, echo_generate
+    try:
+        return agent.create_agent(graph_shape), originals
+    except Exception:
+        agent.perform_search, agent.resolve_prompt, agent.generate_response = originals
+        raise
+
+def run_graph(graph_shape, question="What is the latest news today?"):
+    """Invoke a freshly built graph and return its final state and wall time."""
+    graph, originals = build_agent(graph_shape)
+    try:
+        start = time.perf_counter()
+        result = graph.invoke({"question": question})
+        return result, time.perf_counter() - start
+    finally:
+        agent.perform_search, agent.resolve_prompt, agent.generate_response = originals
+
+def test_run_branch_keeps_only_owned_keys():
+    """A branch update carries its own keys and timing, never the rest of the state."""
+    update = run_branch("search", slow_search, {"question": "q"}, ["search_results"], 0, {"search_results": []})
+    assert set(update) == {"search_results", "branch_ms"}
+    assert update["branch_ms"]["search"] >= BRANCH_DELAY * 1000
+
+def test_run_branch_times_out_to_fallback():
+    """A branch past its deadline returns the fallback and is marked degraded."""
+    start = time.perf_counter()
+    update = run_branch("search", slow_search, {"question": "q"}, ["search_results"], 0.05, {"search_results": []})
+    assert time.perf_counter() - start < BRANCH_DELAY
+    assert update["search_results"] == [] and update["degraded_branches"] == ["search"]
+
+def test_deadline_starts_when_the_branch_runs():
+    """Time queued behind other requests' branches doesn't count against the deadline."""
+    saved = branches._executor
+    branches._executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        branches._executor.submit(time.sleep, BRANCH_DELAY)
+        fast = lambda state: {"search_results": ["quick"]}
+        update = run_branch("search", fast, {}, ["search_results"], 0.05, {"search_results": []})
+    finally:
+        branches._executor.shutdown()
+        branches._executor = saved
+    assert update["search_results"] == ["quick"] and not update.get("degraded_branches")
+    assert update["branch_ms"]["search"] >= BRANCH_DELAY * 1000 * 0.9
+
+def test_async_branch_times_out_to_fallback():
+    """The async runner cancels the branch at its deadline."""
+    async def slow(state):
+        await asyncio.sleep(BRANCH_DELAY)
+        return {"search_results": ["late"]}
+
+    update = asyncio.run(arun_branch("search", slow, {}, ["search_results"], 0.05, {"search_results": []}))
+    assert update["search_results"] == [] and update["degraded_branches"] == ["search"]
+
+def test_parallel_graph_overlaps_prompt_and_search():
+    """Both branches reach generation, and the join waits for the slower one, not both."""
+    result, elapsed = run_graph("parallel")
+    assert result["answer"] == "Test prompt {{search_context}}|1"
+    assert set(result["branch_ms"]) == {"prompt", "search"}
+    assert not result.get("degraded_branches")
+    assert elapsed < BRANCH_DELAY * 1.75, elapsed
+
+def test_slow_prompt_falls_back_to_default_prompt():
+    """A prompt fetch past its deadline answers with the fallback prompt."""
+    timeout = agent.BRANCH_TIMEOUT_PROMPT
+    agent.BRANCH_TIMEOUT_PROMPT = 0.05
+    try:
+        result, _ = run_graph("parallel")
+    finally:
+        agent.BRANCH_TIMEOUT_PROMPT = timeout
+    assert result["answer"].startswith(agent.FALLBACK_PROMPT)
+    assert result["degraded_branches"] == ["prompt"]
+
+def test_degraded_and_speculative_answers_are_not_cached():
+    """Fallback answers are served once but never stored in the semantic cache."""
+    saved = agent.semantic_cache
+    agent.semantic_cache = SemanticCache()
+    try:
+        agent.store_answer("Degraded?", "ns", {"answer": "a", "degraded_branches": ["search"]})
+        agent.store_answer("Speculative?", "ns", {"answer": "b", "speculative_answer": "b"})
+        agent.store_answer("Healthy?", "ns", {"answer": "c", "degraded_branches": []})
+        assert agent.semantic_cache.lookup("Degraded?", "ns") is None
+        assert agent.semantic_cache.lookup("Speculative?", "ns") is None
+        assert agent.semantic_cache.lookup("Healthy?", "ns")["answer"] == "c"
+    finally:
+        agent.semantic_cache = saved
+
+def test_linear_graph_still_available():
+    """The linear shape skips the prompt branch and leaves the prompt to generation."""
+    result, _ = run_graph("linear")
+    assert result["answer"] == "None|1"
+    assert not result.get("branch_ms")
+
+if __name__ == "__main__":
+    logger.info("Testing the parallel agent graph")
+    test_run_branch_keeps_only_owned_keys()
+    test_run_branch_times_out_to_fallback()
+    test_deadline_starts_when_the_branch_runs()
+    test_async_branch_times_out_to_fallback()
+    test_parallel_graph_overlaps_prompt_and_search()
+    test_slow_prompt_falls_back_to_default_prompt()
+    test_degraded_and_speculative_answers_are_not_cached()
+    test_linear_graph_still_available()
+    logger.info("All parallel graph checks passed")
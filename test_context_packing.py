@@ -0,0 +1,94 @@
+"""
+Test script for context packing.
+This script checks deduplication, ranking and the token budget on formatted
+search results, without contacting any service.
+"""
+
+import logging
+from types import SimpleNamespace
+import agent
+from bm25 import BM25, tokenize
+from context_packing import pack_context, count_tokens, get_token_counter, ESTIMATED_TOKENIZER
+from search import format_search_results
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_results():
+    return format_search_results([
+        {
+            "title": "Model launch",
+            "body": "OpenAI released a new reasoning model this week.",
+            "href": "https://news.example/launch",
+        },
+        {
+            "title": "Syndicated copy",
+            "body": "OpenAI released a new reasoning model this week.",
+            "href": "https://mirror.example/launch",
+        },
+        {
+            "title": "Cooking",
+            "body": "Boil the pasta for ten minutes. Salt the water generously before adding it.",
+            "href": "https://food.example/pasta",
+            "webpage_content": "Fresh pasta cooks faster than dried pasta. " * 20,
+        },
+    ])
+
+def test_bm25_prefers_matching_documents():
+    """Documents sharing rare query terms score higher."""
+    docs = [tokenize("the reasoning model from OpenAI"), tokenize("pasta recipes for dinner")]
+    scores = BM25(docs).scores(tokenize("new OpenAI model"))
+    assert scores[0] > scores[1] == 0
+
+def test_duplicates_across_sources_are_dropped():
+    """A snippet repeated by a mirror site is kept once."""
+    packed, stats = pack_context("OpenAI reasoning model", make_results(), budget=10000)
+    assert stats["duplicates_dropped"] >= 1
+    assert not any("Syndicated copy" in result for result in packed)
+    assert packed[0].startswith("Title: Model launch\nContent: OpenAI released")
+
+def test_budget_keeps_relevant_passages():
+    """Under a tight budget the relevant source survives and the total fits."""
+    results = make_results()
+    packed, stats = pack_context("OpenAI reasoning model", results, budget=40)
+    assert stats["tokens_before"] == sum(count_tokens(r) for r in results)
+    assert stats["tokens_after"] <= 40
+    assert stats["tokens_saved"] > 0
+    assert len(packed) == 1 and "news.example" in packed[0]
+
+def test_everything_fits_unchanged():
+    """Distinct results under the budget come back as they were formatted."""
+    results = make_results()[:1]
+    packed, stats = pack_context("OpenAI reasoning model", results, budget=10000)
+    assert packed == results
+    assert stats["tokens_saved"] == 0
+
+def test_estimated_counts_are_labeled_on_the_trace():
+    """The trace says which tokenizer counted the saving and whether it is an estimate."""
+    recorded = {}
+    saved = agent.__dict__.get("langfuse_client")
+    agent.langfuse_client = SimpleNamespace(
+        update_current_span=lambda metadata: recorded.setdefault("span", metadata),
+        update_current_trace=lambda metadata: recorded.setdefault("trace", metadata),
+    )
+    try:
+        agent.pack_search_results("OpenAI reasoning model", make_results())
+    finally:
+        agent.langfuse_client = saved
+
+    tokenizer = get_token_counter()[0]
+    estimated = tokenizer == ESTIMATED_TOKENIZER
+    assert recorded["span"]["context_packing"]["tokens_estimated"] is estimated
+    assert recorded["trace"]["context_tokenizer"] == tokenizer
+    assert recorded["trace"]["context_tokens_estimated"] is estimated
+    assert recorded["trace"]["context_tokens_saved"] > 0
+
+if __name__ == "__main__":
+    logger.info("Testing context packing")
+    test_bm25_prefers_matching_documents()
+    test_duplicates_across_sources_are_dropped()
+    test_budget_keeps_relevant_passages()
+    test_everything_fits_unchanged()
+    test_estimated_counts_are_labeled_on_the_trace()
+    logger.info("All context packing checks passed")
@@ -0,0 +1,78 @@
+"""
+Test script for the background evaluation queue.
+This script uses a local handler instead of the LLM judge, so it runs without
+an OpenAI key and checks backpressure, drop counting and draining on shutdown.
+"""
+
+import time
+import logging
+import threading
+from evaluation import EvaluationQueue
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def blocking_handler():
+    """Return a handler that records jobs and blocks until released, with its release event."""
+    release = threading.Event()
+    handled = []
+
+    def handler(trace_id, question, answer):
+        release.wait()
+        handled.append(trace_id)
+    return handler, release, handled
+
+def test_full_queue_drops_after_the_submit_timeout():
+    """A full queue makes submit wait briefly, then drop and count the job."""
+    handler, release, _ = blocking_handler()
+    evaluations = EvaluationQueue(handler, max_size=2, workers=1, submit_timeout=0.05)
+    try:
+        assert evaluations.submit("t0", "q", "a")
+        # Let the worker take t0 so the queue itself holds the next two
+        time.sleep(0.05)
+        assert evaluations.submit("t1", "q", "a") and evaluations.submit("t2", "q", "a")
+
+        start = time.perf_counter()
+        assert not evaluations.submit("t3", "q", "a")
+        assert 0.04 <= time.perf_counter() - start < 0.5
+        assert evaluations.stats["overflowed"] == 1 and evaluations.stats["dropped"] == 1
+        assert evaluations.stats["submitted"] == 3
+    finally:
+        release.set()
+        evaluations.shutdown(timeout=1)
+
+def test_shutdown_drains_queued_jobs():
+    """Jobs accepted before shutdown are all handled; later submits are dropped."""
+    handled = []
+    evaluations = EvaluationQueue(lambda trace_id, q, a: handled.append(trace_id), max_size=100, workers=2)
+    for i in range(20):
+        evaluations.submit(f"t{i}", "q", "a")
+    evaluations.shutdown(timeout=5)
+
+    assert sorted(handled) == sorted(f"t{i}" for i in range(20))
+    assert evaluations.stats["completed"] == 20 and evaluations.stats["dropped"] == 0
+    assert not evaluations.submit("late", "q", "a")
+    assert evaluations.stats["dropped"] == 1
+
+def test_shutdown_of_a_stuck_full_queue_is_bounded():
+    """A full queue behind a stuck handler cannot hang shutdown; what is left is counted as dropped."""
+    handler, release, handled = blocking_handler()
+    evaluations = EvaluationQueue(handler, max_size=3, workers=1, submit_timeout=0)
+    evaluations.submit("t0", "q", "a")
+    time.sleep(0.05)
+    for i in range(1, 4):
+        assert evaluations.submit(f"t{i}", "q", "a")
+
+    start = time.perf_counter()
+    evaluations.shutdown(timeout=0.2)
+    assert time.perf_counter() - start < 1.0
+    assert evaluations.stats["dropped"] == 3
+    release.set()
+
+if __name__ == "__main__":
+    logger.info("Testing background evaluation queue")
+    test_full_queue_drops_after_the_submit_timeout()
+    test_shutdown_drains_queued_jobs()
+    test_shutdown_of_a_stuck_full_queue_is_bounded()
+    logger.info("All evaluation queue checks passed")
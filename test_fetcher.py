@@ -0,0 +1,95 @@
+"""
+Test script for concurrent page fetching.
+This script uses a slow fake fetcher instead of HTTP, so it checks the batch
+deadline, partial results and the per-host limit without network access.
+"""
+
+import time
+import logging
+import threading
+from fetcher import fetch_all, FETCH_PER_HOST_LIMIT
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SlowFetcher:
+    """
+    Fake fetch(url, timeout) that takes a set time per URL.
+
+    Like a server trickling bytes under requests' per-read timeout, it ignores
+    the timeout, so only the batch deadline bounds it.
+    """
+
+    def __init__(self, delays, failing=()):
+        self.delays = delays
+        self.failing = set(failing)
+        self.calls = []
+        self.active = {}
+        self.max_active = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url, timeout):
+        host = url.split("/")[2]
+        with self._lock:
+            self.calls.append((url, timeout))
+            self.active[host] = self.active.get(host, 0) + 1
+            self.max_active[host] = max(self.max_active.get(host, 0), self.active[host])
+        try:
+            time.sleep(self.delays.get(url, 0.01))
+            if url in self.failing:
+                raise ConnectionError(f"{url} refused the connection")
+            return f"content of {url}"
+        finally:
+            with self._lock:
+                self.active[host] -= 1
+
+def test_deadline_returns_partial_results():
+    """Pages that finish in time are returned; the slow one is left out once the deadline passes."""
+    fetcher = SlowFetcher({"https://slow.example/page": 1.0, "https://medium.example/page": 0.1})
+    urls = ["https://fast.example/page", "https://medium.example/page", "https://slow.example/page"]
+
+    start = time.perf_counter()
+    results = fetch_all(urls, fetcher, deadline=0.4, timeout=10)
+    elapsed = time.perf_counter() - start
+
+    assert results == {
+        "https://fast.example/page": "content of https://fast.example/page",
+        "https://medium.example/page": "content of https://medium.example/page",
+    }
+    assert 0.35 <= elapsed < 0.6
+    # The per-request timeout is capped by what is left of the batch deadline
+    assert all(timeout <= 0.4 for _, timeout in fetcher.calls)
+
+def test_failed_and_duplicate_urls():
+    """A failing page maps to None without failing the batch; duplicates are fetched once."""
+    fetcher = SlowFetcher({}, failing=["https://down.example/page"])
+    urls = ["https://up.example/a", "https://down.example/page", "https://up.example/a", ""]
+    results = fetch_all(urls, fetcher, deadline=2, timeout=1)
+
+    assert results == {"https://up.example/a": "content of https://up.example/a", "https://down.example/page": None}
+    assert sorted(url for url, _ in fetcher.calls) == ["https://down.example/page", "https://up.example/a"]
+
+def test_per_host_limit_and_deadline_while_waiting():
+    """No host gets more than its limit at once, and URLs still waiting for their host are dropped at the deadline."""
+    urls = [f"https://busy.example/{i}" for i in range(FETCH_PER_HOST_LIMIT + 2)]
+    fetcher = SlowFetcher({url: 0.3 for url in urls})
+
+    start = time.perf_counter()
+    results = fetch_all(urls, fetcher, deadline=0.45, timeout=10)
+    elapsed = time.perf_counter() - start
+
+    assert fetcher.max_active["busy.example"] == FETCH_PER_HOST_LIMIT
+    assert len(results) == FETCH_PER_HOST_LIMIT
+    # The queued URLs only got what was left of the deadline once a slot freed up
+    timeouts = sorted(timeout for _, timeout in fetcher.calls)
+    assert len(timeouts) == len(urls)
+    assert all(timeout < 0.2 for timeout in timeouts[:2]) and all(timeout > 0.4 for timeout in timeouts[2:])
+    assert elapsed < 0.7
+
+if __name__ == "__main__":
+    logger.info("Testing concurrent page fetching")
+    test_deadline_returns_partial_results()
+    test_failed_and_duplicate_urls()
+    test_per_host_limit_and_deadline_while_waiting()
+    logger.info("All page fetch checks passed")
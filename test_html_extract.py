@@ -0,0 +1,72 @@
+"""
+Test script for HTML-to-text extraction.
+This script checks that the streaming extractor returns the same text as the
+BeautifulSoup extractor, however the body is split into chunks, and that it
+stops reading at the length and byte limits.
+"""
+
+import logging
+from html_extract import extract_text_soup, extract_text_streaming
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAGES = {
+    "article": (
+        "<html><head><title>Title</title><style>p { color: red }</style></head><body>"
+        "<h1>Heading</h1><p>Hello <b>bold</b> world</p>"
+        "<script>var x = '<p>not text</p>';</script>"
+        "<ul><li>One</li><li>Two  parts</li></ul></body></html>"
+    ),
+    "entities": "<p>Fish &amp; chips &lt;3 &#169; &eacute;t&eacute; café — 漢字 \U0001F600</p><p>a&nbsp;b</p>",
+    "markup": "<!DOCTYPE html><!-- hidden <p>x</p> --><div>Visible<br>line<br/>break</div><img src=x alt=y><p>after</p>",
+    "whitespace": "<pre>  line one\n   line two  </pre>\n\n<p>\n   spaced   out  text \n</p><table><tr><td>c1</td><td>c2</td></tr></table>",
+    "unclosed": "<div><p>para one<p>para two<div>nested <span>deep",
+    "non_content": "<p>a</p><noscript>enable js</noscript><template><p>tpl</p></template><p>b</p>",
+}
+
+LONG_PAGE = "<html><body>" + "".join(
+    f"<p>Paragraph {i} has some words &amp; more.</p><script>x = {i};</script>" for i in range(200)
+) + "</body></html>"
+
+def split(data, size):
+    """Split bytes into chunks of `size`, like response.iter_content(size)."""
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_streaming_matches_soup():
+    """Both extractors give the same text, with chunk boundaries inside tags, entities and UTF-8 characters."""
+    for name, html in PAGES.items():
+        expected = extract_text_soup(html, max_length=5000)
+        for size in (1, 3, 7, 64, 16 * 1024):
+            actual = extract_text_streaming(split(html.encode("utf-8"), size), max_length=5000)
+            assert actual == expected, f"{name} split every {size} bytes: {actual!r} != {expected!r}"
+
+def test_max_length_matches_soup_truncation():
+    """Stopping early at max_length gives the same truncated text as the full parse."""
+    data = LONG_PAGE.encode("utf-8")
+    for max_length in (1, 15, 40, 333, 1000):
+        expected = extract_text_soup(LONG_PAGE, max_length=max_length)
+        for size in (1, 5, 64, 4096):
+            assert extract_text_streaming(split(data, size), max_length=max_length) == expected
+
+def test_max_bytes_stops_reading():
+    """Only max_bytes of the body are read, and the text matches the soup extractor on that prefix."""
+    data = LONG_PAGE.encode("utf-8")
+    for max_bytes in (100, 1000, 2500):
+        expected = extract_text_soup(data[:max_bytes].decode("utf-8"), max_length=10 ** 6)
+        for size in (1, 7, 64, 4096):
+            read = []
+            def chunks():
+                for chunk in split(data, size):
+                    read.append(len(chunk))
+                    yield chunk
+            assert extract_text_streaming(chunks(), max_length=10 ** 6, max_bytes=max_bytes) == expected
+            assert sum(read) < max_bytes + size
+
+if __name__ == "__main__":
+    logger.info("Testing HTML text extraction")
+    test_streaming_matches_soup()
+    test_max_length_matches_soup_truncation()
+    test_max_bytes_stops_reading()
+    logger.info("All HTML extraction checks passed")
@@ -2,12 +2,14 @@
 Test script for the LLM-based evaluation feature.
 NOTE: This script is for reference only. The LLM-based evaluation functionality
 has been temporarily removed and will be reimplemented with Langfuse SDK v3.
+The agent answers with the benchmark fakes, so no OpenAI key is needed.
 """
 
 import os
 from dotenv import load_dotenv
 import logging
 from agent import process_question
+from benchmarks.fakes import offline_agent
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -26,7 +28,8 @@ def test_with_auto_eval():
     logger.info("NOTE: LLM-based evaluation is pending implementation with Langfuse SDK v3")
     
     try:
-        result = process_question(question)
+        with offline_agent():
+            result = process_question(question)
         logger.info(f"Answer: {result['answer']}")
         logger.info(f"Has search results: {result['has_search_results']}")
     except Exception as e:
@@ -42,7 +45,8 @@ def test_without_auto_eval():
     logger.info("NOTE: LLM-based evaluation is pending implementation with Langfuse SDK v3")
     
     try:
-        result = process_question(question)
+        with offline_agent():
+            result = process_question(question)
         logger.info(f"Answer: {result['answer']}")
         logger.info(f"Has search results: {result['has_search_results']}")
     except Exception as e:
@@ -60,7 +64,8 @@ def test_with_both_eval_types():
     toxicity_score = 0.05  # Very low toxicity score
     
     try:
-        result = process_question(question, toxicity=toxicity_score)
+        with offline_agent():
+            result = process_question(question, toxicity=toxicity_score)
         logger.info(f"Answer: {result['answer']}")
         logger.info(f"Has search results: {result['has_search_results']}")
         logger.info(f"Toxicity score received: {toxicity_score} (will be implemented with Langfuse SDK v3)")
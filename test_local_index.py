@@ -0,0 +1,129 @@
+"""
+Test script for the local BM25 index and retrieval backends.
+This script builds small indexes in temporary directories and checks ranking,
+incremental adds, compaction and dispatch from research_question, without
+network access.
+"""
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+import search
+from bm25 import BM25, tokenize
+from local_index import LocalIndex, split_passages
+from retrieval import RetrievalBackend, LocalIndexBackend
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DOCUMENTS = [
+    {"title": "Mars rovers", "body": "Perseverance landed in Jezero crater in 2021 to look for signs of life.", "href": "https://example.com/mars"},
+    {"title": "Python", "body": "Python is a programming language. The GIL lets one thread run Python bytecode at a time.", "href": "https://example.com/python"},
+    {"title": "Eiffel Tower", "body": "The Eiffel Tower in Paris was completed in 1889 for the World's Fair.", "href": "https://example.com/eiffel"},
+    {"title": "Curiosity", "body": "The Curiosity rover has explored Gale crater on Mars since 2012.", "href": "https://example.com/curiosity"},
+]
+
+class StaticBackend(RetrievalBackend):
+    """Backend returning fixed results, standing in for DuckDuckGo."""
+
+    name = "static"
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = 0
+
+    def search(self, query, max_results=3):
+        self.calls += 1
+        return self.results[:max_results]
+
+def with_index(test):
+    """Run a test with a fresh index directory."""
+    def run():
+        directory = tempfile.mkdtemp(prefix="test-index-")
+        try:
+            test(directory)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+@with_index
+def test_ranking_matches_in_memory_bm25(directory):
+    """Scores over the index rank documents like the in-memory BM25."""
+    index = LocalIndex(directory)
+    index.add(DOCUMENTS)
+    query = "rover crater on Mars"
+    scores = BM25([tokenize(f"{d['title']}\n{d['body']}") for d in DOCUMENTS]).scores(tokenize(query))
+    expected = [DOCUMENTS[i]["href"] for i in sorted(range(len(DOCUMENTS)), key=lambda i: -scores[i]) if scores[i] > 0]
+    assert [r["href"] for r in index.search(query, max_results=4)] == expected
+    assert index.search("no such words", max_results=3) == []
+
+@with_index
+def test_segments_and_compaction_keep_results(directory):
+    """Documents added in several segments rank the same before and after compaction."""
+    index = LocalIndex(directory, max_segments=10)
+    for doc in DOCUMENTS:
+        index.add([doc])
+    assert index.stats()["segments"] == len(DOCUMENTS)
+    before = index.search("rover crater on Mars", max_results=3)
+    index.compact()
+    stats = index.stats()
+    assert stats["segments"] == 1 and stats["documents"] == len(DOCUMENTS)
+    assert index.search("rover crater on Mars", max_results=3) == before
+    # A reopened index maps the compacted segment
+    assert LocalIndex(directory).search("rover crater on Mars", max_results=3) == before
+
+@with_index
+def test_add_folder_skips_indexed_files(directory):
+    """Re-running on a folder only indexes new files."""
+    folder = os.path.join(directory, "docs")
+    os.makedirs(folder)
+    with open(os.path.join(folder, "mars.md"), "w", encoding="utf-8") as f:
+        f.write("# Mars rovers\n\nPerseverance landed in Jezero crater.\n\nCuriosity explores Gale crater.")
+    index = LocalIndex(os.path.join(directory, "index"))
+    assert index.add_folder(folder) == 1
+    assert index.add_folder(folder) == 0
+    with open(os.path.join(folder, "kb.jsonl"), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"title": "Eiffel Tower", "text": "Completed in 1889.", "url": "https://example.com/eiffel"}) + "\n")
+    assert index.add_folder(folder) == 1
+    result = index.search("Jezero crater", max_results=1)[0]
+    assert result["title"] == "Mars rovers" and result["href"].endswith("#passage-1")
+    assert "#" not in result["body"]
+
+def test_split_passages_respects_word_limit():
+    """Paragraphs are grouped up to the limit and long ones are cut."""
+    text = "one two three\n\nfour five\n\n" + " ".join(["word"] * 7)
+    assert split_passages(text, max_words=5) == ["one two three four five", "word word word word word", "word word"]
+
+@with_index
+def test_research_question_dispatches_through_backends(directory):
+    """Local results are formatted like DuckDuckGo's, and an empty backend falls through."""
+    index_dir = os.path.join(directory, "index")
+    LocalIndex(index_dir).add(DOCUMENTS)
+    fallback = StaticBackend([{"title": "Web", "body": "From the web.", "href": "https://example.com/web"}])
+    saved_backends, saved_cache = search.retrieval_backends, search.search_cache
+    search.set_search_cache(None)
+    try:
+        search.set_retrieval_backends([LocalIndexBackend(index_dir), fallback])
+        results = search.research_question("When was the Eiffel Tower completed?", max_results=1, fetch_content=True)
+        assert results == search.format_search_results([DOCUMENTS[2]])
+        assert fallback.calls == 0
+
+        results = search.research_question("quantum chromodynamics", max_results=1)
+        assert results[0].startswith("Title: Web") and fallback.calls == 1
+    finally:
+        search.set_retrieval_backends(saved_backends)
+        search.set_search_cache(saved_cache)
+
+if __name__ == "__main__":
+    logger.info("Testing the local index")
+    test_ranking_matches_in_memory_bm25()
+    test_segments_and_compaction_keep_results()
+    test_add_folder_skips_indexed_files()
+    test_split_passages_respects_word_limit()
+    test_research_question_dispatches_through_backends()
+    logger.info("All local index checks passed")
@@ -0,0 +1,41 @@
+"""
+Test script for the in-process metrics.
+This script checks histogram buckets, token counting and the Prometheus text
+format without contacting any service.
+"""
+
+import logging
+from types import SimpleNamespace
+from metrics import MetricsRegistry, LLM_TOKENS, record_token_usage
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_histogram_renders_cumulative_buckets():
+    """Each bucket counts every observation at or below its bound."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo latency", ["node"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, node="generate")
+    histogram.observe(0.5, node="generate")
+    histogram.observe(5.0, node="generate")
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{node="generate",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{node="generate",le="1"} 2' in text
+    assert 'demo_seconds_bucket{node="generate",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{node="generate"} 3' in text
+
+def test_token_usage_is_counted_per_call():
+    """Prompt and completion tokens from `response.usage` are added up."""
+    before = LLM_TOKENS.value(call="test", type="completion")
+    tokens = record_token_usage("test", SimpleNamespace(prompt_tokens=12, completion_tokens=30))
+    assert tokens == {"prompt_tokens": 12, "completion_tokens": 30}
+    assert LLM_TOKENS.value(call="test", type="completion") - before == 30
+    assert record_token_usage("test", None) == {}
+
+if __name__ == "__main__":
+    logger.info("Testing metrics")
+    test_histogram_renders_cumulative_buckets()
+    test_token_usage_is_counted_per_call()
+    logger.info("All metrics checks passed")
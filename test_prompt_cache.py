@@ -0,0 +1,110 @@
+"""
+Test script for the prompt cache.
+This script exercises the TTL, stale-while-revalidate and on-disk behaviour
+without contacting Langfuse.
+"""
+
+import time
+import tempfile
+import logging
+from prompt_cache import PromptCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_fetcher(calls, template="Prompt v{n}"):
+    """Return a fake fetcher that counts its calls."""
+    def fetcher(name, label, version):
+        calls.append((name, label, version))
+        return {"template": template.format(n=len(calls)), "config": {"temperature": 0}, "version": len(calls)}
+    return fetcher
+
+def wait_for(predicate, timeout=2.0):
+    """Poll until the predicate holds or the timeout expires."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_fresh_entry_is_served_from_memory():
+    """A second lookup within the TTL does not call the fetcher."""
+    calls = []
+    cache = PromptCache(make_fetcher(calls), ttl=60, cache_dir=None)
+    first = cache.get("qa", label="development")
+    second = cache.get("qa", label="development")
+    assert first["template"] == second["template"]
+    assert len(calls) == 1
+    assert cache.stats["misses"] == 1 and cache.stats["hits"] == 1
+
+def test_stale_entry_is_served_while_refreshing():
+    """An expired entry is returned immediately and refreshed in the background."""
+    calls = []
+    cache = PromptCache(make_fetcher(calls), ttl=0, cache_dir=None)
+    first = cache.get("qa", label="development")
+    stale = cache.get("qa", label="development")
+    assert stale["template"] == first["template"]
+    assert wait_for(lambda: cache.stats["refreshes"] == 1)
+    assert len(calls) == 2
+
+def test_cold_start_uses_disk_copy():
+    """A new cache instance serves the last good template from disk."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        PromptCache(make_fetcher([]), ttl=60, cache_dir=cache_dir).get("qa", label="development")
+
+        def failing_fetcher(name, label, version):
+            raise ConnectionError("Langfuse is down")
+
+        cache = PromptCache(failing_fetcher, ttl=60, cache_dir=cache_dir)
+        entry = cache.get("qa", label="development")
+        assert entry["template"] == "Prompt v1"
+        assert cache.stats["disk_hits"] == 1
+        assert wait_for(lambda: cache.stats["refresh_failures"] == 1)
+
+def test_failed_fetch_backs_off():
+    """After a failed cold fetch, lookups fail fast instead of retrying."""
+    calls = []
+
+    def failing_fetcher(name, label, version):
+        calls.append(name)
+        raise ConnectionError("Langfuse is down")
+
+    cache = PromptCache(failing_fetcher, ttl=60, cache_dir=None, failure_backoff=60)
+    for _ in range(3):
+        try:
+            cache.get("qa", label="development")
+        except Exception as e:
+            logger.info(f"Expected failure: {e}")
+    assert len(calls) == 1
+
+def test_failed_refresh_backs_off_while_serving_stale():
+    """During an outage the stale copy is served without a new fetch on every lookup."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        PromptCache(make_fetcher([]), ttl=60, cache_dir=cache_dir).get("qa", label="development")
+        calls = []
+
+        def failing_fetcher(name, label, version):
+            calls.append(name)
+            raise ConnectionError("Langfuse is down")
+
+        cache = PromptCache(failing_fetcher, ttl=60, cache_dir=cache_dir, failure_backoff=60)
+        assert cache.get("qa", label="development")["template"] == "Prompt v1"
+        assert wait_for(lambda: cache.stats["refresh_failures"] == 1)
+        for _ in range(5):
+            # Give each would-be refresh time to finish before the next lookup
+            time.sleep(0.05)
+            assert cache.get("qa", label="development")["template"] == "Prompt v1"
+        time.sleep(0.1)
+        assert len(calls) == 1
+        assert cache.stats["stale_hits"] == 5
+
+if __name__ == "__main__":
+    logger.info("Testing prompt cache")
+    test_fresh_entry_is_served_from_memory()
+    test_stale_entry_is_served_while_refreshing()
+    test_cold_start_uses_disk_copy()
+    test_failed_fetch_backs_off()
+    test_failed_refresh_backs_off_while_serving_stale()
+    logger.info("All prompt cache checks passed")
@@ -0,0 +1,80 @@
+"""
+Test script for the exact-match response cache.
+This script checks key stability, the temperature rule and the Redis-compatible
+backend with an in-memory stand-in client, without contacting any service.
+"""
+
+import fnmatch
+import logging
+from cache import MemoryCache, RedisCache
+from response_cache import ResponseCache, response_cache_key
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "What is the capital of France?"},
+]
+
+class LocalRedis:
+    """Minimal stand-in for a Redis client: get, set with expiry, scan and delete."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode("utf-8")
+        self.expiry[key] = ex
+
+    def scan_iter(self, match="*"):
+        return [k for k in self.data if fnmatch.fnmatch(k, match)]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+def test_key_ignores_transport_options_and_dict_order():
+    """Streaming and non-streaming requests share a key; any message change does not."""
+    params = {"model": "gpt-4o-mini", "messages": MESSAGES, "temperature": 0}
+    reordered = {"temperature": 0, "messages": MESSAGES, "model": "gpt-4o-mini", "stream": True}
+    assert response_cache_key(params) == response_cache_key(reordered)
+    changed = {**params, "messages": MESSAGES[:1] + [{"role": "user", "content": "What is the capital of Spain?"}]}
+    assert response_cache_key(params) != response_cache_key(changed)
+    assert response_cache_key(params) != response_cache_key({**params, "model": "gpt-4o"})
+
+def test_only_deterministic_requests_are_cached():
+    """Temperature 0 is cached; the API default and sampled temperatures are not."""
+    cache = ResponseCache(MemoryCache(), max_temperature=0)
+    deterministic = {"model": "gpt-4o-mini", "messages": MESSAGES, "temperature": 0}
+    cache.set(deterministic, "Paris", {"prompt_tokens": 20, "completion_tokens": 1})
+    assert cache.get(deterministic)["answer"] == "Paris"
+    
+    for params in ({"model": "gpt-4o-mini", "messages": MESSAGES}, {**deterministic, "temperature": 0.7}):
+        cache.set(params, "Paris")
+        assert cache.get(params) is None
+    assert cache.stats["hits"] == 1 and cache.stats["skipped"] == 2
+
+def test_redis_backend_round_trip_and_ttl():
+    """Entries go to the server with an expiry and a shared prefix that clear() removes."""
+    client = LocalRedis()
+    cache = ResponseCache(RedisCache(client=client, ttl=60, prefix="qa:response:"))
+    params = {"model": "gpt-4o-mini", "messages": MESSAGES, "temperature": 0}
+    cache.set(params, "Paris")
+    key = "qa:response:" + response_cache_key(params)
+    assert client.expiry[key] == 60
+    assert cache.get(params)["answer"] == "Paris"
+    cache.clear()
+    assert cache.get(params) is None
+
+if __name__ == "__main__":
+    logger.info("Testing response cache")
+    test_key_ignores_transport_options_and_dict_order()
+    test_only_deterministic_requests_are_cached()
+    test_redis_backend_round_trip_and_ttl()
+    logger.info("All response cache checks passed")
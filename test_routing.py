@@ -0,0 +1,56 @@
+"""
+Test script for search and model routing.
+This script checks the keyword rule and the trained router used by
+determine_search_need, and the model router used by generate_response,
+without contacting any service.
+"""
+
+import logging
+from routing import ModelRouter, SearchRouter, keyword_rule
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_keyword_rule_matches_whole_words():
+    """Keywords no longer match inside other words."""
+    assert keyword_rule("Who won the World Cup")
+    assert not keyword_rule("Show me the whole list")
+
+def test_router_skips_search_for_tasks():
+    """The shipped model routes factual questions to search and tasks away from it."""
+    router = SearchRouter.load()
+    assert router.weights is not None
+    assert router.needs_search("What is the latest news about the Mars rover?")
+    assert not router.needs_search("Write a haiku about autumn.")
+
+def test_missing_model_falls_back_to_keywords():
+    """Without a model file the router uses the keyword rule."""
+    router = SearchRouter.load("does-not-exist.json")
+    assert router.weights is None
+    assert router.needs_search("What is the capital of France?")
+    assert not router.needs_search("Write a haiku about autumn.")
+
+def test_model_router_uses_length_and_search_need():
+    """Short unsearched questions go to the short model, searched ones to the search model."""
+    router = ModelRouter(default_model="gpt-4o-mini", short_model="gpt-4.1-nano", short_max_words=5, search_model="gpt-4o")
+    assert router.choose("What is 2+2?", needs_search=False) == ("gpt-4.1-nano", "short_question")
+    assert router.choose("What is 2+2?", needs_search=True) == ("gpt-4o", "search")
+    long_task = "Write a short poem about the sea at night in winter"
+    assert router.choose(long_task, needs_search=False) == ("gpt-4o-mini", "default")
+
+def test_prompt_config_overrides_model_routing():
+    """The prompt config's model and routing rules win over the router's defaults."""
+    router = ModelRouter(default_model="gpt-4o-mini", short_model="gpt-4.1-nano")
+    config = {"model": "gpt-4.1-mini", "routing": {"short_model": ""}}
+    assert router.choose("What is 2+2?", needs_search=False, config=config) == ("gpt-4.1-mini", "default")
+    assert router.choose("What is 2+2?", needs_search=True, config=config).model == "gpt-4.1-mini"
+
+if __name__ == "__main__":
+    logger.info("Testing search and model routing")
+    test_keyword_rule_matches_whole_words()
+    test_router_skips_search_for_tasks()
+    test_missing_model_falls_back_to_keywords()
+    test_model_router_uses_length_and_search_need()
+    test_prompt_config_overrides_model_routing()
+    logger.info("All routing checks passed")
@@ -0,0 +1,82 @@
+"""
+Test script for the score writer's disk spool.
+This script checks that scores survive a Langfuse outage and are replayed once,
+with a local sender standing in for Langfuse.
+"""
+
+import tempfile
+import logging
+from spool import DiskSpool
+from score_writer import ScoreWriter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class FlakySender:
+    """Sender that raises ConnectionError while `down` is set."""
+
+    def __init__(self):
+        self.down = True
+        self.received = []
+
+    def __call__(self, batch):
+        if self.down:
+            raise ConnectionError("langfuse unreachable")
+        self.received.extend(batch)
+
+def test_outage_is_spooled_and_replayed():
+    """Scores sent during an outage reach the backend once it recovers, with stable IDs."""
+    sender = FlakySender()
+    spool = DiskSpool(tempfile.mkdtemp(prefix="score-spool-"))
+    writer = ScoreWriter(sender, batch_size=2, spool=spool, retry_interval=0)
+    for i in range(5):
+        writer.add(name="expert_feedback", value=i / 10, trace_id=f"trace-{i}")
+    writer.flush()
+    assert writer.stats["spooled"] == 5 and spool.pending()
+    
+    sender.down = False
+    writer.flush()
+    assert not spool.pending()
+    assert sorted(s["trace_id"] for s in sender.received) == [f"trace-{i}" for i in range(5)]
+    assert all(s["score_id"] and s["timestamp"] for s in sender.received)
+    assert writer.stats["replayed"] == 5
+
+def test_spool_survives_a_restart():
+    """A new writer on the same spool directory replays what the old one left."""
+    directory = tempfile.mkdtemp(prefix="score-spool-")
+    old = ScoreWriter(FlakySender(), spool=DiskSpool(directory), retry_interval=0)
+    old.add(name="llm_toxicity_evaluation", value=0.0, trace_id="before-restart")
+    old.flush()
+    
+    sender = FlakySender()
+    sender.down = False
+    new = ScoreWriter(sender, spool=DiskSpool(directory))
+    new.replay_spool()
+    assert [s["trace_id"] for s in sender.received] == ["before-restart"]
+
+def test_non_retryable_errors_are_not_spooled():
+    """Errors the writer is told not to retry are counted as failed, not written to disk."""
+    spool = DiskSpool(tempfile.mkdtemp(prefix="score-spool-"))
+    writer = ScoreWriter(FlakySender(), spool=spool, retryable=lambda e: False)
+    writer.add(name="expert_feedback", value=1.0, trace_id="bad")
+    writer.flush()
+    assert writer.stats["failed"] == 1 and not spool.pending()
+
+def test_spool_disk_usage_is_bounded():
+    """Past the disk budget the oldest segments are dropped."""
+    spool = DiskSpool(tempfile.mkdtemp(prefix="score-spool-"), max_bytes=4000, segment_bytes=1000)
+    for i in range(100):
+        spool.append([{"name": "expert_feedback", "value": 0.5, "trace_id": f"trace-{i:04d}", "comment": "x" * 40}])
+    assert spool.stats["bytes"] <= 4000 + 1000
+    assert spool.stats["dropped"] > 0
+    path, records = spool.oldest()
+    assert records and records[0]["trace_id"] != "trace-0000"
+
+if __name__ == "__main__":
+    logger.info("Testing score spool")
+    test_outage_is_spooled_and_replayed()
+    test_spool_survives_a_restart()
+    test_non_retryable_errors_are_not_spooled()
+    test_spool_disk_usage_is_bounded()
+    logger.info("All score spool checks passed")
@@ -0,0 +1,73 @@
+"""
+Test script for the search result cache.
+This script checks query normalization and the cache backends without
+contacting DuckDuckGo.
+"""
+
+import os
+import time
+import tempfile
+import logging
+import search
+from cache import MemoryCache, SQLiteCache, TieredCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_normalize_query():
+    """Case, punctuation and whitespace differences map to one key."""
+    assert search.normalize_query("What is  AI?") == "what is ai"
+    assert search.normalize_query("  what is ai ") == search.normalize_query("WHAT, is AI!!")
+
+def test_memory_cache_ttl_and_lru():
+    """Entries expire after their TTL and the least recently used is evicted."""
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    cache.set("short", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+
+def test_sqlite_tier_survives_restart():
+    """The SQLite tier serves entries written by an earlier process."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search.db")
+        SQLiteCache(path).set("key", ["result"])
+        tiered = TieredCache(MemoryCache(), SQLiteCache(path))
+        assert tiered.get("key") == ["result"]
+        assert tiered.memory.get("key") == ["result"]
+
+def test_research_question_uses_cache():
+    """Repeated, differently formatted questions only search once."""
+    calls = []
+    original_search = search.search_duckduckgo
+    original_cache = search.search_cache
+
+    def fake_search(query, max_results=3):
+        calls.append(query)
+        return [{"title": "AI", "body": "Artificial intelligence", "href": "https://example.com"}]
+
+    search.search_duckduckgo = fake_search
+    search.set_search_cache(MemoryCache())
+    try:
+        first = search.research_question("What is AI?")
+        second = search.research_question("what is ai")
+        assert first == second
+        assert len(calls) == 1
+        assert search.search_cache_stats()["hit_ratio"] == 0.5
+    finally:
+        search.search_duckduckgo = original_search
+        search.set_search_cache(original_cache)
+
+if __name__ == "__main__":
+    logger.info("Testing search cache")
+    test_normalize_query()
+    test_memory_cache_ttl_and_lru()
+    test_sqlite_tier_survives_restart()
+    test_research_question_uses_cache()
+    logger.info("All search cache checks passed")
@@ -0,0 +1,73 @@
+"""
+Test script for the semantic answer cache.
+This script checks paraphrase matching, prompt-version isolation and eviction
+without contacting any service.
+"""
+
+import logging
+from semantic_cache import SemanticCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_paraphrase_hits_and_unrelated_question_misses():
+    """A reworded question is served from the cache, a different one is not."""
+    cache = SemanticCache(threshold=0.9)
+    cache.insert("What is artificial intelligence?", "qa:development:3", "AI is ...")
+    hit = cache.lookup("what's artificial intelligence", "qa:development:3")
+    assert hit is not None and hit["answer"] == "AI is ..."
+    assert cache.lookup("What is machine learning?", "qa:development:3") is None
+
+def test_close_questions_about_other_numbers_or_word_order_miss():
+    """Near-identical embeddings are not served when the question differs in meaning."""
+    cache = SemanticCache(threshold=0.9)
+    pairs = [
+        ("What is the population of New York City in 2020?", "What is the population of New York City in 2010?"),
+        ("How do I convert Celsius to Fahrenheit?", "How do I convert Fahrenheit to Celsius?"),
+    ]
+    for cached, asked in pairs:
+        cache.insert(cached, "ns", f"Answer to: {cached}")
+        # Both are above the similarity threshold, so only the signature check rejects them
+        similarity = float(cache.vectorizer.transform(cached) @ cache.vectorizer.transform(asked))
+        assert similarity >= 0.9, similarity
+        assert cache.lookup(asked, "ns") is None
+        assert cache.lookup(cached, "ns")["answer"] == f"Answer to: {cached}"
+    assert cache.stats["rejected"] == 2
+
+def test_negated_questions_miss():
+    """A question that negates a cached one is not served its answer."""
+    cache = SemanticCache(threshold=0.9)
+    cached = "What is artificial intelligence?"
+    cache.insert(cached, "ns", "AI is ...")
+    for asked in ("What is not artificial intelligence?", "What isn't artificial intelligence?"):
+        similarity = float(cache.vectorizer.transform(cached) @ cache.vectorizer.transform(asked))
+        assert similarity >= 0.9, similarity
+        assert cache.lookup(asked, "ns") is None
+    assert cache.stats["rejected"] == 2
+    assert cache.lookup("What's artificial intelligence?", "ns")["answer"] == "AI is ..."
+
+def test_prompt_version_is_part_of_the_key():
+    """Answers generated with another prompt version are never served."""
+    cache = SemanticCache()
+    cache.insert("What is artificial intelligence?", "qa:development:3", "AI is ...")
+    assert cache.lookup("What is artificial intelligence?", "qa:development:4") is None
+
+def test_least_recently_used_entry_is_evicted():
+    """When full, the entry that was used longest ago is replaced."""
+    cache = SemanticCache(capacity=2)
+    cache.insert("What is the capital of France?", "ns", "Paris")
+    cache.insert("What is the capital of Spain?", "ns", "Madrid")
+    cache.lookup("What is the capital of France?", "ns")
+    cache.insert("What is the capital of Italy?", "ns", "Rome")
+    assert cache.lookup("What is the capital of Spain?", "ns") is None
+    assert cache.lookup("What is the capital of France?", "ns")["answer"] == "Paris"
+
+if __name__ == "__main__":
+    logger.info("Testing semantic cache")
+    test_paraphrase_hits_and_unrelated_question_misses()
+    test_close_questions_about_other_numbers_or_word_order_miss()
+    test_negated_questions_miss()
+    test_prompt_version_is_part_of_the_key()
+    test_least_recently_used_entry_is_evicted()
+    logger.info("All semantic cache checks passed")
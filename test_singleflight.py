@@ -0,0 +1,122 @@
+"""
+Test script for request coalescing.
+This script checks that concurrent identical calls share one computation,
+with local callables instead of the agent.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from singleflight import SingleFlight, AsyncSingleFlight
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run_concurrently(flight, key, fn, callers):
+    """Call `flight.do` from several threads and collect results or errors."""
+    outcomes = []
+    lock = threading.Lock()
+    
+    def caller(i):
+        try:
+            outcome = flight.do(key, fn, context=f"trace-{i}")
+        except Exception as e:
+            outcome = e
+        with lock:
+            outcomes.append(outcome)
+    
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+def test_concurrent_callers_share_one_call():
+    """Five callers for the same key trigger one computation and link to the leader."""
+    flight = SingleFlight("test")
+    calls = []
+    
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "answer"
+    
+    outcomes = run_concurrently(flight, "question", slow, 5)
+    assert len(calls) == 1
+    assert all(o.value == "answer" for o in outcomes)
+    leader = [o for o in outcomes if not o.shared]
+    followers = [o for o in outcomes if o.shared]
+    assert len(leader) == 1 and leader[0].followers == 4
+    assert all(f.leader_context == leader[0].leader_context for f in followers)
+    assert flight.in_flight() == 0
+
+def test_errors_are_shared_and_not_kept():
+    """Followers receive the leader's error, and the next call runs again."""
+    flight = SingleFlight("test")
+    
+    def failing():
+        time.sleep(0.1)
+        raise TimeoutError("upstream down")
+    
+    outcomes = run_concurrently(flight, "question", failing, 3)
+    assert all(isinstance(o, TimeoutError) for o in outcomes)
+    assert flight.do("question", lambda: "recovered").value == "recovered"
+
+def test_async_callers_share_one_call():
+    """Coroutines on one loop coalesce the same way."""
+    flight = AsyncSingleFlight("test")
+    calls = []
+    
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "answer"
+    
+    async def main():
+        return await asyncio.gather(*(flight.do("question", slow, context=i) for i in range(4)))
+    
+    outcomes = asyncio.run(main())
+    assert len(calls) == 1
+    assert [o.shared for o in outcomes].count(False) == 1
+    assert all(o.value == "answer" and o.leader_context == 0 for o in outcomes)
+
+def test_cancelled_leader_does_not_cancel_followers():
+    """A leader dropped mid-flight (e.g. client disconnect) leaves the shared work running."""
+    flight = AsyncSingleFlight("test")
+    calls = []
+    
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "answer"
+    
+    async def main():
+        leader = asyncio.create_task(flight.do("question", slow, context="leader"))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(flight.do("question", slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        outcomes = await asyncio.gather(*followers)
+        try:
+            await leader
+        except asyncio.CancelledError:
+            pass
+        return leader, outcomes
+    
+    leader, outcomes = asyncio.run(main())
+    assert leader.cancelled()
+    assert len(calls) == 1
+    assert all(o.value == "answer" and o.shared and o.leader_context == "leader" for o in outcomes)
+    assert flight.in_flight() == 0
+
+if __name__ == "__main__":
+    logger.info("Testing request coalescing")
+    test_concurrent_callers_share_one_call()
+    test_errors_are_shared_and_not_kept()
+    test_async_callers_share_one_call()
+    test_cancelled_leader_does_not_cancel_followers()
+    logger.info("All single-flight checks passed")
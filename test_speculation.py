@@ -0,0 +1,115 @@
+"""
+Test script for speculative no-search generation.
+This script checks when the speculative answer is used or cancelled and how its
+tokens and latency are accounted, with the benchmark fakes instead of OpenAI
+and local stand-ins for the web search.
+"""
+
+import time
+import asyncio
+import logging
+import agent
+from speculation import SpeculativeRun, choose_outcome, record_speculation
+from benchmarks.fakes import FakeOpenAI, FakeAsyncOpenAI
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUESTION = "What is the latest news about the Mars rover today?"
+
+def search_returning(results, delay):
+    """Stand-in for perform_search that answers after `delay` seconds."""
+    def search(state):
+        time.sleep(delay)
+        return {**state, "search_results": results}
+    return search
+
+def run_speculative_search(results, delay, budget=0.3):
+    """Run speculative_search with a fake OpenAI client and the given search stand-in."""
+    saved = (agent.__dict__.get("client"), agent.response_cache, agent.perform_search, agent.SPECULATIVE_SEARCH_BUDGET)
+    agent.client = FakeOpenAI(latency=0.05, tokens_per_second=0, answer_tokens=20)
+    agent.response_cache = None
+    agent.perform_search = search_returning(results, delay)
+    agent.SPECULATIVE_SEARCH_BUDGET = budget
+    try:
+        start = time.perf_counter()
+        update = agent.speculative_search({"question": QUESTION, "needs_search": True, "search_results": None})
+        return update, time.perf_counter() - start
+    finally:
+        agent.client, agent.response_cache, agent.perform_search, agent.SPECULATIVE_SEARCH_BUDGET = saved
+
+def test_outcome_depends_on_search_results():
+    """Useful results in time cancel the speculation; empty or late search keeps it."""
+    assert choose_outcome(["Title: A\nContent: B"], timed_out=False) == "cancelled"
+    assert choose_outcome([], timed_out=False) == "used_empty"
+    assert choose_outcome(["  "], timed_out=False) == "used_empty"
+    assert choose_outcome(None, timed_out=True) == "used_timeout"
+
+def test_cancelled_tokens_count_as_wasted():
+    """A cancelled run wastes what it spent; a used one saves the search wait."""
+    run = SpeculativeRun(prompt_tokens=40)
+    run.parts.extend(["a", "b"])
+    cancelled = record_speculation("cancelled", run, search_ms=100, elapsed_ms=100, label="test")
+    assert cancelled["speculative_wasted_tokens"] == 42
+    assert cancelled["speculative_latency_saved_ms"] == 0
+
+    run.finished = run.started + 0.5
+    used = record_speculation("used_empty", run, search_ms=200, elapsed_ms=500, label="test")
+    assert used["speculative_wasted_tokens"] == 0
+    assert used["speculative_latency_saved_ms"] == 200
+
+def test_late_search_uses_speculative_answer():
+    """A search past the budget is not waited for."""
+    update, elapsed = run_speculative_search(["Title: Late\nContent: Too slow."], delay=1.0)
+    assert update["speculative_answer"]
+    assert update["search_results"] == []
+    assert elapsed < 0.8
+
+def test_empty_search_uses_speculative_answer():
+    """A search with nothing useful keeps the speculative answer."""
+    update, _ = run_speculative_search([], delay=0.01)
+    assert update["speculative_answer"]
+
+def test_useful_search_cancels_speculation():
+    """Results in time win, and generation answers from them as usual."""
+    results = ["Title: Rover\nContent: The rover found water."]
+    update, _ = run_speculative_search(results, delay=0.01)
+    assert update.get("speculative_answer") is None
+    assert update["search_results"] == results
+
+def test_cancelled_async_speculation_cleans_up_and_reraises():
+    """Cancelling the async speculative task stops the run and still cancels the task."""
+    saved = (agent.__dict__.get("async_client"), agent.response_cache)
+    agent.async_client = FakeAsyncOpenAI(latency=0.01, tokens_per_second=20, answer_tokens=100)
+    agent.response_cache = None
+    run = SpeculativeRun(prompt_tokens=40)
+    params = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": QUESTION}], "temperature": 0}
+
+    async def cancel_midway():
+        task = asyncio.ensure_future(agent.aspeculative_completion(params, run))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return task.cancelled()
+        return False
+
+    try:
+        assert asyncio.run(cancel_midway())
+    finally:
+        agent.async_client, agent.response_cache = saved
+    assert run.cancelled.is_set()
+    assert run.finished is not None
+    assert 0 < len(run.parts) < 100
+
+if __name__ == "__main__":
+    logger.info("Testing speculative generation")
+    test_outcome_depends_on_search_results()
+    test_cancelled_tokens_count_as_wasted()
+    test_late_search_uses_speculative_answer()
+    test_empty_search_uses_speculative_answer()
+    test_useful_search_cancels_speculation()
+    test_cancelled_async_speculation_cleans_up_and_reraises()
+    logger.info("All speculative generation checks passed")
@@ -1,12 +1,14 @@
 """
 Test script for the toxicity scoring feature.
 This script demonstrates how to use the toxicity scoring feature with the Q&A agent.
+The agent answers with the benchmark fakes, so no OpenAI key is needed.
 """
 
 import os
 from dotenv import load_dotenv
 import logging
 from agent import process_question
+from benchmarks.fakes import offline_agent
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -26,7 +28,8 @@ def test_with_toxicity_score():
     logger.info(f"Adding toxicity score: {toxicity_score}")
     
     try:
-        result = process_question(question, toxicity=toxicity_score)
+        with offline_agent():
+            result = process_question(question, toxicity=toxicity_score)
         logger.info(f"Answer: {result['answer']}")
         logger.info(f"Has search results: {result['has_search_results']}")
         logger.info(f"Toxicity score {toxicity_score} received (will be implemented with Langfuse SDK v3)")
@@ -41,7 +44,8 @@ def test_without_toxicity_score():
     
     # Process the question without a toxicity score
     try:
-        result = process_question(question)
+        with offline_agent():
+            result = process_question(question)
         logger.info(f"Answer: {result['answer']}")
         logger.info(f"Has search results: {result['has_search_results']}")
         logger.info("No toxicity score added")
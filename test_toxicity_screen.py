@@ -0,0 +1,67 @@
+"""
+Test script for the local toxicity pre-screen.
+This script checks which answers the screen sends to the LLM judge, using the
+shipped lexicon and weights, without contacting any service.
+"""
+
+import random
+import logging
+from toxicity_screen import ToxicityScreen
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CLEAN_ANSWERS = [
+    "Paris is the capital of France. [Source 1]",
+    "The 2022 FIFA World Cup was won by Argentina, who beat France on penalties.",
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "The Battle of Hastings in 1066 killed King Harold and changed English history.",
+    "Remember to take out the trash on Tuesday mornings.",
+    "Moby Dick was written by Herman Melville and published in 1851.",
+]
+TOXIC_ANSWERS = [
+    "You are an idiot for asking this!!",
+    "Nobody cares, go kill yourself.",
+    "What a f**king waste of time.",
+    "Y0u are such a m0r0n.",
+    "I hope you die",
+    "Shut up, nobody cares about you, you disgusting piece of garbage",
+    "Go to hell",
+    "Shut the f*** up.",
+]
+
+def test_clean_answers_skip_the_judge():
+    """Ordinary answers, including historical violence and everyday "trash", stay below the threshold."""
+    screen = ToxicityScreen.load(calibration_rate=0)
+    for answer in CLEAN_ANSWERS:
+        result = screen.score(answer)
+        assert result.decision == "skipped", (answer, result)
+
+def test_toxic_answers_are_flagged():
+    """Insults, self-harm phrases and masked or obfuscated profanity go to the judge."""
+    screen = ToxicityScreen.load(calibration_rate=0)
+    for answer in TOXIC_ANSWERS:
+        result = screen.score(answer)
+        assert result.decision == "flagged", (answer, result)
+        assert result.features
+
+def test_calibration_sample_rate():
+    """About `calibration_rate` of low-risk answers are still judged."""
+    screen = ToxicityScreen.load(calibration_rate=0.1, rng=random.Random(7))
+    decisions = [screen.score(CLEAN_ANSWERS[0]).decision for _ in range(2000)]
+    sampled = decisions.count("calibration") / len(decisions)
+    assert 0.07 < sampled < 0.13
+
+def test_missing_model_sends_everything_to_the_judge():
+    """Without the lexicon file the screen flags every answer."""
+    screen = ToxicityScreen.load("does-not-exist.json")
+    assert screen.score(CLEAN_ANSWERS[0]).decision == "flagged"
+
+if __name__ == "__main__":
+    logger.info("Testing toxicity pre-screen")
+    test_clean_answers_skip_the_judge()
+    test_toxic_answers_are_flagged()
+    test_calibration_sample_rate()
+    test_missing_model_sends_everything_to_the_judge()
+    logger.info("All toxicity screen checks passed")
@@ -0,0 +1,97 @@
+"""
+Test script for the shared transport layer.
+This script checks the retry policy and circuit breaker with local callables,
+without contacting any service.
+"""
+
+import time
+import logging
+import search
+from transport import UPSTREAMS, CircuitBreaker, CircuitOpenError, call_upstream
+from benchmarks.fakes import FakeDDGS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def fast_backoff(test):
+    """Run a test with a near-zero page_fetch backoff, restoring it afterwards."""
+    def run():
+        saved = UPSTREAMS["page_fetch"].backoff_base
+        UPSTREAMS["page_fetch"].backoff_base = 0.001
+        try:
+            test()
+        finally:
+            UPSTREAMS["page_fetch"].backoff_base = saved
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+def failing(calls, exc):
+    def attempt():
+        calls.append(1)
+        raise exc
+    return attempt
+
+@fast_backoff
+def test_transient_errors_are_retried_and_client_errors_are_not():
+    """Timeouts get one retry on the page_fetch upstream; a ValueError gets none."""
+    calls = []
+    try:
+        call_upstream("page_fetch", failing(calls, TimeoutError("slow")), key="retry.example")
+    except TimeoutError:
+        pass
+    assert len(calls) == 1 + UPSTREAMS["page_fetch"].max_retries
+    
+    calls = []
+    try:
+        call_upstream("page_fetch", failing(calls, ValueError("bad request")), key="client-error.example")
+    except ValueError:
+        pass
+    assert len(calls) == 1
+
+def test_breaker_opens_and_lets_one_trial_call_through():
+    """After the threshold the circuit rejects calls until the reset timeout passes."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+@fast_backoff
+def test_open_circuit_rejects_without_calling():
+    """Once a host's breaker is open, the upstream is not called at all."""
+    calls = []
+    for _ in range(UPSTREAMS["page_fetch"].failure_threshold):
+        try:
+            call_upstream("page_fetch", failing(calls, TimeoutError("down")), key="down.example")
+        except (TimeoutError, CircuitOpenError):
+            pass
+    before = len(calls)
+    try:
+        call_upstream("page_fetch", failing(calls, TimeoutError("down")), key="down.example")
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError:
+        pass
+    assert len(calls) == before
+
+def test_replay_search_fake_accepts_transport_arguments():
+    """The replay benchmark's DDGS stand-in takes the client arguments the transport passes."""
+    saved = search.DDGS
+    search.DDGS = FakeDDGS
+    try:
+        results = search.search_duckduckgo("What is the capital of France?", max_results=2)
+    finally:
+        search.DDGS = saved
+    assert len(results) == 2 and all(r["href"] for r in results)
+
+if __name__ == "__main__":
+    logger.info("Testing transport layer")
+    test_transient_errors_are_retried_and_client_errors_are_not()
+    test_breaker_opens_and_lets_one_trial_call_through()
+    test_open_circuit_rejects_without_calling()
+    test_replay_search_fake_accepts_transport_arguments()
+    logger.info("All transport checks passed")
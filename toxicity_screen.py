@@ -0,0 +1,192 @@
+"""
+Local toxicity pre-screen for the Q&A agent.
+Scores answers on the CPU with a compiled lexicon pattern, a few regex features
+and a small linear model, so only risky answers (plus a random calibration
+sample) are sent to the LLM toxicity judge. The weights are fitted to judge
+labels with train_toxicity_screen.py.
+"""
+
+import os
+import re
+import json
+import math
+import random
+import logging
+from typing import Dict, List, NamedTuple, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Screen configuration from environment
+TOXICITY_SCREEN_ENABLED = os.getenv("TOXICITY_SCREEN_ENABLED", "true").lower() == "true"
+TOXICITY_SCREEN_MODEL = os.getenv(
+    "TOXICITY_SCREEN_MODEL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "toxicity_screen.json"),
+)
+# Answers scoring at least this are always sent to the LLM judge
+TOXICITY_SCREEN_THRESHOLD = float(os.getenv("TOXICITY_SCREEN_THRESHOLD", "0.2"))
+# Share of low-risk answers still sent to the judge, to measure how well the screen agrees with it
+TOXICITY_CALIBRATION_RATE = float(os.getenv("TOXICITY_CALIBRATION_RATE", "0.05"))
+
+# Counts per category are capped so one long rant doesn't dominate the score
+MAX_FEATURE_COUNT = 3
+
+# Undo common character swaps used to dodge filters ("1d10t", "$tupid")
+LEET_TABLE = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "@": "a", "$": "s", "5": "s", "7": "t"})
+# Masks end in symbols, so the end is checked with a lookahead rather than \b
+MASKED_PROFANITY_PATTERN = re.compile(r"\b[fsb][*#@$%!]{2,}[a-z]*(?!\w)|\b[a-z]+[*#]{2,}(?!\w)", re.IGNORECASE)
+# Letters spelled out with spaces ("f u c k"), joined back before the lexicon scan
+SPACED_LETTERS_PATTERN = re.compile(r"\b(?:[a-z] ){2,}[a-z]\b")
+SHOUTING_PATTERN = re.compile(r"\b[A-Z]{4,}\b")
+WORD_PATTERN = re.compile(r"\b[A-Za-z]{4,}\b")
+EXCLAMATIONS_PATTERN = re.compile(r"!{2,}")
+
+class ScreenResult(NamedTuple):
+    score: float
+    # Feature name to value, for the score comment
+    features: Dict[str, float]
+    # "flagged" (sent to the judge), "calibration" (sampled for the judge) or "skipped"
+    decision: str
+
+def compile_lexicon(lexicon: Dict[str, List[str]]) -> "re.Pattern":
+    """
+    Compile every lexicon phrase into one pattern with a named group per category.
+
+    Phrases match on word boundaries, with flexible whitespace and an optional
+    plural or verb suffix, so one scan of the text finds every category.
+    """
+    groups = []
+    for category, phrases in lexicon.items():
+        # Longest first, so "kill yourself" wins over "kill"
+        alternatives = sorted((r"\s+".join(map(re.escape, p.lower().split())) for p in phrases), key=len, reverse=True)
+        groups.append(f"(?P<{category}>\\b(?:{'|'.join(alternatives)})(?:s|es|ed|ing)?\\b)")
+    return re.compile("|".join(groups))
+
+class ToxicityScreen:
+    """
+    Logistic model over lexicon and shape features.
+
+    Without a model file every answer is flagged, so the LLM judge keeps
+    seeing all traffic rather than silently missing toxic answers.
+    """
+
+    def __init__(
+        self,
+        lexicon: Optional[Dict[str, List[str]]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        directed: Optional[List[str]] = None,
+        threshold: float = TOXICITY_SCREEN_THRESHOLD,
+        calibration_rate: float = TOXICITY_CALIBRATION_RATE,
+        rng: Optional[random.Random] = None,
+    ):
+        """
+        Args:
+            lexicon: Category name to phrases, or None to flag everything
+            weights: Feature name to weight; "bias" is the intercept
+            directed: Words that are only insults when aimed at the reader
+                ("you are trash"), unlike "take out the trash"
+            threshold: Risk score at which an answer goes to the judge
+            calibration_rate: Probability that a low-risk answer goes to the judge anyway
+            rng: Random source for calibration sampling
+        """
+        self.lexicon = lexicon
+        self.weights = weights or {}
+        self.directed = directed or []
+        self.threshold = threshold
+        self.calibration_rate = calibration_rate
+        self._rng = rng or random.Random()
+        self._pattern = compile_lexicon(lexicon) if lexicon else None
+        insults = [r"\s+".join(map(re.escape, p.split())) for p in (lexicon or {}).get("insult", []) + (directed or [])]
+        # "you are such a dumb clown", "you disgusting piece of garbage"
+        self._second_person = re.compile(
+            rf"\byou(?:'re|\s+are)?\s+(?:such\s+)?(?:an?\s+)?(?:[a-z]+\s+){{0,2}}?(?:{'|'.join(insults)})\b" if insults else r"(?!x)x"
+        )
+
+    @classmethod
+    def load(cls, path: str = TOXICITY_SCREEN_MODEL, **kwargs) -> "ToxicityScreen":
+        """
+        Load the lexicon and weights, flagging everything if the file is missing.
+
+        Args:
+            path: JSON file with "lexicon", "directed" and "weights"
+            **kwargs: Passed on to the constructor
+
+        Returns:
+            The toxicity screen
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                model = json.load(f)
+            return cls(model["lexicon"], model["weights"], model.get("directed"), **kwargs)
+        except FileNotFoundError:
+            logger.warning(f"No toxicity screen model at {path}; every answer goes to the judge")
+        except Exception as e:
+            logger.warning(f"Could not load toxicity screen from {path}; every answer goes to the judge. Reason: {e}")
+        return cls(None, **kwargs)
+
+    def save(self, path: str) -> None:
+        """Write the lexicon, directed words and weights as JSON."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "lexicon": self.lexicon,
+                    "directed": self.directed,
+                    "weights": {k: round(v, 4) for k, v in sorted(self.weights.items())},
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+
+    def features(self, text: str) -> Dict[str, float]:
+        """
+        Extract the screen's features from an answer.
+
+        Args:
+            text: The answer to screen
+
+        Returns:
+            Non-zero feature values by name
+        """
+        normalized = text.lower().translate(LEET_TABLE)
+        normalized = SPACED_LETTERS_PATTERN.sub(lambda m: m.group(0).replace(" ", ""), normalized)
+        counts: Dict[str, float] = {}
+        for match in self._pattern.finditer(normalized):
+            name = f"lex:{match.lastgroup}"
+            counts[name] = min(MAX_FEATURE_COUNT, counts.get(name, 0) + 1)
+        if self._second_person.search(normalized):
+            counts["second_person_insult"] = 1
+        masked = len(MASKED_PROFANITY_PATTERN.findall(text))
+        if masked:
+            counts["masked_profanity"] = min(MAX_FEATURE_COUNT, masked)
+        words = len(WORD_PATTERN.findall(text))
+        if words >= 5 and len(SHOUTING_PATTERN.findall(text)) / words > 0.5:
+            counts["shouting"] = 1
+        if EXCLAMATIONS_PATTERN.search(text):
+            counts["exclamations"] = 1
+        return counts
+
+    def score(self, text: str) -> ScreenResult:
+        """
+        Score an answer and decide whether the LLM judge should see it.
+
+        Args:
+            text: The answer to screen
+
+        Returns:
+            Risk score between 0 and 1, the features behind it, and the decision
+        """
+        if self._pattern is None:
+            return ScreenResult(1.0, {}, "flagged")
+        features = self.features(text)
+        z = self.weights.get("bias", 0.0) + sum(self.weights.get(name, 0.0) * value for name, value in features.items())
+        risk = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+        if risk >= self.threshold:
+            decision = "flagged"
+        elif self._rng.random() < self.calibration_rate:
+            decision = "calibration"
+        else:
+            decision = "skipped"
+        return ScreenResult(risk, features, decision)
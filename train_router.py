@@ -0,0 +1,105 @@
+"""
+Script to train the search router used by determine_search_need.
+Reads labeled questions from JSONL files ({"question": ..., "needs_search": true/false}),
+e.g. questions exported from logged Langfuse traces and labeled by whether search
+helped, and fits a hashed-feature logistic regression.
+"""
+
+import os
+import json
+import math
+import random
+import argparse
+import logging
+from typing import List, Tuple
+from routing import SearchRouter, extract_features, hash_feature, DEFAULT_NUM_FEATURES, SEARCH_ROUTER_MODEL
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRAINING_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "router_train.jsonl")
+
+def load_examples(paths: List[str]) -> List[Tuple[str, bool]]:
+    """
+    Load labeled questions from JSONL files.
+
+    Args:
+        paths: JSONL files with question and needs_search fields
+
+    Returns:
+        List of (question, needs_search) pairs
+    """
+    examples = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    examples.append((record["question"], bool(record["needs_search"])))
+    return examples
+
+def train(
+    examples: List[Tuple[str, bool]],
+    num_features: int = DEFAULT_NUM_FEATURES,
+    epochs: int = 30,
+    learning_rate: float = 0.2,
+    l2: float = 1e-4,
+    seed: int = 0,
+) -> SearchRouter:
+    """
+    Fit a logistic regression with plain SGD over hashed features.
+
+    Args:
+        examples: (question, needs_search) pairs
+        num_features: Number of hash buckets
+        epochs: Passes over the data
+        learning_rate: Initial SGD step size
+        l2: L2 regularization strength
+        seed: Shuffle seed, for reproducible models
+
+    Returns:
+        The trained router
+    """
+    rng = random.Random(seed)
+    weights = {}
+    data = [([hash_feature(f, num_features) for f in extract_features(q)], 1.0 if label else 0.0)
+            for q, label in examples]
+
+    for epoch in range(epochs):
+        rng.shuffle(data)
+        rate = learning_rate / (1 + epoch * 0.1)
+        loss = 0.0
+        for indices, label in data:
+            z = max(-30.0, min(30.0, sum(weights.get(i, 0.0) for i in indices)))
+            p = 1.0 / (1.0 + math.exp(-z))
+            loss -= label * math.log(p + 1e-12) + (1 - label) * math.log(1 - p + 1e-12)
+            gradient = p - label
+            for i in indices:
+                w = weights.get(i, 0.0)
+                weights[i] = w - rate * (gradient + l2 * w)
+        logger.debug(f"Epoch {epoch + 1}: log loss {loss / len(data):.4f}")
+
+    return SearchRouter(weights, num_features)
+
+def main():
+    """Train the router and write it to disk."""
+    parser = argparse.ArgumentParser(description="Train the search router")
+    parser.add_argument("--data", nargs="+", default=[DEFAULT_TRAINING_DATA], help="Labeled JSONL files")
+    parser.add_argument("--output", default=SEARCH_ROUTER_MODEL, help="Where to write the model")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--learning-rate", type=float, default=0.2)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    router = train(examples, epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2)
+
+    correct = sum(router.needs_search(q) == label for q, label in examples)
+    logger.info(f"Training accuracy: {correct / len(examples):.1%} on {len(examples)} questions")
+
+    router.save(args.output)
+    logger.info(f"Saved search router with {len(router.weights)} weights to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Script to fit the weights of the local toxicity pre-screen.
+Reads answers labeled by the LLM toxicity judge from JSONL files
+({"answer": ..., "judge_score": 0-1}, e.g. exported from `llm_toxicity_evaluation`
+scores in Langfuse), extracts the screen's features with the lexicon in
+data/toxicity_lexicon.json and fits a logistic regression over them.
+"""
+
+import os
+import json
+import math
+import argparse
+import logging
+from typing import Dict, List, Tuple
+from toxicity_screen import ToxicityScreen, TOXICITY_SCREEN_MODEL, TOXICITY_SCREEN_THRESHOLD
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_TRAINING_DATA = os.path.join(DATA_DIR, "toxicity_train.jsonl")
+DEFAULT_LEXICON = os.path.join(DATA_DIR, "toxicity_lexicon.json")
+# Judge scores from this value up ("moderately inappropriate") count as toxic
+TOXIC_JUDGE_SCORE = 0.5
+
+def load_examples(paths: List[str]) -> List[Tuple[str, bool]]:
+    """
+    Load judge-labeled answers from JSONL files.
+
+    Args:
+        paths: JSONL files with answer and judge_score fields
+
+    Returns:
+        List of (answer, toxic) pairs
+    """
+    examples = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    examples.append((record["answer"], float(record["judge_score"]) >= TOXIC_JUDGE_SCORE))
+    return examples
+
+def recall_and_judge_rate(screen: ToxicityScreen, examples: List[Tuple[str, bool]]) -> Tuple[float, float]:
+    """
+    Measure the screen against judge labels.
+
+    Args:
+        screen: Screen with calibration sampling turned off
+        examples: (answer, toxic) pairs
+
+    Returns:
+        Share of toxic answers flagged, and share of all answers flagged
+    """
+    flagged = [screen.score(answer).decision == "flagged" for answer, _ in examples]
+    toxic = sum(label for _, label in examples)
+    caught = sum(f and label for f, (_, label) in zip(flagged, examples))
+    return (caught / toxic if toxic else 1.0), sum(flagged) / len(examples)
+
+def train(
+    examples: List[Tuple[str, bool]],
+    lexicon: Dict[str, List[str]],
+    directed: List[str],
+    epochs: int = 3000,
+    learning_rate: float = 0.5,
+    l2: float = 1e-3,
+    positive_weight: float = 3.0,
+) -> ToxicityScreen:
+    """
+    Fit a logistic regression with full-batch gradient descent, so the same
+    data always gives the same weights.
+
+    Args:
+        examples: (answer, toxic) pairs
+        lexicon: Category name to phrases
+        directed: Words that are only insults when aimed at the reader
+        epochs: Gradient steps over the whole data set
+        learning_rate: Step size
+        l2: L2 regularization strength (the bias is not regularized)
+        positive_weight: Loss weight of toxic examples; missing one costs more
+            than sending a clean answer to the judge
+
+    Returns:
+        The trained screen
+    """
+    extractor = ToxicityScreen(lexicon, directed=directed)
+    data = [(extractor.features(answer), 1.0 if label else 0.0) for answer, label in examples]
+    names = sorted({name for features, _ in data for name in features})
+    weights = {name: 0.0 for name in ["bias"] + names}
+    total_weight = sum(positive_weight if label else 1.0 for _, label in data)
+
+    for epoch in range(epochs):
+        gradients = {name: 0.0 for name in weights}
+        loss = 0.0
+        for features, label in data:
+            z = weights["bias"] + sum(weights[name] * value for name, value in features.items())
+            p = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+            weight = positive_weight if label else 1.0
+            loss -= weight * (label * math.log(p + 1e-12) + (1 - label) * math.log(1 - p + 1e-12))
+            gradient = weight * (p - label)
+            gradients["bias"] += gradient
+            for name, value in features.items():
+                gradients[name] += gradient * value
+        for name in weights:
+            penalty = 0.0 if name == "bias" else l2 * weights[name]
+            weights[name] -= learning_rate * (gradients[name] / total_weight + penalty)
+        if (epoch + 1) % 500 == 0:
+            logger.debug(f"Epoch {epoch + 1}: weighted log loss {loss / total_weight:.4f}")
+
+    return ToxicityScreen(lexicon, weights, directed)
+
+def main():
+    """Fit the screen, report how it agrees with the judge and write it to disk."""
+    parser = argparse.ArgumentParser(description="Fit the toxicity pre-screen weights")
+    parser.add_argument("--data", nargs="+", default=[DEFAULT_TRAINING_DATA], help="Judge-labeled JSONL files")
+    parser.add_argument("--lexicon", default=DEFAULT_LEXICON, help="JSON file with lexicon and directed words")
+    parser.add_argument("--output", default=TOXICITY_SCREEN_MODEL, help="Where to write the model")
+    parser.add_argument("--epochs", type=int, default=3000)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-3)
+    parser.add_argument("--positive-weight", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with open(args.lexicon, "r", encoding="utf-8") as f:
+        lexicon = json.load(f)
+    examples = load_examples(args.data)
+    screen = train(
+        examples, lexicon["lexicon"], lexicon.get("directed", []),
+        epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2, positive_weight=args.positive_weight,
+    )
+
+    screen.calibration_rate = 0
+    recall, judge_rate = recall_and_judge_rate(screen, examples)
+    logger.info(
+        f"Training recall against the judge: {recall:.1%}, sent to judge: {judge_rate:.1%} "
+        f"of {len(examples)} answers at threshold {TOXICITY_SCREEN_THRESHOLD}"
+    )
+
+    screen.save(args.output)
+    logger.info(f"Saved toxicity screen with {len(screen.weights)} weights to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+Shared transport layer for the Q&A agent's upstream services.
+Builds the pooled HTTP clients for OpenAI (httpx, optional HTTP/2) and the page
+fetcher (requests), and wraps every upstream call with a per-upstream timeout,
+jittered exponential retries, a retry budget and a circuit breaker.
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import registry
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+UPSTREAM_EVENTS = registry.counter(
+    "qa_upstream_events_total", "Retries and rejections per upstream", ["upstream", "event"]
+)
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+class UpstreamConfig:
+    """Connection, timeout, retry and breaker settings for one upstream."""
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        connect_timeout: float,
+        max_retries: int,
+        pool_size: int,
+        backoff_base: float = 0.25,
+        backoff_max: float = 8.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+    ):
+        """
+        Args:
+            name: Upstream name used in logs and metrics
+            timeout: Read timeout per request in seconds
+            connect_timeout: Connect timeout in seconds
+            max_retries: Retries after the first attempt for transient errors
+            pool_size: Maximum pooled (keep-alive) connections
+            backoff_base: First backoff ceiling in seconds, doubled per retry
+            backoff_max: Upper bound of the backoff ceiling
+            failure_threshold: Consecutive transient failures that open the breaker
+            reset_timeout: Seconds the breaker stays open before a trial call
+            keepalive_expiry: Seconds an idle pooled connection is kept
+            http2: Whether to negotiate HTTP/2 (httpx clients only)
+        """
+        self.name = name
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+
+def upstream_from_env(name: str, prefix: str, **defaults: Any) -> UpstreamConfig:
+    """
+    Build an upstream config, letting `<PREFIX>_<SETTING>` variables override defaults.
+
+    Args:
+        name: Upstream name
+        prefix: Environment variable prefix, e.g. "OPENAI"
+        defaults: Default values for the UpstreamConfig arguments
+
+    Returns:
+        The upstream config
+    """
+    settings = dict(defaults)
+    for key, value in defaults.items():
+        raw = os.getenv(f"{prefix}_{key.upper()}")
+        if raw is None:
+            continue
+        if isinstance(value, bool):
+            settings[key] = raw.lower() == "true"
+        else:
+            settings[key] = type(value)(raw)
+    return UpstreamConfig(name, **settings)
+
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    "openai": upstream_from_env(
+        "openai", "OPENAI",
+        timeout=60.0, connect_timeout=5.0, max_retries=2, pool_size=64,
+        failure_threshold=5, reset_timeout=30.0, http2=True,
+    ),
+    "duckduckgo": upstream_from_env(
+        "duckduckgo", "DDG",
+        timeout=10.0, connect_timeout=5.0, max_retries=1, pool_size=8,
+        backoff_base=1.0, failure_threshold=3, reset_timeout=60.0,
+    ),
+    # Same variable names as fetcher.py; one breaker per host (see `get_breaker`)
+    "page_fetch": upstream_from_env(
+        "page_fetch", "FETCH",
+        timeout=5.0, connect_timeout=3.0, max_retries=1, pool_size=32,
+        failure_threshold=3, reset_timeout=60.0,
+    ),
+}
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `failure_threshold` transient failures in a row the circuit opens and
+    calls are rejected without touching the upstream. After `reset_timeout`
+    seconds one trial call is let through: success closes the circuit, failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._probing else "open"
+
+    def allow(self) -> bool:
+        """Return True if a call may go to the upstream now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+class RetryBudget:
+    """
+    Token bucket that caps retries at a fraction of recent calls, so a failing
+    upstream sees at most (1 + ratio) times normal traffic instead of a storm.
+    """
+
+    def __init__(self, ratio: float = 0.2, capacity: float = 10.0):
+        """
+        Args:
+            ratio: Retry tokens earned per call
+            capacity: Maximum banked tokens, i.e. the largest retry burst
+        """
+        self.ratio = ratio
+        self.capacity = capacity
+        self._tokens = capacity
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take one retry token; False if the budget is spent."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_budgets: Dict[str, RetryBudget] = {name: RetryBudget(RETRY_BUDGET_RATIO) for name in UPSTREAMS}
+_breakers_lock = threading.Lock()
+# Per-host page fetch breakers are dropped once closed if this many accumulate
+MAX_BREAKERS = 1024
+
+def get_breaker(upstream: str, key: str = "") -> CircuitBreaker:
+    """
+    Return the circuit breaker for an upstream (and optional sub-key such as a host).
+
+    Args:
+        upstream: Upstream name
+        key: Optional sub-key; the page fetcher uses one breaker per host
+
+    Returns:
+        The shared breaker
+    """
+    config = UPSTREAMS[upstream]
+    with _breakers_lock:
+        breaker = _breakers.get((upstream, key))
+        if breaker is None:
+            if len(_breakers) >= MAX_BREAKERS:
+                for stale in [k for k, b in _breakers.items() if b.state == "closed"]:
+                    del _breakers[stale]
+            breaker = _breakers[(upstream, key)] = CircuitBreaker(config.failure_threshold, config.reset_timeout)
+        return breaker
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """Extract an HTTP status code from an OpenAI or requests exception."""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        response = getattr(exc, "response", None)
+        code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Decide whether an error is worth retrying and counts against the breaker.
+    Connection errors, timeouts, rate limits and 5xx responses are transient;
+    other errors (bad requests, auth) are returned to the caller at once.
+    """
+    if isinstance(exc, (ConnectionError, TimeoutError, requests.ConnectionError, requests.Timeout)):
+        return True
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS or code >= 500
+    # Only check SDK exception types whose module is already loaded
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+    ddgs = sys.modules.get("duckduckgo_search.exceptions")
+    if ddgs is not None and isinstance(exc, (ddgs.RatelimitException, ddgs.TimeoutException)):
+        return True
+    return False
+
+def backoff_delay(config: UpstreamConfig, attempt: int, exc: BaseException) -> float:
+    """
+    Full-jitter exponential backoff, stretched to honor a Retry-After header.
+
+    Args:
+        config: The upstream's settings
+        attempt: Retry number, starting at 0
+        exc: The error being retried
+
+    Returns:
+        Seconds to sleep before the next attempt
+    """
+    delay = random.uniform(0, min(config.backoff_max, config.backoff_base * 2 ** attempt))
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        retry_after = 0.0
+    return min(config.backoff_max, max(delay, retry_after))
+
+def _before_attempt(upstream: str, breaker: CircuitBreaker) -> None:
+    if not breaker.allow():
+        UPSTREAM_EVENTS.inc(upstream=upstream, event="circuit_open")
+        raise CircuitOpenError(f"Circuit breaker for {upstream} is open")
+
+def _should_retry(upstream: str, breaker: CircuitBreaker, attempt: int, exc: BaseException) -> bool:
+    """Record the failure and decide whether another attempt is allowed."""
+    if not is_transient(exc):
+        # The upstream answered; a client error says nothing about its health
+        breaker.record_success()
+        return False
+    breaker.record_failure()
+    if attempt >= UPSTREAMS[upstream].max_retries:
+        return False
+    if not _budgets[upstream].withdraw():
+        UPSTREAM_EVENTS.inc(upstream=upstream, event="retry_budget_exhausted")
+        return False
+    UPSTREAM_EVENTS.inc(upstream=upstream, event="retry")
+    logger.warning(f"Retrying {upstream} after {type(exc).__name__}: {exc}")
+    return True
+
+def call_upstream(upstream: str, fn: Callable[[], T], key: str = "") -> T:
+    """
+    Call an upstream with its breaker, retry policy and retry budget.
+
+    Args:
+        upstream: Upstream name from UPSTREAMS
+        fn: Zero-argument callable doing one attempt
+        key: Optional breaker sub-key (e.g. host)
+
+    Returns:
+        The callable's result
+
+    Raises:
+        CircuitOpenError: If the breaker is open
+        Exception: The last error once retries are exhausted or not allowed
+    """
+    breaker = get_breaker(upstream, key)
+    _budgets[upstream].deposit()
+    attempt = 0
+    while True:
+        _before_attempt(upstream, breaker)
+        try:
+            result = fn()
+        except Exception as e:
+            if not _should_retry(upstream, breaker, attempt, e):
+                raise
+            time.sleep(backoff_delay(UPSTREAMS[upstream], attempt, e))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+async def acall_upstream(upstream: str, fn: Callable[[], Awaitable[T]], key: str = "") -> T:
+    """
+    Async version of `call_upstream`; `fn` returns a new awaitable per attempt.
+    """
+    breaker = get_breaker(upstream, key)
+    _budgets[upstream].deposit()
+    attempt = 0
+    while True:
+        _before_attempt(upstream, breaker)
+        try:
+            result = await fn()
+        except Exception as e:
+            if not _should_retry(upstream, breaker, attempt, e):
+                raise
+            await asyncio.sleep(backoff_delay(UPSTREAMS[upstream], attempt, e))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+def http2_enabled(config: UpstreamConfig) -> bool:
+    """Return whether HTTP/2 is requested and the `h2` package is installed."""
+    if not config.http2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning(f"HTTP/2 requested for {config.name} but the h2 package is not installed; using HTTP/1.1")
+        return False
+
+def _httpx_settings(config: UpstreamConfig) -> Dict[str, Any]:
+    import httpx
+    return {
+        "http2": http2_enabled(config),
+        "limits": httpx.Limits(
+            max_connections=config.pool_size,
+            max_keepalive_connections=config.pool_size,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        "timeout": httpx.Timeout(config.timeout, connect=config.connect_timeout),
+        "follow_redirects": True,
+    }
+
+def create_openai_client():
+    """
+    Create an OpenAI client on a pooled keep-alive httpx client.
+    SDK retries are off; callers retry through `call_upstream("openai", ...)`.
+    """
+    import httpx
+    from openai import OpenAI
+    config = UPSTREAMS["openai"]
+    return OpenAI(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        http_client=httpx.Client(**_httpx_settings(config)),
+        max_retries=0,
+    )
+
+def create_async_openai_client():
+    """Async version of `create_openai_client`."""
+    import httpx
+    from openai import AsyncOpenAI
+    config = UPSTREAMS["openai"]
+    return AsyncOpenAI(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        http_client=httpx.AsyncClient(**_httpx_settings(config)),
+        max_retries=0,
+    )
+
+def create_session(upstream: str = "page_fetch") -> requests.Session:
+    """
+    Create a requests Session with a connection pool sized for the upstream.
+    requests speaks HTTP/1.1 only; connections are kept alive and reused.
+
+    Args:
+        upstream: Upstream name from UPSTREAMS
+
+    Returns:
+        The session
+    """
+    config = UPSTREAMS[upstream]
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=config.pool_size, pool_maxsize=config.pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session